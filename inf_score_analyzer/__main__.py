@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
+import os
 import uuid
 import logging
 import argparse
-import traceback
-from typing import Any
+import threading
+from typing import Any, Optional
 from pathlib import Path
 from contextlib import contextmanager
 from datetime import datetime, timezone
@@ -11,100 +12,70 @@ from concurrent.futures import ProcessPoolExecutor
 
 # library imports
 import cv2 as cv  # type: ignore
-from numpy.typing import NDArray  # type: ignore
 
 # local imports
 from . import sqlite_client
-from . import frame_utilities
+from . import frame_capture
+from . import ocr_service
+from . import ocr_cache
+from . import video_processor
+from . import screenshot_processor
+from . import screenshot_watcher
 from . import game_state_pixels
-from . import play_frame_processor
-from . import score_frame_processor
-from .game_state_frame_processor import get_game_state_from_frame
-from . import song_select_frame_processor
+from .game_state_frame_processor import compile_state_pixels
 
 from . import download_12sp_tables
+from . import remote_metadata
 
 from . import constants as CONSTANTS
 from .local_dataclasses import (
-    Score,
-    GameState,
-    Difficulty,
-    GameStatePixel,
-    VideoProcessingState,
-    OCRSongTitles,
+    CompiledStatePixels,
+    ScreengrabRetention,
+    CaptureOverflowPolicy,
 )
+from .score_writer import ScoreWriter
 from .song_reference import SongReference
 from . import kamaitachi_client
 from . import csv_processor
 
 
-def process_video(
-    state_pixels: list[GameStatePixel],
-    session_uuid: str,
-    song_reference: SongReference,
-    ocr: ProcessPoolExecutor,
-    video: cv.VideoCapture,
-) -> None:
-    lookback = 90
-    frame_count = 0
-    v = VideoProcessingState()
-    score_frame_dumped = False
-    while video.isOpened():
-        frame_loaded, frame = video.read()
-        if not frame_loaded:
-            log.info("End of video stream")
-            return
-        frame_count += 1
-        state: GameState = get_game_state_from_frame(frame, state_pixels)
-        v.update_current_state(state)
-        if frame_count % 300 == 0:
-            log.info(f"frame#{frame_count} {v}")
-            if CONSTANTS.DEV_MODE and (frame_count % 3000 == 0):
-                frame_utilities.dump_to_png(frame, state.value, frame_count)
-        if v.state_frame_count >= lookback:
-            if v.current_state in game_state_pixels.PLAY_STATES:
-                play_frame_processor.update_video_processing_state(
-                    frame, frame_count, v, song_reference, ocr
-                )
-            elif v.current_state in game_state_pixels.SCORE_STATES:
-                score_frame_processor.update_video_processing_state(
-                    frame, frame_count, v, song_reference
-                )
-                if not score_frame_dumped:
-                    frame_utilities.dump_to_png(frame, state.value, frame_count)
-                    score_frame_dumped = True
-        elif (
-            v.current_state == GameState.LOADING
-            and v.previous_state in game_state_pixels.SCORE_STATES
-        ):
-            score_frame_processor.handle_score_transition(
-                frame_count, v, song_reference, session_uuid
-            )
-            log.info(f"frame#{frame_count}:unblocking naming and scoring")
-            v = VideoProcessingState()
-            score_frame_dumped = False
-        elif v.current_state == GameState.SONG_SELECT:
-            if v.returned_to_song_select_before_writing():
-                log.warning(
-                    f"frame#{frame_count}: Appears no write to "
-                    "db succeeded, skipping previous results."
-                )
-                log.info(f"frame#{frame_count}:unblocking naming and scoring")
-                v = VideoProcessingState()
-                score_frame_dumped = False
-    return
-
-
 def video_processing_loop(
     source_id: int,
-    state_pixels: list[GameStatePixel],
+    state_pixels: CompiledStatePixels,
     session_uuid: str,
     song_reference: SongReference,
+    capture_buffer_size: int = CONSTANTS.CAPTURE_BUFFER_FRAMES,
+    overflow_policy: CaptureOverflowPolicy = CaptureOverflowPolicy.DROP_OLDEST,
+    sample_stride: int = CONSTANTS.STABLE_PLAY_SAMPLE_STRIDE,
+    retention: ScreengrabRetention = CONSTANTS.SCORE_FRAME_RETENTION,
 ) -> None:
-    with video_capture(source_id) as video, ProcessPoolExecutor(max_workers=1) as ocr:
-        log.info("Starting video processing loop")
-        # TODO: check the size of the frame before processing
-        process_video(state_pixels, session_uuid, song_reference, ocr, video)
+    score_writer = ScoreWriter().start()
+    try:
+        # the ocr pool exits first so no worker is still reading a
+        # shared capture slot when the capture buffer is freed
+        with video_capture(source_id) as video, frame_capture.threaded_capture(
+            video, capture_buffer_size, overflow_policy, shared=True
+        ) as ring_buffer, ProcessPoolExecutor(
+            max_workers=1, initializer=ocr_service.warm_up
+        ) as ocr:
+            log.info("Starting video processing loop")
+            video_processor.process_video(
+                state_pixels,
+                session_uuid,
+                song_reference,
+                ocr,
+                ring_buffer.frames(),
+                sample_stride,
+                score_writer=score_writer.submit,
+                frame_arena=ring_buffer,
+                retention=retention,
+            )
+    finally:
+        score_writer.close()
+        # each lost score was logged by the writer as it failed
+        lost_scores = score_writer.drain_status()
+        if lost_scores:
+            log.error(f"{len(lost_scores)} scores could not be written this session")
     return
 
 
@@ -114,10 +85,16 @@ def load_video_source(args: argparse.Namespace) -> cv.VideoCapture:
     return cv.VideoCapture(args.video_source_id)
 
 
-def shutdown(session_uuid: str) -> None:
+def shutdown(session_uuid: str, offline: bool = False) -> None:
     log.info(f"Closing session {session_uuid} and shutting down")
+    log.info(ocr_cache.hit_rate_summary())
+    ocr_cache.flush_touches()
     sqlite_client.write_session_end(session_uuid)
-    kamaitachi_client.export_to_kamaitachi(session_uuid)
+    if offline:
+        log.info(f"Offline, not exporting session {session_uuid} to Kamaitachi")
+    else:
+        kamaitachi_client.export_to_kamaitachi(session_uuid)
+    sqlite_client.close_connections()
 
 
 def start_session() -> str:
@@ -136,92 +113,6 @@ def video_capture(video_source_id: int = 0) -> Any:
         video_source.release()
 
 
-def manually_validate(
-    song_reference: SongReference,
-    image: Path,
-    textage_id: str,
-    score: Score,
-    difficulty: Difficulty,
-    ocr_titles: OCRSongTitles,
-    frame: NDArray,
-):
-    print("")
-    print(f"Here's the details of {image}:")
-    print(f"song: {song_reference.by_textage_id[textage_id]}")
-    print(f"score: {score}")
-    print(f"score: {difficulty}")
-    print("is this correct (y/n)?")
-    cv.imshow("Validation", frame)
-    answer = cv.waitKey(0)
-    print(answer)
-    if answer in [ord("y"), ord("Y")]:
-        print("Validated.")
-        valid = True
-    else:
-        print("Rejected.")
-        valid = False
-    print("")
-    return valid
-
-
-def read_scores_from_pngs(
-    png_files: list[Path],
-    state_pixels: list[GameStatePixel],
-    session_uuid: str,
-    song_reference: SongReference,
-    manual_validation: bool,
-) -> None:
-    with ProcessPoolExecutor(max_workers=1) as ocr:
-        for image in png_files:
-            logging.info(f"Reading score from {image}")
-            frame = cv.imread(str(image.absolute()))
-            game_state: GameState = get_game_state_from_frame(frame, state_pixels)
-            log.debug(f"PNG GAME STATE: {game_state}")
-            try:
-                if game_state in game_state_pixels.SCORE_STATES:
-                    textage_id, score, difficulty, ocr_titles = (
-                        score_frame_processor.read_score_and_song_metadata(
-                            frame, song_reference, game_state, ocr
-                        )
-                    )
-                elif game_state in game_state_pixels.SONG_SELECT_STATES:
-                    textage_id, score, difficulty, ocr_titles = (
-                        song_select_frame_processor.read_score_and_song_metadata(
-                            frame, song_reference
-                        )
-                    )
-                else:
-                    log.error(
-                        f"Could not read song select or score result from {image}, continuing"
-                    )
-                    continue
-                if manual_validation:
-                    valid = manually_validate(
-                        song_reference,
-                        image,
-                        textage_id,
-                        score,
-                        difficulty,
-                        ocr_titles,
-                        frame,
-                    )
-                    if not valid:
-                        log.info(
-                            f"Rejecting {image} {textage_id} {score} {difficulty} {ocr_titles} manually"
-                        )
-                        continue
-
-                sqlite_client.write_score(
-                    session_uuid, textage_id, score, difficulty, ocr_titles, frame
-                )
-            except Exception as e:
-                log.error(
-                    f"Could not determine score from {image} and skipping : {e} : {traceback.format_exc()}"
-                )
-                continue
-    return
-
-
 def load_pngs(png_files: list[str]) -> list[Path]:
     pngs: list[Path] = []
     for filename in png_files:
@@ -245,6 +136,24 @@ def parse_arguments() -> argparse.Namespace:
         help="Will force a song metadata DB update regardless of recency",
         dest="force_update",
     )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help=(
+            "Starts without the network, from the current app DB or the "
+            "metadata snapshot, and skips the Kamaitachi export."
+        ),
+        dest="offline",
+    )
+    parser.add_argument(
+        "--write-metadata-snapshot",
+        action="store_true",
+        help=(
+            "Writes the app DB's song metadata to the snapshot --offline "
+            "starts from, then exits."
+        ),
+        dest="write_metadata_snapshot",
+    )
     parser.add_argument(
         "--video-mode",
         action="store_true",
@@ -264,6 +173,83 @@ def parse_arguments() -> argparse.Namespace:
         default=0,
         dest="video_source_id",
     )
+    parser.add_argument(
+        "--video-file",
+        type=str,
+        help=(
+            "Optional. A recorded 1920x1080 video file, such as a stream "
+            "archive, to read scores from instead of a live video source."
+        ),
+        default=None,
+        dest="video_file",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help=(
+            "Number of worker processes used for --video-file "
+            "and for reading screenshots. Defaults to the number of CPUs."
+        ),
+        default=os.cpu_count() or 1,
+        dest="workers",
+    )
+    parser.add_argument(
+        "--capture-buffer-size",
+        type=int,
+        help=(
+            "Number of video frames buffered between the capture thread "
+            f"and frame processing. Defaults to {CONSTANTS.CAPTURE_BUFFER_FRAMES}."
+        ),
+        default=CONSTANTS.CAPTURE_BUFFER_FRAMES,
+        dest="capture_buffer_size",
+    )
+    parser.add_argument(
+        "--capture-overflow-policy",
+        type=str,
+        choices=[policy.value for policy in CaptureOverflowPolicy],
+        help=(
+            "What the capture thread does when the frame buffer is full: "
+            "drop_oldest discards the oldest unprocessed frame, "
+            "block stops reading from the video device until a slot frees up. "
+            "Defaults to drop_oldest."
+        ),
+        default=CaptureOverflowPolicy.DROP_OLDEST.value,
+        dest="capture_overflow_policy",
+    )
+    parser.add_argument(
+        "--stable-play-sample-stride",
+        type=int,
+        help=(
+            "Once a song is being played and all of its details are read, "
+            "only every Nth video frame is fully processed until the screen "
+            "changes. 1 processes every frame. "
+            f"Defaults to {CONSTANTS.STABLE_PLAY_SAMPLE_STRIDE}."
+        ),
+        default=CONSTANTS.STABLE_PLAY_SAMPLE_STRIDE,
+        dest="sample_stride",
+    )
+    parser.add_argument(
+        "--score-frame-retention",
+        type=str,
+        choices=[retention.value for retention in ScreengrabRetention],
+        help=(
+            "How much of each score screen is kept with the score: "
+            "none keeps nothing, crops keeps the areas the score, note count, "
+            "title and clear lamp are read from, full keeps the whole frame. "
+            f"Defaults to {CONSTANTS.SCORE_FRAME_RETENTION.value}."
+        ),
+        default=CONSTANTS.SCORE_FRAME_RETENTION.value,
+        dest="score_frame_retention",
+    )
+    parser.add_argument(
+        "--migrate-screengrabs",
+        action="store_true",
+        help=(
+            "Moves score screengrabs stored by earlier versions into the "
+            "compressed screengrab store, then exits."
+        ),
+        dest="migrate_screengrabs",
+    )
     parser.add_argument(
         "--csv",
         type=str,
@@ -278,11 +264,32 @@ def parse_arguments() -> argparse.Namespace:
         "--batch-screenshot-dir",
         type=str,
         help=(
-            "Optional. Will read all screenshots from a directory and attempt to parse them."
+            "Optional. Will read all screenshots from a directory and attempt to parse them. "
+            "Screenshots read by an earlier run are skipped."
         ),
         default=None,
         dest="batch_screenshot_dir",
     )
+    parser.add_argument(
+        "--watch-dir",
+        type=str,
+        help=(
+            "Optional. Watches a directory, such as the game's Screenshots "
+            "directory, and reads scores from new screenshots as they are saved "
+            "until interrupted."
+        ),
+        default=None,
+        dest="watch_dir",
+    )
+    parser.add_argument(
+        "--watch-dir-poll",
+        action="store_true",
+        help=(
+            "Optional. Polls --watch-dir instead of using filesystem events, "
+            "for network shares that don't deliver them."
+        ),
+        dest="watch_dir_poll",
+    )
     parser.add_argument(
         "--manual-validation",
         action="store_true",
@@ -301,38 +308,131 @@ def get_screenshot_list_from_dir(batch_screenshot_dir: str) -> list[Path]:
     ]
 
 
+def refresh_metadata(force_update: bool = False) -> None:
+    """
+    Downloads and applies song metadata and the SP12 table, then
+    snapshots the result so --offline can start from it later.
+    """
+    fetched_metadata = remote_metadata.fetch_remote_metadata(
+        song_metadata=force_update or sqlite_client.should_update_app_db()
+    )
+    sqlite_client.sqlite_setup(force_update, fetched_metadata)
+    if fetched_metadata.sp12_table is not None:
+        download_12sp_tables.write_table_to_sqlite(
+            fetched_metadata.sp12_table, sqlite_client.read_song_data_from_db()
+        )
+    if fetched_metadata.song_metadata is None and fetched_metadata.sp12_table is None:
+        return
+    try:
+        sqlite_client.write_metadata_snapshot()
+    except OSError as e:
+        log.error(f"Could not write metadata snapshot: {e}")
+
+
+def refresh_metadata_in_background() -> Optional[threading.Thread]:
+    """
+    Refreshes the app db on a background thread if it's due, so capture
+    doesn't wait on the network. Songs it changes are picked up on the
+    next start.
+    """
+    if not sqlite_client.should_update_app_db():
+        return None
+
+    def refresh() -> None:
+        try:
+            refresh_metadata()
+        except Exception as e:
+            log.error(f"Background metadata refresh failed: {e}")
+        finally:
+            sqlite_client.close_connections()
+
+    refresher = threading.Thread(target=refresh, name="metadata-refresh", daemon=True)
+    refresher.start()
+    return refresher
+
+
 def startup() -> tuple[argparse.Namespace, SongReference]:
+    """
+    Sets up the databases, only waiting on the network when asked to
+    with --force-update or when there are no songs to start from.
+    """
     args = parse_arguments()
-    sqlite_client.sqlite_setup(args.force_update)
+    if args.offline or (
+        not args.force_update
+        and (sqlite_client.has_song_metadata() or CONSTANTS.METADATA_SNAPSHOT.exists())
+    ):
+        sqlite_client.sqlite_offline_setup()
+    else:
+        refresh_metadata(args.force_update)
     # TODO: make song reference a standalone module that can be called statically
-    song_reference = sqlite_client.read_song_data_from_db()
-    download_12sp_tables.download_and_normalize_data(song_reference)
+    song_reference = sqlite_client.load_song_reference()
     return args, song_reference
 
 
 def main() -> None:
     args, song_reference = startup()
     log.info(f"Running with arguments: {args}")
+    if args.migrate_screengrabs:
+        sqlite_client.migrate_screengrabs()
+        return
+    if args.write_metadata_snapshot:
+        sqlite_client.write_metadata_snapshot()
+        return
+    state_pixels = compile_state_pixels(game_state_pixels.read_state_pixels())
     session_uuid = start_session()
-    if args.video_mode:
+    if not args.offline:
+        refresh_metadata_in_background()
+    retention = ScreengrabRetention(args.score_frame_retention)
+    if args.video_file:
+        try:
+            video_processor.process_video_file(
+                Path(args.video_file),
+                state_pixels,
+                session_uuid,
+                song_reference,
+                args.workers,
+                args.sample_stride,
+                retention,
+            )
+        finally:
+            shutdown(session_uuid, args.offline)
+    elif args.video_mode:
         try:
             video_processing_loop(
                 args.video_source_id,
-                game_state_pixels.ALL_STATE_PIXELS,
+                state_pixels,
+                session_uuid,
+                song_reference,
+                args.capture_buffer_size,
+                CaptureOverflowPolicy(args.capture_overflow_policy),
+                args.sample_stride,
+                retention,
+            )
+        except KeyboardInterrupt:
+            pass
+        finally:
+            shutdown(session_uuid, args.offline)
+    elif args.watch_dir:
+        try:
+            screenshot_watcher.watch_screenshot_dir(
+                Path(args.watch_dir),
+                state_pixels,
                 session_uuid,
                 song_reference,
+                not args.watch_dir_poll,
+                retention,
             )
         except KeyboardInterrupt:
             pass
         finally:
-            shutdown(session_uuid)
+            shutdown(session_uuid, args.offline)
     elif args.csv_file:
         try:
             csv_processor.import_scores_from_csv(
                 session_uuid, Path(args.csv_file), song_reference
             )
         finally:
-            shutdown(session_uuid)
+            shutdown(session_uuid, args.offline)
     else:
         try:
             pngs: list[Path] = []
@@ -340,15 +440,18 @@ def main() -> None:
                 pngs.extend(get_screenshot_list_from_dir(args.batch_screenshot_dir))
             else:
                 pngs.extend(load_pngs(args.screenshots))
-            read_scores_from_pngs(
+            screenshot_processor.read_scores_from_pngs(
                 pngs,
-                game_state_pixels.ALL_STATE_PIXELS,
+                state_pixels,
                 session_uuid,
                 song_reference,
                 args.manual_validation,
+                args.workers,
+                skip_processed=bool(args.batch_screenshot_dir),
+                retention=retention,
             )
         finally:
-            shutdown(session_uuid)
+            shutdown(session_uuid, args.offline)
     return
 
 
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# synthetic songs for the benchmarks and tests, not used by the app
+import random
+import string
+
+# local imports
+from .song_reference import SongReference
+from .local_dataclasses import (
+    Difficulty,
+    Alphanumeric,
+    SongMetadata,
+    DifficultyMetadata,
+)
+
+
+def synthetic_song_metadata(songs: int) -> dict[str, SongMetadata]:
+    return {
+        f"_song{song}": SongMetadata(
+            f"_song{song}",
+            f"title {song}",
+            f"artist {song}",
+            f"genre {song}",
+            song % 32,
+            Alphanumeric.ABCD,
+            {
+                difficulty: DifficultyMetadata(song % 12 + 1, 1000 + song, 150, 150)
+                for difficulty in Difficulty
+                if difficulty != Difficulty.UNKNOWN
+            },
+        )
+        for song in range(songs)
+    }
+
+
+def _synthetic_name(picker: random.Random, words: int) -> str:
+    return " ".join(
+        "".join(picker.choices(string.ascii_lowercase, k=picker.randint(2, 8)))
+        for _ in range(words)
+    ).title()
+
+
+def synthetic_song_reference(songs: int = 2500) -> SongReference:
+    song_reference = SongReference()
+    picker = random.Random(0)
+    for song in range(songs):
+        textage_id = f"_song{song}"
+        genre = f"genre {song % 400}"
+        title = _synthetic_name(picker, 3)
+        artist = _synthetic_name(picker, 2)
+        song_reference.by_textage_id[textage_id] = {
+            "artist": artist,
+            "title": title,
+            "genre": genre,
+        }
+        song_reference.tiebreak_records[textage_id] = (textage_id, artist, title, genre)
+        song_reference.by_title[title] = textage_id
+        song_reference.by_artist.setdefault(artist, set()).add(textage_id)
+        song_reference.by_genre.setdefault(genre, set()).add(textage_id)
+        bpm_tuple = (100 + song % 120, 100 + song % 120)
+        song_reference.by_bpm.setdefault(bpm_tuple, set()).add(textage_id)
+        for difficulty in ["SP_NORMAL", "SP_HYPER", "SP_ANOTHER"]:
+            level = (song + len(difficulty)) % 12 + 1
+            notes = 300 + (song * 7 + len(difficulty)) % 1700
+            song_reference.by_difficulty.setdefault((difficulty, level), set()).add(
+                textage_id
+            )
+            song_reference.by_note_count.setdefault(notes, set()).add(textage_id)
+    return song_reference
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import os
 from pathlib import Path
-from .local_dataclasses import NumberArea
+from .local_dataclasses import NumberArea, ScreengrabRetention
 
 BASE_DIR = Path(os.getenv("PWD", default="./"))
 DATA_DIR = BASE_DIR / Path("data")
@@ -181,6 +181,52 @@ FAST_SLOW_Y_OFFSET = 16
 NOTES_X_OFFSET = 21
 NOTES_Y_OFFSET = 17
 
+# score screen title and artist
+SCORE_TITLE_TOP_LEFT_Y = 960
+SCORE_TITLE_TOP_LEFT_X = 550
+SCORE_TITLE_BOTTOM_RIGHT_Y = 996
+SCORE_TITLE_BOTTOM_RIGHT_X = 1370
+SCORE_ARTIST_BOTTOM_RIGHT_Y = 1030
+
+# score screen clear lamp, x ranges by side
+CLEAR_TYPE_TOP_LEFT_Y = 417
+CLEAR_TYPE_BOTTOM_RIGHT_Y = 437
+CLEAR_TYPE_P1_X = (366, 512)
+CLEAR_TYPE_P2_X = (1716, 1862)
+
+# what of a score frame is kept in the user db
+SCORE_FRAME_RETENTION = ScreengrabRetention.CROPS
+
+# play screen title and artist, 1p sp only
+PLAY_TITLE_TOP_LEFT_Y = 60
+PLAY_TITLE_TOP_LEFT_X = 734
+PLAY_TITLE_BOTTOM_RIGHT_Y = 96
+PLAY_TITLE_BOTTOM_RIGHT_X = 1500
+PLAY_ARTIST_BOTTOM_RIGHT_Y = 120
+
+# video capture
+VIDEO_FRAME_HEIGHT = 1080
+VIDEO_FRAME_WIDTH = 1920
+VIDEO_FRAME_CHANNELS = 3
+CAPTURE_BUFFER_FRAMES = 16
+# capture slots OCR workers can hold on to past the frame being processed
+SHARED_FRAME_OCR_SLOTS = 2
+# frames a game state has to hold before the video loop acts on it
+STATE_LOOKBACK_FRAMES = 90
+# during a play section with all song metadata read, only every Nth
+# frame is fully processed unless the state's probe pixels change
+STABLE_PLAY_SAMPLE_STRIDE = 10
+PROBE_PIXEL_CHANGE_THRESHOLD = 10
+# consecutive LOADING frames needed to cut a video file into ranges there
+VIDEO_SPLIT_LOADING_FRAMES = 30
+# --watch-dir timings, in seconds
+WATCH_DIR_POLL_SECONDS = 0.5
+SCREENSHOT_SETTLE_SECONDS = 0.2
+SCREENSHOT_WRITE_TIMEOUT_SECONDS = 10.0
+# screenshot reads queued per import worker ahead of the writer, see
+# screenshot_processor.bounded_map
+SCREENSHOT_READS_IN_FLIGHT_PER_WORKER = 2
+
 LOG_FORMAT = "%(asctime)s:%(levelname)s:%(module)s:%(message)s"
 DEV_MODE: bool = "DEV_MODE" in os.environ
 
@@ -190,9 +236,35 @@ USER_DB_NAME = "user.sqlite3.db"
 APP_DB = DATA_DIR / Path(APP_DB_NAME)
 USER_DB = DATA_DIR / Path(USER_DB_NAME)
 MIN_APP_AGE_UPDATE_SECONDS = 43200
+# prepared statements kept per connection, and page cache size in KiB
+SQLITE_CACHED_STATEMENTS = 256
+SQLITE_CACHE_KIB = 16384
+# app db refreshes load songs into staging tables and swap them in,
+# rather than clearing and refilling the live ones
+APP_DB_STAGED_LOAD = True
+# the video loop's score writer commits once this many scores are
+# queued, or this many seconds after the oldest was
+SCORE_WRITE_BATCH_SIZE = 16
+SCORE_WRITE_FLUSH_SECONDS = 2.0
 TACHI_API_TOKEN = os.getenv("TACHI_API_TOKEN")
 KAMAITACHI_API_URL = "https://kamai.tachi.ac/ir/direct-manual/import"
 KAMAITACHI_SONG_LIST_URL = "https://raw.githubusercontent.com/zkrising/Tachi/refs/heads/main/seeds/collections/songs-iidx.json"
+# built song indexes cached next to the app db, see
+# sqlite_client.load_song_reference
+SONG_REFERENCE_CACHE_NAME = "song_reference.pickle"
+SONG_REFERENCE_CACHE_FORMAT = 4
+# OCR'd titles, artists and genres may be this fraction of their length
+# in edits away from a known one and still match it, see fuzzy_index
+FUZZY_MATCH_MAX_DISTANCE_RATIO = 0.2
+# song metadata for starting without the network, see
+# sqlite_client.write_metadata_snapshot, rewritten after each online refresh
+METADATA_SNAPSHOT = DATA_DIR / Path("metadata-snapshot.json.gz")
+METADATA_SNAPSHOT_FORMAT = 1
+# remote metadata downloads are revalidated against copies kept here
+HTTP_CACHE_DIR = DATA_DIR / Path("http-cache")
+HTTP_TIMEOUT_SECONDS = 30.0
+# how long startup waits on all remote metadata sources together
+STARTUP_FETCH_TIMEOUT_SECONDS = 60.0
 COMMUNITY_RANK_TABLE_URL = "https://iidx-sp12.github.io/songs.json"
 COMMUNITY_RANK_TABLE_ID = "SP12"
 
@@ -202,3 +274,8 @@ GRAYSCALE_GREEN = 0.7154
 GRAYSCALE_RED = 0.2125
 PYTESSERACT_LINE_OF_TEXT = "--psm 7"
 PYTESSERACT_SINGLE_LETTER = "--psm 10"
+OCR_LANGUAGES = ("eng", "jpn")
+OCR_CACHE_MAX_ENTRIES = 5000
+OCR_CACHE_LOG_EVERY = 50
+# OCR cache hits are written back in batches of this many entries
+OCR_CACHE_TOUCH_BATCH = 64
@@ -125,5 +125,4 @@ def import_scores_from_csv(
 ):
     data = read_csv(csv_file)
     valid_data = validate_data(session_uuid, data, song_reference)
-    for entry in valid_data:
-        sqlite_client.write_score_from_record(entry)
+    sqlite_client.write_scores(valid_data)
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
+import json
 import logging
-import requests  # type: ignore
 
 from . import constants as CONSTANTS
+from . import http_cache
 from . import sqlite_client
 from .song_reference import SongReference
 from .local_dataclasses import Difficulty, ClearType
@@ -95,9 +96,8 @@ def transform_table_json(
 
 
 def get_12sp_table_json() -> list[dict]:
-    table_response = requests.get(CONSTANTS.COMMUNITY_RANK_TABLE_URL)
-    table_response.raise_for_status()
-    return table_response.json()
+    table_response = http_cache.fetch(CONSTANTS.COMMUNITY_RANK_TABLE_URL)
+    return json.loads(table_response.content)
 
 
 def download_and_normalize_data(song_reference: SongReference):
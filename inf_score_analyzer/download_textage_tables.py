@@ -5,12 +5,10 @@ import json
 import html
 import logging
 from pathlib import Path
-from datetime import datetime
-from typing import Callable, Any, Union
-
-import requests
+from typing import Callable, Any, Optional, Union
 
 from . import constants as CONSTANTS
+from . import http_cache
 from .local_dataclasses import (
     Difficulty,
     SongMetadata,
@@ -22,48 +20,19 @@ log = logging.getLogger(__name__)
 
 
 def _download_textage_javascript(javascript_file: str, output_path: Path) -> Path:
-    update = False
     textage_base_url = "https://textage.cc/score/"
-    textage_last_modified_format = "%a, %d %b %Y %H:%M:%S %Z"
-    # we used enumerate because we wanted the files in a specific
-    # order mentioned in the html
     url = f"{textage_base_url}{javascript_file}"
-    log.info(f"downloading {url}")
     last_modified_file = output_path / Path(f"{javascript_file}.last_modified")
     output_filename = output_path / Path(f"{javascript_file}")
-    response = requests.get(url)
-    # make sure to write about this as well, that its chinese w/o it
-    response.encoding = "shift_jis"
-
-    if response.status_code not in [200]:
-        raise RuntimeError(f"could not download {url}: {response.status_code}")
-    if "Last-Modified" not in response.headers:
-        raise RuntimeError(
-            f"server no longer returning last modified: {response.headers}"
-        )
-    if not os.path.exists(last_modified_file):
-        update = True
-    else:
-        latest_last_modified = datetime.strptime(
-            response.headers["Last-Modified"], textage_last_modified_format
-        )
-        with open(last_modified_file, "rt") as last_modified_reader:
-            current_last_modified_str = last_modified_reader.readlines()[0].strip()
-            current_last_modified = datetime.strptime(
-                current_last_modified_str, textage_last_modified_format
-            )
-        if latest_last_modified > current_last_modified:
-            update = True
-    if update:
-        log.info(f"updating {output_path}")
-        with open(last_modified_file, "wt") as last_modified_writer:
-            last_modified_writer.write(response.headers["Last-Modified"])
+    response = http_cache.fetch(url)
+    if response.modified or not os.path.exists(output_filename):
+        log.info(f"updating {output_filename}")
+        if response.last_modified:
+            with open(last_modified_file, "wt") as last_modified_writer:
+                last_modified_writer.write(response.last_modified)
+        # make sure to write about this as well, that its chinese w/o it
         with open(output_filename, "wt") as file_writer:
-            file_writer.write(response.text)
-    else:
-        log.info(
-            f"{output_path} not modified since {response.headers['Last-Modified']}"
-        )
+            file_writer.write(response.content.decode("shift_jis", errors="replace"))
     return output_filename
 
 
@@ -165,12 +134,13 @@ def _read_difficulty(version_data: dict[str, Any]) -> dict[str, dict[Difficulty,
     return difficulties_by_textage_id
 
 
-def read_notes_and_bpm() -> tuple[
-    dict[str, tuple[bool, int, int]], dict[str, dict[Difficulty, int]]
-]:
+def read_notes_and_bpm(
+    notes_and_bpm: Optional[dict[str, list[Union[int, str]]]] = None,
+) -> tuple[dict[str, tuple[bool, int, int]], dict[str, dict[Difficulty, int]]]:
     bpm_by_textage_id: dict[str, tuple[bool, int, int]] = {}
     notes_by_textage_id: dict[str, dict[Difficulty, int]] = {}
-    notes_and_bpm = _get_textage_note_counts_and_bpm()
+    if notes_and_bpm is None:
+        notes_and_bpm = _get_textage_note_counts_and_bpm()
     for key in notes_and_bpm.keys():
         notes_by_textage_id[key] = {}
         spn = int(notes_and_bpm[key][Difficulty.SP_NORMAL.value])
@@ -470,11 +440,14 @@ def _build_song_metadata_dict(
     song_titles: dict[str, Any],
     song_list: dict[str, list[str]],
     join_with_space: bool = True,
+    notes_and_bpm: Optional[dict[str, list[Union[int, str]]]] = None,
+    version_list: Optional[Any] = None,
 ) -> Any:
     all_difficulties = _read_difficulty(version_data)
-    all_bpms, all_note_counts = read_notes_and_bpm()
+    all_bpms, all_note_counts = read_notes_and_bpm(notes_and_bpm)
     variable_bpms = get_variable_bpms()
-    version_list = get_textage_version_list()
+    if version_list is None:
+        version_list = get_textage_version_list()
     metadata: dict[str, SongMetadata] = {}
     for textage_id in song_list.keys():
         difficulty_metadata: dict[Difficulty, DifficultyMetadata] = {}
@@ -522,6 +495,31 @@ def get_infinitas_song_metadata() -> dict[str, SongMetadata]:
     return _build_song_metadata_dict(version_data, song_titles, infinitas_only_songs)
 
 
+# each downloads and parses one textage file, so they can run concurrently
+TEXTAGE_TABLE_READERS: dict[str, Callable[[], Any]] = {
+    "version_data": get_textage_version_data,
+    "song_titles": get_textage_song_titles,
+    "notes_and_bpm": _get_textage_note_counts_and_bpm,
+    "version_list": get_textage_version_list,
+}
+
+
+def build_infinitas_song_metadata(
+    textage_tables: dict[str, Any],
+) -> dict[str, SongMetadata]:
+    """get_infinitas_song_metadata from tables read by TEXTAGE_TABLE_READERS."""
+    version_data = textage_tables["version_data"]
+    song_titles = textage_tables["song_titles"]
+    infinitas_only_songs = filter_infinitas_only_songs(version_data, song_titles)
+    return _build_song_metadata_dict(
+        version_data,
+        song_titles,
+        infinitas_only_songs,
+        notes_and_bpm=textage_tables["notes_and_bpm"],
+        version_list=textage_tables["version_list"],
+    )
+
+
 def get_current_version_song_metadata_not_in_infinitas() -> dict[str, SongMetadata]:
     version_data = get_textage_version_data()
     song_titles = get_textage_song_titles()
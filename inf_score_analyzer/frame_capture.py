@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Iterator, Optional
+
+import numpy  # type: ignore
+import cv2 as cv  # type: ignore
+from numpy.typing import NDArray  # type: ignore
+
+from . import constants as CONSTANTS
+from .local_dataclasses import CaptureOverflowPolicy, SharedFrameRef
+
+log = logging.getLogger(__name__)
+
+# shared memory arenas attached by this process, kept open for reuse
+_attached_arenas: dict[str, shared_memory.SharedMemory] = {}
+
+
+class FrameRingBuffer:
+    """
+    Fixed-size pool of preallocated frame slots shared between
+    the capture thread and the frame processing loop.
+
+    Slots cycle through the free list, the slot the producer is
+    decoding into, the ready queue (captured but not yet processed,
+    in capture order) and the single slot held by the consumer.
+    The consumer's slot is handed back on its next get(), so a frame
+    it is working on is never overwritten underneath it.
+
+    With shared set, the slots live in shared memory and the consumer
+    can retain its slot for up to shared_slots OCR workers, which read
+    the frame in place instead of being sent a copy. A retained slot
+    only returns to the free list once every reference is released.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        frame_shape: tuple[int, int, int],
+        overflow_policy: CaptureOverflowPolicy = CaptureOverflowPolicy.DROP_OLDEST,
+        shared: bool = False,
+        shared_slots: int = CONSTANTS.SHARED_FRAME_OCR_SLOTS,
+    ):
+        if capacity < 1:
+            raise RuntimeError(f"capture buffer needs at least one slot: {capacity}")
+        self.capacity = capacity
+        self.frame_shape = frame_shape
+        self.overflow_policy = overflow_policy
+        # extra slots for the frame being decoded and the frame held
+        # by the consumer, neither of which count as queued, plus any
+        # retained for OCR workers
+        self.shared_slots = shared_slots if shared else 0
+        slot_count = capacity + 2 + self.shared_slots
+        self.shared_memory: Optional[shared_memory.SharedMemory] = None
+        if shared:
+            self.shared_memory = shared_memory.SharedMemory(
+                create=True,
+                size=slot_count * int(numpy.prod(frame_shape)),
+            )
+            self.slots: NDArray = numpy.ndarray(
+                (slot_count, *frame_shape),
+                dtype=numpy.uint8,
+                buffer=self.shared_memory.buf,
+            )
+        else:
+            self.slots = numpy.zeros((slot_count, *frame_shape), dtype=numpy.uint8)
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        self._free: deque[int] = deque(range(slot_count))
+        self._ready: deque[tuple[int, int]] = deque()
+        self._held: Optional[int] = None
+        self._references: dict[int, int] = {}
+        self._closed = False
+        self._lock = threading.Lock()
+        self._frame_ready = threading.Condition(self._lock)
+        self._slot_free = threading.Condition(self._lock)
+
+    def __repr__(self):
+        return (
+            "FrameRingBuffer("
+            f"capacity:{self.capacity}, "
+            f"overflow_policy:{self.overflow_policy.value}, "
+            f"captured_frames:{self.captured_frames}, "
+            f"dropped_frames:{self.dropped_frames}, "
+            f"queued_frames:{len(self._ready)}"
+            ")"
+        )
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def acquire_write_slot(self) -> Optional[int]:
+        """
+        Returns a slot index for the producer to decode the next frame into,
+        or None once the buffer has been closed.
+        """
+        with self._lock:
+            if self.overflow_policy == CaptureOverflowPolicy.BLOCK:
+                while len(self._ready) >= self.capacity and not self._closed:
+                    self._slot_free.wait()
+            if self._closed:
+                return None
+            return self._free.popleft()
+
+    def release_write_slot(self, slot: int, dropped: bool = False) -> None:
+        with self._lock:
+            self._free.appendleft(slot)
+            if dropped:
+                self.dropped_frames += 1
+
+    def commit_write_slot(self, slot: int, frame_number: int) -> None:
+        with self._lock:
+            self._ready.append((frame_number, slot))
+            self.captured_frames += 1
+            if len(self._ready) > self.capacity:
+                _, oldest_slot = self._ready.popleft()
+                self._free.append(oldest_slot)
+                self.dropped_frames += 1
+            self._frame_ready.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[tuple[int, NDArray]]:
+        """
+        Returns the oldest unprocessed (frame_number, frame) pair. The frame
+        is a view into the buffer that stays valid until the next call.
+        Returns None once the buffer is closed and drained, or on timeout.
+        """
+        with self._lock:
+            if self._held is not None:
+                if self._held not in self._references:
+                    self._free.append(self._held)
+                self._held = None
+            while not self._ready:
+                if self._closed:
+                    return None
+                if not self._frame_ready.wait(timeout):
+                    return None
+            frame_number, slot = self._ready.popleft()
+            self._held = slot
+            self._slot_free.notify()
+            return frame_number, self.slots[slot]
+
+    def frames(self) -> Iterator[tuple[int, NDArray]]:
+        while True:
+            entry = self.get()
+            if entry is None:
+                return
+            yield entry
+
+    def retain_held(self) -> Optional[SharedFrameRef]:
+        """
+        Keeps the consumer's current slot from being reused and returns
+        a reference OCR workers can read it through, or None if the
+        buffer isn't shared or every retainable slot is taken.
+        """
+        with self._lock:
+            if self.shared_memory is None or self._held is None:
+                return None
+            if (
+                self._held not in self._references
+                and len(self._references) >= self.shared_slots
+            ):
+                return None
+            self._references[self._held] = self._references.get(self._held, 0) + 1
+            return SharedFrameRef(self.shared_memory.name, self._held, self.frame_shape)
+
+    def release(self, frame_ref: SharedFrameRef) -> None:
+        with self._lock:
+            references = self._references[frame_ref.slot] - 1
+            if references:
+                self._references[frame_ref.slot] = references
+                return
+            del self._references[frame_ref.slot]
+            if frame_ref.slot != self._held:
+                self._free.append(frame_ref.slot)
+                self._slot_free.notify()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._frame_ready.notify_all()
+            self._slot_free.notify_all()
+
+    def unlink(self) -> None:
+        """Frees the shared memory once neither side needs new references to it."""
+        if self.shared_memory is None:
+            return
+        self.shared_memory.unlink()
+        try:
+            self.shared_memory.close()
+        except BufferError:
+            # frames handed out are still in use, the mapping goes with them
+            pass
+
+
+def read_shared_frame(frame_ref: SharedFrameRef) -> NDArray:
+    """
+    Returns a view of a shared frame slot, attaching the arena the
+    first time this process sees it. Nothing is copied, so callers
+    that modify the frame should crop a copy first.
+    """
+    arena = _attached_arenas.get(frame_ref.shared_memory_name)
+    if arena is None:
+        arena = shared_memory.SharedMemory(name=frame_ref.shared_memory_name)
+        _attached_arenas[frame_ref.shared_memory_name] = arena
+    frame_bytes = int(numpy.prod(frame_ref.frame_shape))
+    return numpy.ndarray(
+        frame_ref.frame_shape,
+        dtype=numpy.uint8,
+        buffer=arena.buf,
+        offset=frame_ref.slot * frame_bytes,
+    )
+
+
+def capture_frames(
+    video: cv.VideoCapture,
+    ring_buffer: FrameRingBuffer,
+    stop_event: threading.Event,
+) -> None:
+    frame_number = 0
+    try:
+        while video.isOpened() and not stop_event.is_set():
+            slot = ring_buffer.acquire_write_slot()
+            if slot is None:
+                break
+            slot_frame = ring_buffer.slots[slot]
+            frame_loaded, frame = video.read(slot_frame)
+            if not frame_loaded:
+                ring_buffer.release_write_slot(slot)
+                log.info("End of video stream")
+                break
+            frame_number += 1
+            if frame is not slot_frame:
+                # the capture backend allocated its own frame instead of
+                # decoding in place, usually due to a resolution mismatch
+                if frame.shape != slot_frame.shape:
+                    log.error(
+                        f"frame#{frame_number}: expected {slot_frame.shape} "
+                        f"frame, got {frame.shape}, dropping"
+                    )
+                    ring_buffer.release_write_slot(slot, dropped=True)
+                    continue
+                numpy.copyto(slot_frame, frame)
+            ring_buffer.commit_write_slot(slot, frame_number)
+    finally:
+        ring_buffer.close()
+        log.info(f"Capture thread stopped: {ring_buffer}")
+
+
+@contextmanager
+def threaded_capture(
+    video: cv.VideoCapture,
+    capacity: int = CONSTANTS.CAPTURE_BUFFER_FRAMES,
+    overflow_policy: CaptureOverflowPolicy = CaptureOverflowPolicy.DROP_OLDEST,
+    shared: bool = False,
+) -> Any:
+    frame_shape = (
+        int(video.get(cv.CAP_PROP_FRAME_HEIGHT)) or CONSTANTS.VIDEO_FRAME_HEIGHT,
+        int(video.get(cv.CAP_PROP_FRAME_WIDTH)) or CONSTANTS.VIDEO_FRAME_WIDTH,
+        CONSTANTS.VIDEO_FRAME_CHANNELS,
+    )
+    ring_buffer = FrameRingBuffer(capacity, frame_shape, overflow_policy, shared)
+    stop_event = threading.Event()
+    capture_thread = threading.Thread(
+        target=capture_frames,
+        args=(video, ring_buffer, stop_event),
+        name="frame-capture",
+        daemon=True,
+    )
+    log.info(f"Starting capture thread: {ring_buffer}")
+    capture_thread.start()
+    try:
+        yield ring_buffer
+    finally:
+        stop_event.set()
+        ring_buffer.close()
+        capture_thread.join()
+        ring_buffer.unlink()
+        if ring_buffer.dropped_frames:
+            log.warning(
+                f"Dropped {ring_buffer.dropped_frames} frames before processing, "
+                f"captured {ring_buffer.captured_frames}"
+            )
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import logging
+from typing import Optional
+
+import numpy  # type: ignore
+from numpy.typing import NDArray  # type: ignore
+
+from . import constants as CONSTANTS
+from .game_state_pixels import PLAY_STATES
+from .local_dataclasses import CompiledStatePixels, GameState, VideoProcessingState
+
+log = logging.getLogger(__name__)
+
+
+class AdaptiveFrameSampler:
+    """
+    Decides which video frames get full state detection and processing.
+
+    Every frame is processed until a play section is stable: the play
+    state has held for the lookback window and its metadata, metadata
+    titles and OCR titles are all read. From then on only every
+    stride-th frame is processed. Skipped frames are still checked
+    against a snapshot of the current state's probe pixels, and any
+    change sends the frame through full processing, so transitions out
+    of play are seen within a frame of the border changing and at most
+    stride frames late otherwise.
+    """
+
+    def __init__(
+        self,
+        state_pixels: CompiledStatePixels,
+        stride: int = CONSTANTS.STABLE_PLAY_SAMPLE_STRIDE,
+        lookback: int = CONSTANTS.STATE_LOOKBACK_FRAMES,
+        change_threshold: int = CONSTANTS.PROBE_PIXEL_CHANGE_THRESHOLD,
+    ):
+        if stride < 1:
+            raise RuntimeError(f"sample stride must be at least 1: {stride}")
+        self.state_pixels = state_pixels
+        self.stride = stride
+        self.lookback = lookback
+        self.change_threshold = change_threshold
+        self.processed_frames = 0
+        self.skipped_frames = 0
+        self._frames_since_processed = 0
+        self._snapshot_state: Optional[GameState] = None
+        self._snapshot_ys: NDArray = state_pixels.ys[:0]
+        self._snapshot_xs: NDArray = state_pixels.xs[:0]
+        self._snapshot: Optional[NDArray] = None
+
+    def __repr__(self):
+        return (
+            "AdaptiveFrameSampler("
+            f"stride:{self.stride}, "
+            f"processed_frames:{self.processed_frames}, "
+            f"skipped_frames:{self.skipped_frames}"
+            ")"
+        )
+
+    def is_stable(self, v: VideoProcessingState) -> bool:
+        return (
+            v.current_state in PLAY_STATES
+            and v.state_frame_count >= self.lookback
+            and not v.play_metadata_missing()
+            and v.metadata_title is not None
+            and v.ocr_song_title is not None
+        )
+
+    def _probes_changed(self, frame: NDArray) -> bool:
+        if self._snapshot is None:
+            return True
+        samples = frame[self._snapshot_ys, self._snapshot_xs, 0:3].astype(numpy.int16)
+        return bool(
+            numpy.abs(samples - self._snapshot).max(initial=0) > self.change_threshold
+        )
+
+    def should_process(self, frame: NDArray, v: VideoProcessingState) -> bool:
+        if self.stride > 1 and self.is_stable(v):
+            if (
+                self._frames_since_processed + 1 < self.stride
+                and not self._probes_changed(frame)
+            ):
+                self._frames_since_processed += 1
+                self.skipped_frames += 1
+                return False
+        return True
+
+    def mark_processed(self, frame: NDArray, state: GameState) -> int:
+        """
+        Records a fully processed frame and returns how many
+        video frames it stands for, including the skipped ones.
+        """
+        if state != self._snapshot_state:
+            self._snapshot_state = state
+            self._snapshot_ys, self._snapshot_xs = self.state_pixels.state_coordinates(
+                state
+            )
+        self._snapshot = frame[self._snapshot_ys, self._snapshot_xs, 0:3].astype(
+            numpy.int16
+        )
+        frames = self._frames_since_processed + 1
+        self._frames_since_processed = 0
+        self.processed_frames += 1
+        return frames
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import os
+import hashlib
 import logging
 from pathlib import Path
 from typing import Callable
@@ -43,6 +44,25 @@ def read_from_ndarray_zip_file(ndarray_zip_file: Path) -> NDArray:
     return numpy.load(ndarray_zip_file)["frame_slice"]
 
 
+def image_content_hash(image: NDArray) -> str:
+    """Hashes an image's pixels, so identical images share a hash however they're encoded."""
+    pixels = numpy.ascontiguousarray(image)
+    digest = hashlib.sha256(f"{pixels.shape}{pixels.dtype}".encode())
+    digest.update(pixels.data)
+    return digest.hexdigest()
+
+
+def encode_png(image: NDArray) -> bytes:
+    encoded, png = cv.imencode(".png", image)
+    if not encoded:
+        raise RuntimeError(f"Could not encode {image.shape} image as png")
+    return png.tobytes()
+
+
+def decode_png(png: bytes) -> NDArray:
+    return cv.imdecode(numpy.frombuffer(png, dtype=numpy.uint8), cv.IMREAD_UNCHANGED)
+
+
 def dump_to_png(frame: NDArray, label: str, frame_id: int) -> Path:
     current_date = datetime.now().strftime("%Y%m%d%H%m%s")
     write_dir = DATA_DIR / Path("png-dumps")
@@ -320,19 +340,31 @@ def check_pixel_color_in_frame(
     else:
         result = False
 
-    output = "frame pixel: {}, b:{}:{} g:{}:{} r:{}:{}".format(
-        pixel,
-        frame[pixel.y][pixel.x][0],
-        blue_match,
-        frame[pixel.y][pixel.x][1],
-        green_match,
-        frame[pixel.y][pixel.x][2],
-        red_match,
-    )
-    log.debug(output)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            "frame pixel: %s, b:%s:%s g:%s:%s r:%s:%s",
+            pixel,
+            frame[pixel.y][pixel.x][0],
+            blue_match,
+            frame[pixel.y][pixel.x][1],
+            green_match,
+            frame[pixel.y][pixel.x][2],
+            red_match,
+        )
     return result
 
 
+def get_number_area_bounds(area: NumberArea) -> tuple[int, int, int, int]:
+    """Returns the top_left_y, top_left_x, bottom_right_y, bottom_right_x an area reads."""
+    kerning_offset = max(area.kerning_offset) if area.kerning_offset else 0
+    return (
+        area.start_y,
+        area.start_x,
+        area.start_y + area.rows * area.y_offset,
+        area.start_x + area.digits_per_row * area.x_offset + kerning_offset,
+    )
+
+
 def get_numbers_from_area(
     frame: NDArray,
     area: NumberArea,
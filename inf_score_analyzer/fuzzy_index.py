@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+import time
+import heapq
+import random
+import logging
+from collections import Counter
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+import polyleven  # type: ignore
+
+# local imports
+from . import constants as CONSTANTS
+
+if TYPE_CHECKING:
+    from .song_reference import SongReference
+
+log = logging.getLogger(__name__)
+
+# a node is its word and its children keyed by their distance to it
+BKNode = tuple[str, dict[int, "BKNode"]]
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over levenshtein distance. Every child sits at
+    a known distance from its parent, so by the triangle inequality a
+    search within some radius of a query only descends into children
+    whose edge is within that radius of the parent's own distance.
+    Used for unbounded nearest lookups, where the radius shrinks as
+    closer words are found.
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.root: Optional[BKNode] = None
+        self.size = 0
+        # sorted so the same words always build the same tree
+        for word in sorted(set(words)):
+            self.add(word)
+
+    def __repr__(self):
+        return f"BKTree(words:{self.size})"
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, word: str) -> None:
+        if self.root is None:
+            self.root = (word, {})
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = polyleven.levenshtein(word, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                self.size += 1
+                return
+            node = child
+
+    def nearest(
+        self, query: str, k: int = 1, max_distance: Optional[int] = None
+    ) -> list[tuple[int, str]]:
+        """
+        The k words closest to query, closest first, optionally only
+        those within max_distance. The search radius shrinks to the
+        k-th best distance found so far, so without a bound this is
+        still far cheaper than scoring every word.
+        """
+        if self.root is None or k < 1:
+            return []
+        radius: float = max_distance if max_distance is not None else float("inf")
+        # max heap of the k best as (-distance, word)
+        best: list[tuple[int, str]] = []
+        nodes = [self.root]
+        while nodes:
+            word, children = nodes.pop()
+            distance = polyleven.levenshtein(query, word)
+            if distance <= radius:
+                heapq.heappush(best, (-distance, word))
+                if len(best) > k:
+                    heapq.heappop(best)
+                if len(best) == k:
+                    radius = min(radius, -best[0][0])
+            for edge, child in children.items():
+                if distance - radius <= edge <= distance + radius:
+                    nodes.append(child)
+        return sorted((-distance, word) for distance, word in best)
+
+
+class NGramIndex:
+    """
+    Inverted index from character bigrams to the words holding them.
+    One edit changes at most two of a word's bigrams, so a word within
+    max_distance of a query shares all but 2 * max_distance of the
+    query's bigrams. Only words passing that count are scored, with
+    polyleven stopping early past max_distance.
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.words: list[str] = sorted(set(words))
+        self.postings: dict[str, list[int]] = {}
+        for word_number, word in enumerate(self.words):
+            for ngram in self.ngrams(word):
+                self.postings.setdefault(ngram, []).append(word_number)
+
+    def __repr__(self):
+        return f"NGramIndex(words:{len(self.words)}, ngrams:{len(self.postings)})"
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @staticmethod
+    def ngrams(word: str) -> set[str]:
+        # padded so the first and last characters count as much as the rest
+        padded = f" {word} "
+        return {first + second for first, second in zip(padded, padded[1:])}
+
+    def search(self, query: str, max_distance: int) -> list[tuple[int, str]]:
+        """Every word within max_distance of query, closest first."""
+        query_ngrams = self.ngrams(query)
+        needed = len(query_ngrams) - 2 * max_distance
+        candidates: Iterable[int]
+        if needed < 1:
+            # too short to filter on, any word could be in range
+            candidates = range(len(self.words))
+        else:
+            shared: Counter[int] = Counter()
+            for ngram in query_ngrams:
+                shared.update(self.postings.get(ngram, []))
+            candidates = [
+                word_number for word_number, count in shared.items() if count >= needed
+            ]
+        found: list[tuple[int, str]] = []
+        for word_number in candidates:
+            word = self.words[word_number]
+            distance = polyleven.levenshtein(query, word, max_distance)
+            if distance <= max_distance:
+                found.append((distance, word))
+        return sorted(found)
+
+
+def max_edit_distance(text: str) -> int:
+    """How many OCR errors a fuzzy match of text tolerates."""
+    return int(len(text) * CONSTANTS.FUZZY_MATCH_MAX_DISTANCE_RATIO)
+
+
+def closest_matches(
+    ngram_index: NGramIndex,
+    query: str,
+    max_distance: Optional[int] = None,
+    accept: Optional[Callable[[str], bool]] = None,
+) -> list[str]:
+    """
+    The words tied for closest to query, within max_distance (by
+    default max_edit_distance of query) and passing accept if given.
+    Empty when nothing is in range.
+    """
+    if max_distance is None:
+        max_distance = max_edit_distance(query)
+    found = [
+        (distance, word)
+        for distance, word in ngram_index.search(query, max_distance)
+        if accept is None or accept(word)
+    ]
+    if not found:
+        return []
+    lowest_distance = found[0][0]
+    return [word for distance, word in found if distance == lowest_distance]
+
+
+def _linear_nearest(query: str, words: Iterable[str]) -> list[tuple[int, str]]:
+    # the scan SongReference did before the genre index
+    scores = sorted((polyleven.levenshtein(query, word), word) for word in words)
+    return scores[0:1]
+
+
+def _add_ocr_noise(text: str, edits: int, picker: random.Random) -> str:
+    characters = list(text)
+    for _ in range(edits):
+        position = picker.randrange(len(characters) + 1)
+        edit = picker.choice(["insert", "delete", "replace"])
+        if edit == "insert" or not characters:
+            characters.insert(position, picker.choice("il1|oO0 "))
+        elif position < len(characters):
+            if edit == "delete":
+                del characters[position]
+            else:
+                characters[position] = picker.choice("il1|oO0 ")
+    return "".join(characters)
+
+
+def benchmark_fuzzy_index(song_reference: "SongReference", lookups: int = 2000) -> None:
+    """
+    Compares nearest genre lookups by linear scan against the BK-tree,
+    bounded title lookups by linear scan against the bigram index, and
+    how many noisy OCR titles the exact and fuzzy lookups resolve.
+    """
+    genres = list(song_reference.by_genre)
+    titles = list(song_reference.by_title)
+    start = time.perf_counter()
+    genre_index = BKTree(genres)
+    title_index = NGramIndex(titles)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(
+        f"{len(genre_index)} genres, {len(title_index)} titles, "
+        f"indexed in {build_ms:.1f}ms"
+    )
+    picker = random.Random(0)
+    noisy_genres = [
+        _add_ocr_noise(genre, picker.randint(0, 3), picker)
+        for genre in picker.choices(genres, k=lookups)
+    ]
+    timings = {}
+    lookups_by_name: list[tuple[str, Callable[[str], list[tuple[int, str]]]]] = [
+        ("scan", lambda genre: _linear_nearest(genre, genres)),
+        ("bktree", genre_index.nearest),
+    ]
+    for name, lookup in lookups_by_name:
+        start = time.perf_counter()
+        for genre in noisy_genres:
+            lookup(genre)
+        timings[name] = lookups / (time.perf_counter() - start)
+    print(
+        f"nearest genre: scan {timings['scan']:.0f}/s, "
+        f"bktree {timings['bktree']:.0f}/s"
+    )
+    noisy_titles = [
+        (title, _add_ocr_noise(title, picker.randint(1, 2), picker))
+        for title in picker.choices(titles, k=lookups)
+    ]
+    exact_hits = sum(
+        1
+        for title, noisy_title in noisy_titles
+        if song_reference.by_title.get(noisy_title) == song_reference.by_title[title]
+    )
+    start = time.perf_counter()
+    fuzzy_hits = 0
+    for title, noisy_title in noisy_titles:
+        if closest_matches(title_index, noisy_title) == [title]:
+            fuzzy_hits += 1
+    fuzzy_rate = lookups / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _, noisy_title in noisy_titles:
+        max_distance = max_edit_distance(noisy_title)
+        [
+            title
+            for title in titles
+            if polyleven.levenshtein(noisy_title, title, max_distance) <= max_distance
+        ]
+    scan_rate = lookups / (time.perf_counter() - start)
+    print(
+        f"noisy titles resolved: exact {exact_hits}/{lookups}, "
+        f"fuzzy {fuzzy_hits}/{lookups}; "
+        f"bounded title lookups: scan {scan_rate:.0f}/s, ngrams {fuzzy_rate:.0f}/s"
+    )
+
+
+if __name__ == "__main__":
+    from . import sqlite_client
+    from .benchmark_fixtures import synthetic_song_reference
+
+    if CONSTANTS.APP_DB.exists() and sqlite_client.has_song_metadata():
+        benchmark_fuzzy_index(sqlite_client.load_song_reference())
+    else:
+        benchmark_fuzzy_index(synthetic_song_reference())
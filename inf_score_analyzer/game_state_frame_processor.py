@@ -1,25 +1,98 @@
 #!/usr/bin/env python3
+import sys
+import timeit
 import logging
+from typing import Union
 
 # library imports
+import numpy  # type: ignore
+import cv2 as cv  # type: ignore
 from numpy.typing import NDArray  # type: ignore
 
 # local imports
 from . import constants as CONSTANTS
-from .local_dataclasses import GameStatePixel, GameState
+from .local_dataclasses import GameStatePixel, GameState, CompiledStatePixels
 from .frame_utilities import check_pixel_color_in_frame
 
 
 log = logging.getLogger(__name__)
 
+STATE_PIXEL_TOLERANCE = 20
+
+
+def compile_state_pixels(
+    pixels: list[GameStatePixel], tolerance: int = STATE_PIXEL_TOLERANCE
+) -> CompiledStatePixels:
+    """
+    Precomputes the coordinates and the allowed color range of every
+    probe pixel. A negative channel value in a GameStatePixel matches
+    any value for that channel, same as check_pixel_color_in_frame.
+    """
+    pixels_by_state: dict[GameState, list[GameStatePixel]] = {}
+    for state_pixel in pixels:
+        if state_pixel.state not in pixels_by_state:
+            pixels_by_state[state_pixel.state] = []
+        pixels_by_state[state_pixel.state].append(state_pixel)
+
+    states: list[GameState] = []
+    state_starts: list[int] = []
+    ys: list[int] = []
+    xs: list[int] = []
+    min_bgr: list[tuple[int, ...]] = []
+    max_bgr: list[tuple[int, ...]] = []
+    for state, state_pixels in pixels_by_state.items():
+        states.append(state)
+        state_starts.append(len(ys))
+        for state_pixel in state_pixels:
+            bgr = (state_pixel.b, state_pixel.g, state_pixel.r)
+            ys.append(state_pixel.y)
+            xs.append(state_pixel.x)
+            min_bgr.append(tuple(c - tolerance if c >= 0 else 0 for c in bgr))
+            max_bgr.append(tuple(c + tolerance if c >= 0 else 255 for c in bgr))
+    return CompiledStatePixels(
+        states=states,
+        state_starts=numpy.array(state_starts, dtype=numpy.intp),
+        ys=numpy.array(ys, dtype=numpy.intp),
+        xs=numpy.array(xs, dtype=numpy.intp),
+        min_bgr=numpy.array(min_bgr, dtype=numpy.int16).reshape(-1, 3),
+        max_bgr=numpy.array(max_bgr, dtype=numpy.int16).reshape(-1, 3),
+    )
+
 
 def get_game_state_from_frame(
+    frame: NDArray, pixels: Union[list[GameStatePixel], CompiledStatePixels]
+) -> GameState:
+    """
+    Returns the first state, in the order states appear in the pixel list,
+    whose probe pixels all match the frame, or LOADING if none do.
+    Callers checking every video frame should pass pixels already
+    compiled with compile_state_pixels.
+    """
+    if not isinstance(pixels, CompiledStatePixels):
+        pixels = compile_state_pixels(pixels)
+    if not pixels.states:
+        return GameState.LOADING
+    samples = frame[pixels.ys, pixels.xs, 0:3]
+    pixel_matches = numpy.logical_and(
+        samples >= pixels.min_bgr, samples <= pixels.max_bgr
+    ).all(axis=1)
+    state_matches = numpy.logical_and.reduceat(pixel_matches, pixels.state_starts)
+    matched_states = numpy.flatnonzero(state_matches)
+    if matched_states.size:
+        return pixels.states[matched_states[0]]
+    return GameState.LOADING
+
+
+def _get_game_state_from_frame_per_pixel(
     frame: NDArray, pixels: list[GameStatePixel]
 ) -> GameState:
+    """
+    The original pixel-by-pixel classifier, kept as the
+    baseline for benchmark_state_classifier.
+    """
     active_states: dict[GameState, set] = {}
     for state_pixel in pixels:
         does_color_match: bool = check_pixel_color_in_frame(frame, state_pixel)
-        # log.debug(f"checking {state_pixel}: {does_color_match}")
         if state_pixel.state not in active_states:
             active_states[state_pixel.state] = set()
         active_states[state_pixel.state].add(does_color_match)
@@ -27,3 +100,40 @@ def get_game_state_from_frame(
         if all_pixels_match == CONSTANTS.ALL_TRUE:
             return GameState(state_name)
     return GameState.LOADING
+
+
+def benchmark_state_classifier(
+    frame_files: list[str], pixels: list[GameStatePixel], iterations: int = 2000
+) -> None:
+    compiled_pixels = compile_state_pixels(pixels)
+    for frame_file in frame_files:
+        frame = cv.imread(frame_file)
+        per_pixel_state = _get_game_state_from_frame_per_pixel(frame, pixels)
+        compiled_state = get_game_state_from_frame(frame, compiled_pixels)
+        if per_pixel_state != compiled_state:
+            raise RuntimeError(
+                f"{frame_file}: classifiers disagree, "
+                f"{per_pixel_state} != {compiled_state}"
+            )
+        per_pixel_seconds = timeit.timeit(
+            lambda: _get_game_state_from_frame_per_pixel(frame, pixels),
+            number=iterations,
+        )
+        compiled_seconds = timeit.timeit(
+            lambda: get_game_state_from_frame(frame, compiled_pixels),
+            number=iterations,
+        )
+        per_pixel_us = per_pixel_seconds / iterations * 1e6
+        compiled_us = compiled_seconds / iterations * 1e6
+        print(
+            f"{frame_file}: {compiled_state.name} "
+            f"per-pixel {per_pixel_us:.1f}us/frame "
+            f"compiled {compiled_us:.1f}us/frame "
+            f"({per_pixel_us / compiled_us:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    from .game_state_pixels import ALL_STATE_PIXELS
+
+    benchmark_state_classifier(sys.argv[1:], ALL_STATE_PIXELS)
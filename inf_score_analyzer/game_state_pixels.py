@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
+import json
+import logging
+from pathlib import Path
+
+from . import constants as CONSTANTS
 from .local_dataclasses import GameState, GameStatePixel
 
+log = logging.getLogger(__name__)
+
 P1_SCORE_MIDDLE = GameStatePixel(
     state=GameState.P1_SCORE, name="good_middle_g", y=852, x=300, b=-1, g=182, r=240
 )
@@ -123,5 +130,87 @@ ALL_STATE_PIXELS: list[GameStatePixel] = [
     P2_SP_PLAY_AREA_BORDER,
     SONG_SELECT_MUSIC_UNDERLINE,
     SONG_SELECT_SCORE_DATA,
-    SONG_SELECT_MUSIC_UNDERLINE,
 ]
+
+
+def _constrained_channels(state_pixel: GameStatePixel) -> int:
+    return sum(
+        1 for channel in (state_pixel.b, state_pixel.g, state_pixel.r) if channel >= 0
+    )
+
+
+def order_state_pixels(pixels: list[GameStatePixel]) -> list[GameStatePixel]:
+    """
+    Drops repeated probes and sorts each state's probes so the ones
+    constraining the most color channels come first. States keep the
+    order they first appear in, since the first fully matching state wins.
+    """
+    state_order: dict[GameState, int] = {}
+    seen: set[tuple[GameState, int, int, int, int, int]] = set()
+    unique_pixels: list[GameStatePixel] = []
+    for state_pixel in pixels:
+        key = (
+            state_pixel.state,
+            state_pixel.y,
+            state_pixel.x,
+            state_pixel.b,
+            state_pixel.g,
+            state_pixel.r,
+        )
+        if key in seen:
+            log.debug(f"Skipping duplicate state pixel {state_pixel}")
+            continue
+        seen.add(key)
+        state_order.setdefault(state_pixel.state, len(state_order))
+        unique_pixels.append(state_pixel)
+    return sorted(
+        unique_pixels,
+        key=lambda p: (state_order[p.state], -_constrained_channels(p)),
+    )
+
+
+def load_state_pixels(
+    pixel_file: Path = CONSTANTS.STATE_PIXEL_CONFIG_FILE,
+) -> list[GameStatePixel]:
+    """
+    Reads state pixel definitions from a json list of
+    {state, name, y, x, b, g, r} objects. Entries naming a state
+    this version doesn't know about are skipped.
+    """
+    log.info(f"reading {pixel_file}")
+    with open(pixel_file, "rt") as reader:
+        pixel_definitions = json.load(reader)
+    pixels: list[GameStatePixel] = []
+    for definition in pixel_definitions:
+        try:
+            state = GameState(definition["state"])
+        except ValueError:
+            log.warning(f"Unknown game state in {pixel_file}: {definition}")
+            continue
+        pixels.append(
+            GameStatePixel(
+                state=state,
+                name=definition["name"],
+                y=int(definition["y"]),
+                x=int(definition["x"]),
+                b=int(definition["b"]),
+                g=int(definition["g"]),
+                r=int(definition["r"]),
+            )
+        )
+    if not pixels:
+        raise RuntimeError(f"No usable state pixels in {pixel_file}")
+    return order_state_pixels(pixels)
+
+
+def read_state_pixels() -> list[GameStatePixel]:
+    """
+    Returns the configured state pixels, falling back to
+    the built in HD layout if the config file is missing.
+    """
+    if CONSTANTS.STATE_PIXEL_CONFIG_FILE.exists():
+        return load_state_pixels(CONSTANTS.STATE_PIXEL_CONFIG_FILE)
+    log.warning(
+        f"{CONSTANTS.STATE_PIXEL_CONFIG_FILE} not found, using built in state pixels"
+    )
+    return order_state_pixels(ALL_STATE_PIXELS)
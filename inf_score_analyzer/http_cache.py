@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+import requests  # type: ignore
+
+from . import constants as CONSTANTS
+from .local_dataclasses import CachedResponse
+
+log = logging.getLogger(__name__)
+
+# per thread since a requests session isn't safe to share between threads
+_sessions = threading.local()
+
+
+def get_session() -> requests.Session:
+    """Returns this thread's keep-alive session, opening it on first use."""
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = requests.Session()
+        _sessions.session = session
+    return session
+
+
+def _cache_paths(url: str, cache_dir: Path) -> tuple[Path, Path]:
+    key = hashlib.sha256(url.encode()).hexdigest()
+    return cache_dir / Path(f"{key}.body"), cache_dir / Path(f"{key}.json")
+
+
+def read_cached(url: str, cache_dir: Optional[Path] = None) -> Optional[CachedResponse]:
+    """Returns the last response stored for url, or None if there isn't one."""
+    body_path, headers_path = _cache_paths(url, cache_dir or CONSTANTS.HTTP_CACHE_DIR)
+    try:
+        with open(headers_path, "rt") as headers_reader:
+            headers = json.load(headers_reader)
+        with open(body_path, "rb") as body_reader:
+            content = body_reader.read()
+    except (OSError, ValueError):
+        return None
+    return CachedResponse(
+        url, content, False, headers.get("etag"), headers.get("last_modified")
+    )
+
+
+def _write_cached(response: CachedResponse, cache_dir: Path) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+    body_path, headers_path = _cache_paths(response.url, cache_dir)
+    headers = {
+        "url": response.url,
+        "etag": response.etag,
+        "last_modified": response.last_modified,
+    }
+    # the body goes first so the headers never describe a body that
+    # isn't on disk yet
+    for path, data in [
+        (body_path, response.content),
+        (headers_path, json.dumps(headers).encode()),
+    ]:
+        partial_path = path.with_suffix(f"{path.suffix}.partial")
+        with open(partial_path, "wb") as writer:
+            writer.write(data)
+        os.replace(partial_path, path)
+
+
+def fetch(
+    url: str,
+    timeout: float = CONSTANTS.HTTP_TIMEOUT_SECONDS,
+    cache_dir: Optional[Path] = None,
+) -> CachedResponse:
+    """
+    GETs url, revalidating a cached copy with If-None-Match and
+    If-Modified-Since. A 304 returns the cached body with modified
+    False, so an unchanged source costs one small round trip.
+    """
+    cache_dir = cache_dir or CONSTANTS.HTTP_CACHE_DIR
+    cached = read_cached(url, cache_dir)
+    request_headers = {}
+    if cached is not None:
+        if cached.etag:
+            request_headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            request_headers["If-Modified-Since"] = cached.last_modified
+    response = get_session().get(url, headers=request_headers, timeout=timeout)
+    if response.status_code == 304 and cached is not None:
+        log.info(f"{url} not modified since {cached.last_modified or cached.etag}")
+        return cached
+    if response.status_code != 200:
+        raise RuntimeError(
+            f"could not download {url}: {response.status_code} {response.text[:200]}"
+        )
+    log.info(f"downloaded {url}, {len(response.content)} bytes")
+    fetched = CachedResponse(
+        url,
+        response.content,
+        True,
+        response.headers.get("ETag"),
+        response.headers.get("Last-Modified"),
+    )
+    _write_cached(fetched, cache_dir)
+    return fetched
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import re
 import sys
+import json
 import time
 import logging
 from typing import Any
@@ -10,6 +11,7 @@ from datetime import datetime
 
 import requests  # type: ignore
 
+from . import http_cache
 from . import sqlite_client
 from . import constants as CONSTANTS
 from .local_dataclasses import ClearType
@@ -144,21 +146,14 @@ def export_to_kamaitachi(session_id: str) -> None:
         log.info(f"No DP scores found for session {session_id}")
 
 
-def download_kamaitachi_song_list() -> dict[str, Any]:
+def download_kamaitachi_song_list() -> list[dict[str, Any]]:
     log.info("Downloading kamaitachi song list")
     kamaitachi_json_file = CONSTANTS.DATA_DIR / Path("kamaitachi-iidx-songs.json")
-    with open(kamaitachi_json_file, "wt") as json_writer:
-        song_list_json_response = requests.get(CONSTANTS.KAMAITACHI_SONG_LIST_URL)
-        if song_list_json_response.status_code == 200:
-            json_writer.write(song_list_json_response.text)
-            return song_list_json_response.json()
-        else:
-            raise RuntimeError(
-                f"could not download kamaitachi source from "
-                "{CONSTANTS.KAMAITACHI_SONG_LIST_URL} "
-                f"code: {song_list_json_response.status_code} "
-                f"error: {song_list_json_response.text}"
-            )
+    song_list_response = http_cache.fetch(CONSTANTS.KAMAITACHI_SONG_LIST_URL)
+    if song_list_response.modified or not kamaitachi_json_file.exists():
+        with open(kamaitachi_json_file, "wb") as json_writer:
+            json_writer.write(song_list_response.content)
+    return json.loads(song_list_response.content)
 
 
 def normalize_textage_to_kamaitachi(
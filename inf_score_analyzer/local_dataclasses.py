@@ -3,7 +3,7 @@ from decimal import Decimal
 from enum import Enum
 from concurrent.futures import Future
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Any, Optional
 
 from numpy.typing import NDArray  # type: ignore
 
@@ -55,6 +55,26 @@ class ImportCsvType(Enum):
     INF_SCORE_ANALYZER = 0
 
 
+class CaptureOverflowPolicy(Enum):
+    DROP_OLDEST = "drop_oldest"
+    BLOCK = "block"
+
+
+class ScreengrabRetention(Enum):
+    NONE = "none"
+    CROPS = "crops"
+    FULL = "full"
+
+
+class ScreenshotStatus(Enum):
+    WRITTEN = "written"
+    UNREADABLE = "unreadable"
+    DUPLICATE = "duplicate"
+    # never stored, so the screenshot is read again by the next import,
+    # after a metadata refresh may have added its song
+    FAILED = "failed"
+
+
 @dataclass
 class GameStatePixel:
     state: GameState = GameState.UNKNOWN
@@ -66,6 +86,35 @@ class GameStatePixel:
     r: int = 0
 
 
+@dataclass
+class CompiledStatePixels:
+    """
+    GameStatePixel lists flattened into arrays, grouped by state
+    in the order each state first appears, so every probe pixel
+    can be checked in one pass over the frame.
+    """
+
+    states: list[GameState]
+    state_starts: NDArray
+    ys: NDArray
+    xs: NDArray
+    min_bgr: NDArray
+    max_bgr: NDArray
+
+    def state_coordinates(self, state: GameState) -> tuple[NDArray, NDArray]:
+        """Returns the ys and xs of the probe pixels for a single state."""
+        if state not in self.states:
+            return self.ys[:0], self.xs[:0]
+        index = self.states.index(state)
+        start = self.state_starts[index]
+        end = (
+            self.state_starts[index + 1]
+            if index + 1 < len(self.states)
+            else len(self.ys)
+        )
+        return self.ys[start:end], self.xs[start:end]
+
+
 @dataclass
 class PlayMetadata:
     difficulty: Difficulty
@@ -273,6 +322,55 @@ class OCRGenres:
     jp_genre: str
 
 
+@dataclass
+class ScreenshotFingerprint:
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    content: bytes
+    # False when the server said the cached copy is still current
+    modified: bool
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+@dataclass
+class RemoteMetadata:
+    """What startup fetched, with None for anything that couldn't be."""
+
+    song_metadata: Optional[dict[str, SongMetadata]] = None
+    kamaitachi_song_list: Optional[list[dict[str, Any]]] = None
+    sp12_table: Optional[dict[tuple[str, Difficulty], dict[ClearType, str]]] = None
+
+
+@dataclass
+class SongMetadataChanges:
+    """What a delta refresh applied to the app db's song tables."""
+
+    songs_inserted: int = 0
+    songs_updated: int = 0
+    songs_deleted: int = 0
+    charts_inserted: int = 0
+    charts_updated: int = 0
+    charts_deleted: int = 0
+    titles_changed: bool = False
+
+
+@dataclass
+class SharedFrameRef:
+    """Names one slot of a shared memory frame arena, for passing to OCR workers."""
+
+    shared_memory_name: str
+    slot: int
+    frame_shape: tuple[int, int, int]
+
+
 @dataclass
 class ScoreDBRecord:
     session_uuid: str
@@ -281,12 +379,21 @@ class ScoreDBRecord:
     difficulty: Difficulty = Difficulty.UNKNOWN
     ocr_titles: Optional[OCRSongTitles] = None
     score_frame: Optional[NDArray] = None
+    # what gets stored of the frame, by name, see retain_score_frame
+    screengrab: Optional[dict[str, NDArray]] = None
+
+
+@dataclass
+class ScoreWriteResult:
+    db_record: ScoreDBRecord
+    score_uuid: Optional[str] = None
+    error: Optional[str] = None
 
 
 @dataclass
 class VideoProcessingState:
     score: Optional[Score] = None
-    score_frame: Optional[NDArray] = None
+    score_screengrab: Optional[dict[str, NDArray]] = None
     difficulty: Optional[Difficulty] = None
     level: Optional[int] = None
     lifebar_type: Optional[str] = None
@@ -334,7 +441,7 @@ class VideoProcessingState:
     def returned_to_song_select_before_writing(self) -> bool:
         return (
             self.score is not None
-            or self.score_frame is not None
+            or self.score_screengrab is not None
             or self.difficulty is not None
             or self.level is not None
             or self.lifebar_type is not None
@@ -358,10 +465,14 @@ class VideoProcessingState:
             or self.is_double is None
         )
 
-    def update_current_state(self, state: GameState) -> None:
+    def update_current_state(self, state: GameState, frames: int = 1) -> None:
+        """
+        frames is how many video frames this state check covers,
+        which is more than one when frames were skipped since the last check.
+        """
         self.previous_state = self.current_state
         if state == self.current_state:
-            self.state_frame_count += 1
+            self.state_frame_count += frames
         else:
             self.current_state = state
             self.state_frame_count = 1
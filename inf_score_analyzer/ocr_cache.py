@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+import dataclasses
+import multiprocessing.util
+from typing import Callable, TypeVar
+
+# library imports
+import numpy  # type: ignore
+from numpy.typing import NDArray  # type: ignore
+
+# local imports
+from . import sqlite_client
+from . import constants as CONSTANTS
+from .local_dataclasses import OCRSongTitles, OCRGenres
+
+log = logging.getLogger(__name__)
+
+OCRResult = TypeVar("OCRResult", OCRSongTitles, OCRGenres)
+
+# per process, worker processes keep and report their own counts
+_hits = 0
+_misses = 0
+# hits not yet written back, as crop hash to (hits, last used ns), so a
+# cache hit doesn't need a write transaction of its own
+_pending_touches: dict[str, tuple[int, int]] = {}
+_pending_touches_lock = threading.Lock()
+# the process the pending touches belong to
+_pending_touches_pid = 0
+
+
+def crop_hash(reader_name: str, crops: list[NDArray]) -> str:
+    """
+    Exact hash of the preprocessed crops an OCR reader is about to
+    read. The reader name is part of the key since readers scale and
+    configure tesseract differently for the same pixels.
+    """
+    digest = hashlib.sha256(reader_name.encode())
+    for crop in crops:
+        pixels = numpy.ascontiguousarray(crop)
+        digest.update(f"{pixels.shape}{pixels.dtype}".encode())
+        digest.update(pixels.data)
+    return digest.hexdigest()
+
+
+def hit_rate_summary() -> str:
+    lookups = _hits + _misses
+    hit_rate = _hits / lookups * 100 if lookups else 0.0
+    return f"OCR cache: {_hits} hits, {_misses} misses, {hit_rate:.1f}% hit rate"
+
+
+def _count_lookup(hit: bool) -> None:
+    global _hits, _misses
+    if hit:
+        _hits += 1
+    else:
+        _misses += 1
+    if (_hits + _misses) % CONSTANTS.OCR_CACHE_LOG_EVERY == 0:
+        log.info(hit_rate_summary())
+
+
+def _touch(key: str) -> None:
+    global _pending_touches, _pending_touches_pid
+    with _pending_touches_lock:
+        if _pending_touches_pid != os.getpid():
+            # a forked worker starts without its parent's touches, and
+            # flushes its own on exit, which atexit doesn't do for workers
+            _pending_touches = {}
+            _pending_touches_pid = os.getpid()
+            multiprocessing.util.Finalize(None, flush_touches, exitpriority=1)
+        hits, _ = _pending_touches.get(key, (0, 0))
+        _pending_touches[key] = (hits + 1, time.time_ns())
+        flush = len(_pending_touches) >= CONSTANTS.OCR_CACHE_TOUCH_BATCH
+    if flush:
+        flush_touches()
+
+
+def flush_touches() -> None:
+    """
+    Writes the pending hit counts and last used times in one
+    transaction. Touches lost to a crash only make the eviction order
+    slightly stale.
+    """
+    global _pending_touches
+    with _pending_touches_lock:
+        touches, _pending_touches = _pending_touches, {}
+    if _pending_touches_pid != os.getpid():
+        # inherited from the parent, which flushes them itself
+        return
+    if not touches or not CONSTANTS.USER_DB.exists():
+        return
+    try:
+        sqlite_client.touch_ocr_cache(
+            [(hits, last_used_ns, key) for key, (hits, last_used_ns) in touches.items()]
+        )
+    except sqlite3.Error as e:
+        log.warning(f"Could not update OCR cache hits: {e}")
+
+
+def cached_ocr(
+    reader_name: str,
+    crops: list[NDArray],
+    result_type: type[OCRResult],
+    read_crops: Callable[[], OCRResult],
+) -> OCRResult:
+    """
+    Returns the cached result for these crops, or calls read_crops and
+    caches what it returns. Cache errors, such as a locked database,
+    only cost the OCR call they would have saved, and nothing is cached
+    before the user database has been set up.
+    """
+    if not CONSTANTS.USER_DB.exists():
+        return read_crops()
+    key = crop_hash(reader_name, crops)
+    try:
+        cached = sqlite_client.read_ocr_cache(key)
+    except sqlite3.Error as e:
+        log.warning(f"Could not read OCR cache: {e}")
+        cached = None
+    if cached is not None and cached[0] == result_type.__name__:
+        _count_lookup(hit=True)
+        _touch(key)
+        result = result_type(**json.loads(cached[1]))
+        log.debug(f"{reader_name} OCR cache hit: {result}")
+        return result
+    _count_lookup(hit=False)
+    result = read_crops()
+    # eviction on write goes by last used time, so it has to be current
+    flush_touches()
+    try:
+        sqlite_client.write_ocr_cache(
+            key,
+            result_type.__name__,
+            json.dumps(dataclasses.asdict(result), ensure_ascii=False),
+            CONSTANTS.OCR_CACHE_MAX_ENTRIES,
+        )
+    except sqlite3.Error as e:
+        log.warning(f"Could not write OCR cache: {e}")
+    return result
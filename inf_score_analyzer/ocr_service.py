@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import time
+import ctypes
+import ctypes.util
+import logging
+import threading
+from typing import Optional
+
+# library imports
+import numpy  # type: ignore
+import cv2 as cv  # type: ignore
+import pytesseract  # type: ignore
+from numpy.typing import NDArray  # type: ignore
+
+# local imports
+from . import constants as CONSTANTS
+
+log = logging.getLogger(__name__)
+
+# tesseract's command line defaults to automatic page segmentation,
+# the library API defaults to a single block, so this is set explicitly
+PSM_AUTO = 3
+_PSM_CONFIG = re.compile(r"^\s*--psm\s+(\d+)\s*$")
+
+_libtesseract: Optional[ctypes.CDLL] = None
+_libtesseract_checked = False
+_libtesseract_lock = threading.Lock()
+_engines = threading.local()
+
+
+def _load_libtesseract() -> Optional[ctypes.CDLL]:
+    """
+    Loads the tesseract C API once per process,
+    returning None if it isn't installed.
+    """
+    global _libtesseract, _libtesseract_checked
+    with _libtesseract_lock:
+        if _libtesseract_checked:
+            return _libtesseract
+        _libtesseract_checked = True
+        library_name = ctypes.util.find_library("tesseract")
+        if library_name is None:
+            log.warning("libtesseract not found, running tesseract per OCR call")
+            return None
+        try:
+            library = ctypes.CDLL(library_name)
+            library.TessBaseAPICreate.restype = ctypes.c_void_p
+            library.TessBaseAPIInit3.argtypes = [
+                ctypes.c_void_p,
+                ctypes.c_char_p,
+                ctypes.c_char_p,
+            ]
+            library.TessBaseAPIInit3.restype = ctypes.c_int
+            library.TessBaseAPISetPageSegMode.argtypes = [ctypes.c_void_p, ctypes.c_int]
+            library.TessBaseAPISetImage.argtypes = [
+                ctypes.c_void_p,
+                ctypes.c_void_p,
+                ctypes.c_int,
+                ctypes.c_int,
+                ctypes.c_int,
+                ctypes.c_int,
+            ]
+            library.TessBaseAPIGetUTF8Text.argtypes = [ctypes.c_void_p]
+            library.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p
+            library.TessDeleteText.argtypes = [ctypes.c_void_p]
+            library.TessBaseAPIClear.argtypes = [ctypes.c_void_p]
+            library.TessBaseAPIDelete.argtypes = [ctypes.c_void_p]
+        except (OSError, AttributeError) as e:
+            log.warning(
+                f"Could not load {library_name}, running tesseract per call: {e}"
+            )
+            return None
+        log.info(f"Using {library_name} for OCR")
+        _libtesseract = library
+        return _libtesseract
+
+
+def _get_engine(lang: str) -> Optional[int]:
+    """
+    Returns this thread's tesseract handle for lang, creating and
+    loading its language model on first use. Handles are per thread
+    since one can't be used concurrently, and per process since they
+    don't survive a fork.
+    """
+    library = _load_libtesseract()
+    if library is None:
+        return None
+    if getattr(_engines, "pid", None) != os.getpid():
+        _engines.pid = os.getpid()
+        _engines.handles = {}
+    if lang not in _engines.handles:
+        handle = library.TessBaseAPICreate()
+        datapath = os.environ.get("TESSDATA_PREFIX")
+        if (
+            library.TessBaseAPIInit3(
+                handle, datapath.encode() if datapath else None, lang.encode()
+            )
+            != 0
+        ):
+            library.TessBaseAPIDelete(handle)
+            log.warning(f"Could not load tesseract {lang} model, using pytesseract")
+            handle = None
+        _engines.handles[lang] = handle
+    return _engines.handles[lang]
+
+
+def warm_up(langs: tuple[str, ...] = CONSTANTS.OCR_LANGUAGES) -> None:
+    """Loads the language models ahead of the first OCR call, for pool initializers."""
+    for lang in langs:
+        _get_engine(lang)
+
+
+def image_to_string(image: NDArray, lang: str = "eng", config: str = "") -> str:
+    """
+    Drop in for pytesseract.image_to_string on numpy images, reusing
+    a loaded engine instead of starting tesseract for every call.
+    Only --psm is understood in config; anything else falls back
+    to pytesseract.
+    """
+    psm = PSM_AUTO
+    if config:
+        psm_match = _PSM_CONFIG.match(config)
+        if psm_match is None:
+            return pytesseract.image_to_string(image, lang=lang, config=config)
+        psm = int(psm_match.group(1))
+    handle = _get_engine(lang)
+    if handle is None or _libtesseract is None:
+        return pytesseract.image_to_string(image, lang=lang, config=config)
+    pixels = numpy.ascontiguousarray(image, dtype=numpy.uint8)
+    height, width = pixels.shape[0:2]
+    bytes_per_pixel = 1 if pixels.ndim == 2 else pixels.shape[2]
+    library = _libtesseract
+    library.TessBaseAPISetPageSegMode(handle, psm)
+    library.TessBaseAPISetImage(
+        handle,
+        pixels.ctypes.data,
+        width,
+        height,
+        bytes_per_pixel,
+        width * bytes_per_pixel,
+    )
+    text_pointer = library.TessBaseAPIGetUTF8Text(handle)
+    try:
+        text = ctypes.string_at(text_pointer).decode("utf-8") if text_pointer else ""
+    finally:
+        if text_pointer:
+            library.TessDeleteText(text_pointer)
+        library.TessBaseAPIClear(handle)
+    return text
+
+
+def benchmark_score_ocr(score_files: list[str], iterations: int = 5) -> None:
+    """
+    Times the four title/artist OCR calls made per score screen,
+    running tesseract per call versus the loaded engines.
+    """
+    from .frame_utilities import get_rectanglular_subsection_from_frame
+
+    warm_up()
+    for score_file in score_files:
+        frame = cv.imread(score_file)
+        crops = [
+            get_rectanglular_subsection_from_frame(frame, 960, 550, 996, 1370),
+            get_rectanglular_subsection_from_frame(frame, 996, 550, 1030, 1370),
+        ]
+        timings = {}
+        for name, ocr_call in [
+            ("subprocess", pytesseract.image_to_string),
+            ("engine", image_to_string),
+        ]:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                texts = [
+                    str.strip(ocr_call(crop, lang=lang))
+                    for crop in crops
+                    for lang in CONSTANTS.OCR_LANGUAGES
+                ]
+            timings[name] = (time.perf_counter() - start) / iterations * 1000
+            print(f"{score_file}: {name} {texts}")
+        print(
+            f"{score_file}: subprocess {timings['subprocess']:.1f}ms/score "
+            f"engine {timings['engine']:.1f}ms/score "
+            f"({timings['subprocess'] / timings['engine']:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    benchmark_score_ocr(sys.argv[1:])
@@ -1,9 +1,8 @@
 #!/usr/bin/env python3
 import logging
-from typing import Tuple
-from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from concurrent.futures import Executor
 
-import pytesseract  # type: ignore
 from numpy.typing import NDArray  # type: ignore
 
 from .frame_utilities import (
@@ -15,10 +14,15 @@ from .frame_utilities import (
     polarize_area,
 )
 from . import constants as CONSTANTS
+from . import ocr_service
+from . import ocr_cache
+from . import frame_capture
+from .frame_capture import FrameRingBuffer
 from .local_dataclasses import (
     Point,
     Difficulty,
     OCRSongTitles,
+    SharedFrameRef,
     VideoProcessingState,
     PlayMetadata,
 )
@@ -154,9 +158,11 @@ def get_lifebar_percentage(frame: NDArray, left_side: bool, is_double: bool) ->
     )
 
 
-def get_ocr_song_title_from_play_frame(
-    frame: NDArray, left_side: bool, is_double: bool
-) -> OCRSongTitles:
+def crop_play_title_area(frame: NDArray, left_side: bool, is_double: bool) -> NDArray:
+    """
+    Copies the title and artist rows out of a play frame, so the OCR
+    reader can polarize them without touching the frame.
+    """
     # TODO: implement
     #    if not is_double:
     #        top_left_y = 36
@@ -177,38 +183,64 @@ def get_ocr_song_title_from_play_frame(
     #        song_title_bottom_right_y = 62
     #        artist_bottom_right_y = 87
     if left_side and not is_double:
-        top_left_y = 60
-        top_left_x = 734
-        bottom_right_x = 1500
-        song_title_bottom_right_y = 96
-        artist_bottom_right_y = 120
-    else:
-        raise RuntimeError("2p and dp not yet supported")
-    # TODO: extract this
-    polarized_frame = polarize_area(
-        frame, top_left_y, top_left_x, artist_bottom_right_y, bottom_right_x
+        return get_rectanglular_subsection_from_frame(
+            frame,
+            CONSTANTS.PLAY_TITLE_TOP_LEFT_Y,
+            CONSTANTS.PLAY_TITLE_TOP_LEFT_X,
+            CONSTANTS.PLAY_ARTIST_BOTTOM_RIGHT_Y,
+            CONSTANTS.PLAY_TITLE_BOTTOM_RIGHT_X,
+        ).copy()
+    raise RuntimeError("2p and dp not yet supported")
+
+
+def get_ocr_song_title_from_title_area(title_area: NDArray) -> OCRSongTitles:
+    """Reads a title area from crop_play_title_area, polarizing it in place."""
+    area_height, area_width = title_area.shape[0:2]
+    song_title_height = (
+        CONSTANTS.PLAY_TITLE_BOTTOM_RIGHT_Y - CONSTANTS.PLAY_TITLE_TOP_LEFT_Y
     )
+    polarize_area(title_area, 0, 0, area_height, area_width)
     song_frame_slice = get_rectanglular_subsection_from_frame(
-        polarized_frame,
-        top_left_y,
-        top_left_x,
-        song_title_bottom_right_y,
-        bottom_right_x,
+        title_area, 0, 0, song_title_height, area_width
     )
     artist_frame_slice = get_rectanglular_subsection_from_frame(
-        frame,
-        song_title_bottom_right_y,
-        top_left_x,
-        artist_bottom_right_y,
-        bottom_right_x,
+        title_area, song_title_height, 0, area_height, area_width
     )
     # TODO: wrap in debug
     # dump_to_png(song_frame_slice, "SONG_TITLE", 0)
     # dump_to_png(artist_frame_slice, "SONG_ARTIST", 0)
-    en_song = str.strip(pytesseract.image_to_string(song_frame_slice, lang="eng"))
-    jp_song = str.strip(pytesseract.image_to_string(song_frame_slice, lang="jpn"))
-    en_artist = str.strip(pytesseract.image_to_string(artist_frame_slice, lang="eng"))
-    jp_artist = str.strip(pytesseract.image_to_string(artist_frame_slice, lang="jpn"))
+    return ocr_cache.cached_ocr(
+        "play_title_artist",
+        [song_frame_slice, artist_frame_slice],
+        OCRSongTitles,
+        lambda: _ocr_play_title_and_artist(song_frame_slice, artist_frame_slice),
+    )
+
+
+def get_ocr_song_title_from_play_frame(
+    frame: NDArray, left_side: bool, is_double: bool
+) -> OCRSongTitles:
+    return get_ocr_song_title_from_title_area(
+        crop_play_title_area(frame, left_side, is_double)
+    )
+
+
+def get_ocr_song_title_from_shared_frame(
+    frame_ref: SharedFrameRef, left_side: bool, is_double: bool
+) -> OCRSongTitles:
+    """Runs in an OCR worker, cropping the title straight out of a capture slot."""
+    return get_ocr_song_title_from_play_frame(
+        frame_capture.read_shared_frame(frame_ref), left_side, is_double
+    )
+
+
+def _ocr_play_title_and_artist(
+    song_frame_slice: NDArray, artist_frame_slice: NDArray
+) -> OCRSongTitles:
+    en_song = str.strip(ocr_service.image_to_string(song_frame_slice, lang="eng"))
+    jp_song = str.strip(ocr_service.image_to_string(song_frame_slice, lang="jpn"))
+    en_artist = str.strip(ocr_service.image_to_string(artist_frame_slice, lang="eng"))
+    jp_artist = str.strip(ocr_service.image_to_string(artist_frame_slice, lang="jpn"))
     log.info(f"ENG SONG: {en_artist} {en_song} ")
     log.info(f"JPN SONG: {jp_artist} {jp_song}")
     return OCRSongTitles(
@@ -504,7 +536,8 @@ def update_video_processing_state(
     frame_count: int,
     v: VideoProcessingState,
     song_reference: SongReference,
-    ocr: ProcessPoolExecutor,
+    ocr: Executor,
+    frame_arena: Optional[FrameRingBuffer] = None,
 ) -> None:
     if v.play_metadata_missing():
         play_metadata = read_play_metadata(frame_count, frame, v)
@@ -526,12 +559,25 @@ def update_video_processing_state(
     if v.ocr_song_title is None and v.left_side is not None and v.is_double is not None:
         if v.ocr_song_future is None:
             log.info(f"{v.current_state.name} frame#{frame_count} ocr call")
-            v.ocr_song_future = ocr.submit(
-                get_ocr_song_title_from_play_frame,
-                frame,
-                v.left_side,
-                v.is_double,
-            )
+            frame_ref = frame_arena.retain_held() if frame_arena else None
+            if frame_arena is not None and frame_ref is not None:
+                # the worker reads the title out of the shared capture
+                # slot, which isn't reused until the read finishes
+                v.ocr_song_future = ocr.submit(
+                    get_ocr_song_title_from_shared_frame,
+                    frame_ref,
+                    v.left_side,
+                    v.is_double,
+                )
+                arena, retained = frame_arena, frame_ref
+                v.ocr_song_future.add_done_callback(lambda _: arena.release(retained))
+            else:
+                # the frame is overwritten once processing moves on,
+                # so the worker is sent its own copy of the title area
+                v.ocr_song_future = ocr.submit(
+                    get_ocr_song_title_from_title_area,
+                    crop_play_title_area(frame, v.left_side, v.is_double),
+                )
             log.info(f"{v.current_state.name} frame#{frame_count} ocr future created")
         elif v.ocr_song_future.done():
             v.ocr_song_title = v.ocr_song_future.result()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+import time
+import logging
+from typing import Any, Callable, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from . import constants as CONSTANTS
+from . import kamaitachi_client
+from . import download_12sp_tables
+from . import download_textage_tables
+from .local_dataclasses import RemoteMetadata
+
+log = logging.getLogger(__name__)
+
+
+def _timed(name: str, read_source: Callable[[], Any]) -> Callable[[], Any]:
+    def timed_read_source() -> Any:
+        start = time.perf_counter()
+        result = read_source()
+        log.info(f"Fetched {name} in {time.perf_counter() - start:.2f}s")
+        return result
+
+    return timed_read_source
+
+
+def _read_12sp_table() -> dict:
+    return download_12sp_tables.transform_table_json(
+        download_12sp_tables.get_12sp_table_json()
+    )
+
+
+def _result(name: str, future: Future, deadline: float) -> Optional[Any]:
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except Exception as e:
+        log.error(f"Could not fetch {name}: {e!r}")
+        return None
+
+
+def fetch_remote_metadata(
+    song_metadata: bool = True,
+    timeout: float = CONSTANTS.STARTUP_FETCH_TIMEOUT_SECONDS,
+) -> RemoteMetadata:
+    """
+    Downloads the remote metadata sources concurrently, each parsed as
+    soon as it arrives, so startup waits on the slowest source rather
+    than all of them in turn. Textage and kamaitachi are only fetched
+    with song_metadata. A source that fails or is still running after
+    timeout is logged and left as None.
+    """
+    sources: dict[str, Callable[[], Any]] = {"sp12": _read_12sp_table}
+    if song_metadata:
+        sources.update(download_textage_tables.TEXTAGE_TABLE_READERS)
+        sources["kamaitachi"] = kamaitachi_client.download_kamaitachi_song_list
+    start = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    fetcher = ThreadPoolExecutor(
+        max_workers=len(sources), thread_name_prefix="metadata-fetch"
+    )
+    futures = {
+        name: fetcher.submit(_timed(name, read_source))
+        for name, read_source in sources.items()
+    }
+    results = {
+        name: _result(name, future, deadline) for name, future in futures.items()
+    }
+    # a source past its deadline is abandoned rather than waited on
+    fetcher.shutdown(wait=False, cancel_futures=True)
+    remote_metadata = RemoteMetadata(
+        kamaitachi_song_list=results.get("kamaitachi"), sp12_table=results["sp12"]
+    )
+    if song_metadata:
+        textage_tables = {
+            name: results[name]
+            for name in download_textage_tables.TEXTAGE_TABLE_READERS
+        }
+        if None not in textage_tables.values():
+            remote_metadata.song_metadata = (
+                download_textage_tables.build_infinitas_song_metadata(textage_tables)
+            )
+    log.info(
+        f"Fetched {len(sources)} metadata sources in "
+        f"{time.perf_counter() - start:.2f}s"
+    )
+    return remote_metadata
@@ -1,12 +1,10 @@
 #!/usr/bin/env python3
 
-import copy
 import logging
-from typing import Any
-from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+from concurrent.futures import Executor
 
 import cv2 as cv  # type: ignore
-import pytesseract  # type: ignore
 from numpy.typing import NDArray  # type: ignore
 
 from . import sqlite_client
@@ -17,8 +15,10 @@ from .local_dataclasses import (
     Difficulty,
     OCRSongTitles,
     GameStatePixel,
+    ScoreDBRecord,
     VideoProcessingState,
     GameState,
+    ScreengrabRetention,
     calculate_grade_from_total_score,
 )
 from .song_reference import SongReference
@@ -28,11 +28,14 @@ from .frame_utilities import (
     is_bright,
     is_black,
     get_numbers_from_area,
+    get_number_area_bounds,
     check_pixel_color_in_frame,
     dump_to_png,
     show_frame,
 )
 from . import constants as CONSTANTS
+from . import ocr_service
+from . import ocr_cache
 
 log = logging.getLogger(__name__)
 
@@ -341,14 +344,12 @@ def get_play_type(frame: NDArray) -> bool:
 
 
 def get_clear_type_from_results_screen(frame: NDArray, left_side: bool) -> ClearType:
-    start_y = 417
-    end_y = 437
+    start_y = CONSTANTS.CLEAR_TYPE_TOP_LEFT_Y
+    end_y = CONSTANTS.CLEAR_TYPE_BOTTOM_RIGHT_Y
     if left_side:
-        start_x = 366
-        end_x = 512
+        start_x, end_x = CONSTANTS.CLEAR_TYPE_P1_X
     else:
-        start_x = 1716
-        end_x = 1862
+        start_x, end_x = CONSTANTS.CLEAR_TYPE_P2_X
     subs = get_rectanglular_subsection_from_frame(frame, start_y, start_x, end_y, end_x)
     top_left = Point(y=5, x=23)
     first_letter_black = Point(y=10, x=25)
@@ -485,12 +486,14 @@ def note_count_reader(block: NDArray) -> int:
                 return 0
 
 
-def get_title_and_artist(frame: NDArray, ocr: ProcessPoolExecutor) -> OCRSongTitles:
-    top_left_y = 960
-    top_left_x = 550
-    bottom_right_x = 1370
-    song_title_bottom_right_y = 996
-    artist_bottom_right_y = 1030
+def get_title_and_artist(
+    frame: NDArray, ocr: Optional[Executor] = None
+) -> OCRSongTitles:
+    top_left_y = CONSTANTS.SCORE_TITLE_TOP_LEFT_Y
+    top_left_x = CONSTANTS.SCORE_TITLE_TOP_LEFT_X
+    bottom_right_x = CONSTANTS.SCORE_TITLE_BOTTOM_RIGHT_X
+    song_title_bottom_right_y = CONSTANTS.SCORE_TITLE_BOTTOM_RIGHT_Y
+    artist_bottom_right_y = CONSTANTS.SCORE_ARTIST_BOTTOM_RIGHT_Y
     song_frame_slice = get_rectanglular_subsection_from_frame(
         frame, top_left_y, top_left_x, song_title_bottom_right_y, bottom_right_x
     )
@@ -501,11 +504,30 @@ def get_title_and_artist(frame: NDArray, ocr: ProcessPoolExecutor) -> OCRSongTit
         artist_bottom_right_y,
         bottom_right_x,
     )
+    return ocr_cache.cached_ocr(
+        "score_title_artist",
+        [song_frame_slice, artist_frame_slice],
+        OCRSongTitles,
+        lambda: _ocr_title_and_artist(
+            frame,
+            song_frame_slice,
+            artist_frame_slice,
+            (top_left_y, top_left_x, artist_bottom_right_y, bottom_right_x),
+        ),
+    )
+
 
-    en_title = str.strip(pytesseract.image_to_string(song_frame_slice, lang="eng"))
-    jp_title = str.strip(pytesseract.image_to_string(song_frame_slice, lang="jpn"))
-    en_artist = str.strip(pytesseract.image_to_string(artist_frame_slice, lang="eng"))
-    jp_artist = str.strip(pytesseract.image_to_string(artist_frame_slice, lang="jpn"))
+def _ocr_title_and_artist(
+    frame: NDArray,
+    song_frame_slice: NDArray,
+    artist_frame_slice: NDArray,
+    title_area: tuple[int, int, int, int],
+) -> OCRSongTitles:
+    top_left_y, top_left_x, artist_bottom_right_y, bottom_right_x = title_area
+    en_title = str.strip(ocr_service.image_to_string(song_frame_slice, lang="eng"))
+    jp_title = str.strip(ocr_service.image_to_string(song_frame_slice, lang="jpn"))
+    en_artist = str.strip(ocr_service.image_to_string(artist_frame_slice, lang="eng"))
+    jp_artist = str.strip(ocr_service.image_to_string(artist_frame_slice, lang="jpn"))
     log.info(f"ENG SONG: '{en_artist}' '{en_title}'")
     log.info(f"JPN SONG: '{jp_artist}' '{jp_title}'")
     if not en_title and not en_artist and not jp_title and not jp_artist:
@@ -532,10 +554,10 @@ def get_title_and_artist(frame: NDArray, ocr: ProcessPoolExecutor) -> OCRSongTit
         scaled_artist = cv.resize(artist_frame_slice, None, fx=4, fy=4)
         # show_frame(scaled_song)
         # show_frame(scaled_artist)
-        en_title = str.strip(pytesseract.image_to_string(scaled_song, lang="eng"))
-        jp_title = str.strip(pytesseract.image_to_string(scaled_song, lang="jpn"))
-        en_artist = str.strip(pytesseract.image_to_string(scaled_artist, lang="eng"))
-        jp_artist = str.strip(pytesseract.image_to_string(scaled_artist, lang="jpn"))
+        en_title = str.strip(ocr_service.image_to_string(scaled_song, lang="eng"))
+        jp_title = str.strip(ocr_service.image_to_string(scaled_song, lang="jpn"))
+        en_artist = str.strip(ocr_service.image_to_string(scaled_artist, lang="eng"))
+        jp_artist = str.strip(ocr_service.image_to_string(scaled_artist, lang="jpn"))
         log.info(f"ENG SONG: '{en_artist}' '{en_title}'")
         log.info(f"JPN SONG: '{jp_artist}' '{jp_title}'")
         if not en_title and not en_artist and not jp_title and not jp_artist:
@@ -547,22 +569,86 @@ def get_title_and_artist(frame: NDArray, ocr: ProcessPoolExecutor) -> OCRSongTit
     return ocr_song_titles
 
 
-def read_score_from_png(
-    frame: NDArray, left_side: bool, is_double: bool, ocr: ProcessPoolExecutor
-):
+def read_score_metadata_from_png(frame: NDArray, left_side: bool, is_double: bool):
     is_double = get_play_type(frame)
     difficulty, level = get_difficulty_and_level(frame, is_double)
     score = get_score_from_result_screen(frame, left_side, is_double)
     notes = get_note_count(frame)
+    return score, notes, difficulty, level
+
+
+def read_score_from_png(
+    frame: NDArray, left_side: bool, is_double: bool, ocr: Optional[Executor] = None
+):
+    score, notes, difficulty, level = read_score_metadata_from_png(
+        frame, left_side, is_double
+    )
     ocr_song_titles = get_title_and_artist(frame, ocr)
     return score, notes, ocr_song_titles, difficulty, level
 
 
+def audit_title_and_artist(score_uuid: str, score_frame: NDArray) -> None:
+    """
+    Reads the title and artist of a score already written from its
+    metadata alone, keeping the OCR text alongside it for auditing.
+    """
+    try:
+        ocr_titles = get_title_and_artist(score_frame)
+    except RuntimeError as e:
+        log.warning(f"Could not audit OCR for score {score_uuid}: {e}")
+        return
+    sqlite_client.update_score_ocr(score_uuid, ocr_titles)
+
+
+def retain_score_frame(
+    frame: NDArray, left_side: bool, retention: ScreengrabRetention
+) -> dict[str, NDArray]:
+    """
+    Copies out what retention keeps of a score frame, by name: nothing,
+    the areas the score, note count, title and clear lamp readers use,
+    or the whole frame.
+    """
+    if retention == ScreengrabRetention.NONE:
+        return {}
+    if retention == ScreengrabRetention.FULL:
+        return {"frame_slice": frame.copy()}
+    if left_side:
+        score_area = CONSTANTS.SCORE_P1_AREA
+        fast_slow_area = CONSTANTS.FAST_SLOW_P1_AREA
+        clear_type_x = CONSTANTS.CLEAR_TYPE_P1_X
+    else:
+        score_area = CONSTANTS.SCORE_P2_AREA
+        fast_slow_area = CONSTANTS.FAST_SLOW_P2_AREA
+        clear_type_x = CONSTANTS.CLEAR_TYPE_P2_X
+    crop_areas = {
+        "score": get_number_area_bounds(score_area),
+        "fast_slow": get_number_area_bounds(fast_slow_area),
+        "notes": get_number_area_bounds(CONSTANTS.NOTES_AREA),
+        "title": (
+            CONSTANTS.SCORE_TITLE_TOP_LEFT_Y,
+            CONSTANTS.SCORE_TITLE_TOP_LEFT_X,
+            CONSTANTS.SCORE_ARTIST_BOTTOM_RIGHT_Y,
+            CONSTANTS.SCORE_TITLE_BOTTOM_RIGHT_X,
+        ),
+        "clear_type": (
+            CONSTANTS.CLEAR_TYPE_TOP_LEFT_Y,
+            clear_type_x[0],
+            CONSTANTS.CLEAR_TYPE_BOTTOM_RIGHT_Y,
+            clear_type_x[1],
+        ),
+    }
+    return {
+        name: get_rectanglular_subsection_from_frame(frame, *crop_area).copy()
+        for name, crop_area in crop_areas.items()
+    }
+
+
 def update_video_processing_state(
     frame: NDArray,
     frame_count: int,
     v: VideoProcessingState,
     song_reference: SongReference,
+    retention: ScreengrabRetention = CONSTANTS.SCORE_FRAME_RETENTION,
 ) -> None:
     # total note count only exists on the score frame
     if v.note_count is None:
@@ -588,9 +674,9 @@ def update_video_processing_state(
         if (
             v.ocr_song_title is not None
             and v.score is not None
-            and v.score_frame is None
+            and v.score_screengrab is None
         ):
-            v.score_frame = copy.deepcopy(frame)
+            v.score_screengrab = retain_score_frame(frame, v.left_side, retention)
     return
 
 
@@ -599,6 +685,9 @@ def handle_score_transition(
     v: VideoProcessingState,
     song_reference: SongReference,
     session_uuid: str,
+    score_writer: Callable[
+        [ScoreDBRecord], Any
+    ] = sqlite_client.write_score_from_record,
 ) -> None:
     if (
         v.ocr_song_title is None
@@ -610,14 +699,14 @@ def handle_score_transition(
 
     if (
         v.score is not None
-        and v.score_frame is not None
+        and v.score_screengrab is not None
         and v.ocr_song_title is not None
         and v.difficulty is not None
         and v.level is not None
         and v.metadata_title is not None
     ):
         log.info(f"frame#{frame_count}:writing score")
-        tiebreak_data = sqlite_client.read_tiebreak_data(v.metadata_title)
+        tiebreak_data = song_reference.tiebreak_data(v.metadata_title)
         textage_id = song_reference.resolve_ocr_and_metadata(
             v.ocr_song_title,
             v.metadata_title,
@@ -626,19 +715,24 @@ def handle_score_transition(
             v.level,
         )
         if textage_id:
-            sqlite_client.write_score(
-                session_uuid,
-                textage_id,
-                v.score,
-                v.difficulty,
-                v.ocr_song_title,
-                v.score_frame,
+            score_writer(
+                ScoreDBRecord(
+                    session_uuid,
+                    textage_id,
+                    v.score,
+                    v.difficulty,
+                    v.ocr_song_title,
+                    screengrab=v.score_screengrab,
+                )
             )
         else:
-            bug_file = dump_to_png(v.score_frame, "BAD_SCORE_FRAME", 0)
+            bug_files = [
+                dump_to_png(image, f"BAD_SCORE_{name.upper()}", 0)
+                for name, image in v.score_screengrab.items()
+            ]
             log.error(
                 "Could not determine specific song title from score result frame metadata."
-                f"Dumping frame to {bug_file} for bug reporting purposes."
+                f"Dumping retained frame to {bug_files} for bug reporting purposes."
             )
     return
 
@@ -647,27 +741,32 @@ def read_score_and_song_metadata(
     frame: NDArray,
     song_reference: SongReference,
     game_state: GameState,
-    ocr: ProcessPoolExecutor,
+    ocr: Optional[Executor] = None,
 ):
     left_side = True
     play_side, _ = game_state.value.split("_")
     if play_side == "P2":
         left_side = False
     is_double = get_play_type(frame)
-    # TODO: have this run the ocr on the screen frame
-    score, notes, ocr_titles, difficulty, level = read_score_from_png(
-        frame, left_side, is_double, ocr
+    score, notes, difficulty, level = read_score_metadata_from_png(
+        frame, left_side, is_double
     )
     log.debug(f"returned score: {score}")
     log.debug(f"returned notes: {notes}")
-    log.debug(f"returned title: {ocr_titles}")
     log.debug(f"returned diff : {difficulty}")
     log.debug(f"returned level: {level}")
     metadata_titles = song_reference.resolve_by_score_metadata(
         difficulty.name, level, notes
     )
-    # TODO: construct tiebreak data in songreference on initialization
-    tiebreak_data = sqlite_client.read_tiebreak_data(metadata_titles)
+    if len(metadata_titles) == 1:
+        # difficulty, level and notes only fit one chart, so OCR is
+        # left to audit_title_and_artist once the score is written
+        metadata_title = next(iter(metadata_titles))
+        log.debug(f"Using metadata title without OCR: {metadata_title}")
+        return metadata_title, score, difficulty, None
+    ocr_titles = get_title_and_artist(frame, ocr)
+    log.debug(f"returned title: {ocr_titles}")
+    tiebreak_data = song_reference.tiebreak_data(metadata_titles)
     # TODO: have resolve take the enum
     textage_id = song_reference.resolve_ocr_and_metadata(
         ocr_titles, metadata_titles, tiebreak_data, difficulty.name, level
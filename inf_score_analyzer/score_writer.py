@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+import time
+import queue
+import logging
+import threading
+import dataclasses
+from typing import Optional, Union
+
+# local imports
+from . import sqlite_client
+from . import constants as CONSTANTS
+from .local_dataclasses import ScoreDBRecord, ScoreWriteResult
+
+log = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ScoreWriter:
+    """
+    Writes scores to the user db from a background thread, so the
+    frame processing loop never waits on disk.
+
+    Submitted records are queued and written in one transaction once
+    batch_size of them are pending, flush_seconds after the oldest
+    pending one arrived, or at close(). If a batch fails, its records
+    are retried one at a time so only the bad ones are lost. Lost
+    scores are logged as they fail and put on the status queue without
+    their frames, so the queue stays small however long the session.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = CONSTANTS.SCORE_WRITE_BATCH_SIZE,
+        flush_seconds: float = CONSTANTS.SCORE_WRITE_FLUSH_SECONDS,
+    ):
+        if batch_size < 1:
+            raise RuntimeError(
+                f"score write batch size must be at least 1: {batch_size}"
+            )
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        # failed writes only, see _flush
+        self.status: "queue.Queue[ScoreWriteResult]" = queue.Queue()
+        self.written_scores = 0
+        self.failed_scores = 0
+        self._records: "queue.Queue[Union[ScoreDBRecord, object]]" = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="score-writer", daemon=True
+        )
+
+    def __repr__(self):
+        return (
+            "ScoreWriter("
+            f"batch_size:{self.batch_size}, "
+            f"written_scores:{self.written_scores}, "
+            f"failed_scores:{self.failed_scores}, "
+            f"queued_scores:{self._records.qsize()}"
+            ")"
+        )
+
+    def start(self) -> "ScoreWriter":
+        self._thread.start()
+        return self
+
+    def submit(self, db_record: ScoreDBRecord) -> None:
+        self._records.put(db_record)
+
+    def close(self) -> None:
+        """Writes everything still queued and stops the thread."""
+        self._records.put(_STOP)
+        self._thread.join()
+        log.info(f"Score writer stopped: {self}")
+
+    def drain_status(self) -> list[ScoreWriteResult]:
+        """Returns the scores that failed to write since the last drain."""
+        results: list[ScoreWriteResult] = []
+        while True:
+            try:
+                results.append(self.status.get_nowait())
+            except queue.Empty:
+                return results
+
+    def _flush(self, pending: list[ScoreDBRecord]) -> None:
+        try:
+            score_uuids = sqlite_client.write_scores(pending)
+            results = [
+                ScoreWriteResult(db_record, score_uuid)
+                for db_record, score_uuid in zip(pending, score_uuids)
+            ]
+        except Exception as e:
+            log.warning(f"Could not write {len(pending)} scores together: {e}")
+            results = []
+            for db_record in pending:
+                try:
+                    score_uuid = sqlite_client.write_score_from_record(db_record)
+                    results.append(ScoreWriteResult(db_record, score_uuid))
+                except Exception as record_error:
+                    log.error(
+                        f"Lost score {db_record.textage_id} "
+                        f"{db_record.difficulty} {db_record.score}: {record_error}"
+                    )
+                    results.append(ScoreWriteResult(db_record, error=str(record_error)))
+        for result in results:
+            if result.error is None:
+                self.written_scores += 1
+            else:
+                self.failed_scores += 1
+                # the frames are megabytes each and not needed to report it
+                result.db_record = dataclasses.replace(
+                    result.db_record, score_frame=None, screengrab=None
+                )
+                self.status.put(result)
+        pending.clear()
+
+    def _run(self) -> None:
+        pending: list[ScoreDBRecord] = []
+        flush_deadline: Optional[float] = None
+        while True:
+            timeout = None
+            if flush_deadline is not None:
+                timeout = max(0.0, flush_deadline - time.monotonic())
+            try:
+                queued = self._records.get(timeout=timeout)
+            except queue.Empty:
+                queued = None
+            if queued is _STOP:
+                if pending:
+                    self._flush(pending)
+                sqlite_client.close_connections()
+                return
+            if isinstance(queued, ScoreDBRecord):
+                pending.append(queued)
+                if flush_deadline is None:
+                    flush_deadline = time.monotonic() + self.flush_seconds
+            if pending and (
+                len(pending) >= self.batch_size
+                or time.monotonic() >= (flush_deadline or 0.0)
+            ):
+                self._flush(pending)
+                flush_deadline = None
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+import hashlib
+import logging
+import traceback
+from typing import Callable, Iterable, Iterator, Optional, TypeVar, Union
+from pathlib import Path
+from collections import deque
+from concurrent.futures import (
+    Future,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+
+# library imports
+import cv2 as cv  # type: ignore
+from numpy.typing import NDArray  # type: ignore
+
+# local imports
+from . import sqlite_client
+from . import ocr_service
+from . import game_state_pixels
+from . import score_frame_processor
+from . import song_select_frame_processor
+from .game_state_frame_processor import get_game_state_from_frame
+from .local_dataclasses import (
+    Score,
+    GameState,
+    Difficulty,
+    OCRSongTitles,
+    ScoreDBRecord,
+    ScreenshotStatus,
+    CompiledStatePixels,
+    ScreengrabRetention,
+    ScreenshotFingerprint,
+)
+from .song_reference import SongReference
+from . import constants as CONSTANTS
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# set once per worker process by _init_screenshot_worker so each
+# screenshot task only has to send its path
+_worker_state_pixels: Optional[CompiledStatePixels] = None
+_worker_session_uuid: str = ""
+_worker_song_reference: Optional[SongReference] = None
+_worker_retention: ScreengrabRetention = CONSTANTS.SCORE_FRAME_RETENTION
+_worker_keep_frame: bool = True
+
+
+def manually_validate(
+    song_reference: SongReference,
+    image: Path,
+    textage_id: str,
+    score: Score,
+    difficulty: Difficulty,
+    ocr_titles: Optional[OCRSongTitles],
+    frame: Optional[NDArray],
+):
+    print("")
+    print(f"Here's the details of {image}:")
+    print(f"song: {song_reference.by_textage_id[textage_id]}")
+    print(f"score: {score}")
+    print(f"score: {difficulty}")
+    print("is this correct (y/n)?")
+    if frame is not None:
+        cv.imshow("Validation", frame)
+    answer = cv.waitKey(0)
+    print(answer)
+    if answer in [ord("y"), ord("Y")]:
+        print("Validated.")
+        valid = True
+    else:
+        print("Rejected.")
+        valid = False
+    print("")
+    return valid
+
+
+def _init_screenshot_worker(
+    state_pixels: CompiledStatePixels,
+    session_uuid: str,
+    song_reference: SongReference,
+    retention: ScreengrabRetention = CONSTANTS.SCORE_FRAME_RETENTION,
+    keep_frame: bool = True,
+) -> None:
+    global _worker_state_pixels, _worker_session_uuid, _worker_song_reference
+    global _worker_retention, _worker_keep_frame
+    _worker_state_pixels = state_pixels
+    _worker_session_uuid = session_uuid
+    _worker_song_reference = song_reference
+    _worker_retention = retention
+    _worker_keep_frame = keep_frame
+    ocr_service.warm_up()
+
+
+def read_score_from_screenshot(image: Path) -> Union[ScoreDBRecord, ScreenshotStatus]:
+    """
+    Decodes a screenshot and reads its score and song, or returns why
+    it couldn't as read_score_from_frame does. The whole frame is only
+    returned on the record when the worker was set up to keep it for
+    manual validation.
+    """
+    if _worker_state_pixels is None or _worker_song_reference is None:
+        raise RuntimeError("screenshot worker was not initialized")
+    log.info(f"Reading score from {image}")
+    frame = cv.imread(str(image.absolute()))
+    if frame is None:
+        log.error(f"Could not decode {image}, skipping")
+        return ScreenshotStatus.UNREADABLE
+    return read_score_from_frame(
+        image,
+        frame,
+        _worker_state_pixels,
+        _worker_session_uuid,
+        _worker_song_reference,
+        _worker_retention,
+        _worker_keep_frame,
+    )
+
+
+def read_score_from_frame(
+    image: Path,
+    frame: NDArray,
+    state_pixels: CompiledStatePixels,
+    session_uuid: str,
+    song_reference: SongReference,
+    retention: ScreengrabRetention = CONSTANTS.SCORE_FRAME_RETENTION,
+    keep_frame: bool = True,
+) -> Union[ScoreDBRecord, ScreenshotStatus]:
+    """
+    Reads the score from a decoded screenshot. With keep_frame the
+    record keeps the whole frame for validation and OCR auditing, while
+    its screengrab holds what retention stores of it. Screenshots of
+    neither a score nor song select are UNREADABLE, while ones whose
+    score or song couldn't be read are FAILED and tried again later.
+    """
+    try:
+        game_state: GameState = get_game_state_from_frame(frame, state_pixels)
+        log.debug(f"PNG GAME STATE: {game_state}")
+        if game_state in game_state_pixels.SCORE_STATES:
+            textage_id, score, difficulty, ocr_titles = (
+                score_frame_processor.read_score_and_song_metadata(
+                    frame, song_reference, game_state
+                )
+            )
+            left_side = not game_state.value.startswith("P2")
+            screengrab = score_frame_processor.retain_score_frame(
+                frame, left_side, retention
+            )
+        elif game_state in game_state_pixels.SONG_SELECT_STATES:
+            textage_id, score, difficulty, ocr_titles = (
+                song_select_frame_processor.read_score_and_song_metadata(
+                    frame, song_reference
+                )
+            )
+            # the score crops don't apply to song select, which is
+            # kept whole unless nothing is retained
+            screengrab = (
+                {} if retention == ScreengrabRetention.NONE else {"frame_slice": frame}
+            )
+        else:
+            log.error(
+                f"Could not read song select or score result from {image}, continuing"
+            )
+            return ScreenshotStatus.UNREADABLE
+    except Exception as e:
+        log.error(
+            f"Could not determine score from {image} and skipping : {e} : {traceback.format_exc()}"
+        )
+        return ScreenshotStatus.FAILED
+    if textage_id is None:
+        log.error(f"Could not resolve the song in {image}, skipping")
+        return ScreenshotStatus.FAILED
+    return ScoreDBRecord(
+        session_uuid,
+        textage_id,
+        score,
+        difficulty,
+        ocr_titles,
+        frame if keep_frame else None,
+        screengrab,
+    )
+
+
+def bounded_map(
+    executor: Executor, read: Callable[[T], R], items: Iterable[T], in_flight: int
+) -> Iterator[R]:
+    """
+    Executor.map that only keeps in_flight tasks submitted ahead of the
+    result being consumed, so a slow consumer holds a bounded number of
+    results rather than all of them.
+    """
+    pending: "deque[Future[R]]" = deque()
+    for item in items:
+        pending.append(executor.submit(read, item))
+        if len(pending) >= in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def fingerprint_screenshot(image: Path) -> ScreenshotFingerprint:
+    stat = image.stat()
+    content_hash = hashlib.sha256()
+    with open(image, "rb") as reader:
+        while chunk := reader.read(1 << 20):
+            content_hash.update(chunk)
+    return ScreenshotFingerprint(
+        str(image.absolute()), stat.st_size, stat.st_mtime_ns, content_hash.hexdigest()
+    )
+
+
+def filter_processed_screenshots(
+    png_files: list[Path],
+) -> tuple[list[Path], dict[Path, ScreenshotFingerprint]]:
+    """
+    Returns the screenshots no earlier import has handled, along with
+    their fingerprints. Files whose size and mtime match the index are
+    skipped without being read; anything else is hashed, and skipped if
+    the same image was already imported under another name.
+    """
+    processed = sqlite_client.read_processed_screenshots()
+    processed_hashes = {
+        row[2]: path
+        for path, row in processed.items()
+        if row[3] != ScreenshotStatus.DUPLICATE.value
+    }
+    new_files: list[Path] = []
+    fingerprints: dict[Path, ScreenshotFingerprint] = {}
+    for image in png_files:
+        path = str(image.absolute())
+        stat = image.stat()
+        if path in processed and processed[path][0:2] == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            continue
+        fingerprint = fingerprint_screenshot(image)
+        known_path = processed_hashes.get(fingerprint.content_hash)
+        if known_path == path:
+            # touched but unchanged, keep the earlier result
+            _, _, _, status, score_uuid = processed[path]
+            sqlite_client.write_processed_screenshot(
+                fingerprint, ScreenshotStatus(status), score_uuid
+            )
+            continue
+        if known_path is not None:
+            log.info(f"{image} is a copy of {known_path}, skipping")
+            sqlite_client.write_processed_screenshot(
+                fingerprint, ScreenshotStatus.DUPLICATE
+            )
+            continue
+        processed_hashes[fingerprint.content_hash] = path
+        new_files.append(image)
+        fingerprints[image] = fingerprint
+    log.info(
+        f"Skipping {len(png_files) - len(new_files)} already imported screenshots, "
+        f"reading {len(new_files)}"
+    )
+    return new_files, fingerprints
+
+
+def read_scores_from_pngs(
+    png_files: list[Path],
+    state_pixels: CompiledStatePixels,
+    session_uuid: str,
+    song_reference: SongReference,
+    manual_validation: bool,
+    workers: int = 1,
+    skip_processed: bool = False,
+    retention: ScreengrabRetention = CONSTANTS.SCORE_FRAME_RETENTION,
+) -> None:
+    """
+    Reads screenshots across worker processes, then validates and
+    writes the results from this process in the order they were given.
+    With skip_processed, screenshots already in the processed screenshot
+    index are left out and the ones read are added to it. Title and
+    artist OCR skipped for scores identified by their metadata is
+    caught up on a background thread as scores are written.
+    """
+    fingerprints: Optional[dict[Path, ScreenshotFingerprint]] = None
+    if skip_processed:
+        png_files, fingerprints = filter_processed_screenshots(png_files)
+    if not png_files:
+        return
+    # frames are megabytes each, so they only come back from the workers
+    # to be shown, the OCR audit re-reads its screenshots instead
+    worker_args = (
+        state_pixels,
+        session_uuid,
+        song_reference,
+        retention,
+        manual_validation,
+    )
+    # one audit thread, as the watcher uses, so auditing doesn't compete
+    # with the read workers for cores
+    with ThreadPoolExecutor(
+        max_workers=1, initializer=ocr_service.warm_up
+    ) as ocr_audit:
+        if workers <= 1 or len(png_files) <= 1:
+            _init_screenshot_worker(*worker_args)
+            write_screenshot_scores(
+                png_files,
+                map(read_score_from_screenshot, png_files),
+                song_reference,
+                manual_validation,
+                fingerprints,
+                ocr_audit,
+            )
+            return
+        log.info(f"Reading {len(png_files)} screenshots with {workers} workers")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_screenshot_worker,
+            initargs=worker_args,
+        ) as pool:
+            write_screenshot_scores(
+                png_files,
+                bounded_map(
+                    pool,
+                    read_score_from_screenshot,
+                    png_files,
+                    workers * CONSTANTS.SCREENSHOT_READS_IN_FLIGHT_PER_WORKER,
+                ),
+                song_reference,
+                manual_validation,
+                fingerprints,
+                ocr_audit,
+            )
+    return
+
+
+def audit_screenshot(
+    score_uuid: str, image: Path, score_frame: Optional[NDArray] = None
+) -> None:
+    if score_frame is None:
+        score_frame = cv.imread(str(image.absolute()))
+        if score_frame is None:
+            log.warning(f"Could not re-read {image} to audit score {score_uuid}")
+            return
+    score_frame_processor.audit_title_and_artist(score_uuid, score_frame)
+
+
+def write_screenshot_scores(
+    png_files: list[Path],
+    score_records: Iterable[Union[ScoreDBRecord, ScreenshotStatus]],
+    song_reference: SongReference,
+    manual_validation: bool,
+    fingerprints: Optional[dict[Path, ScreenshotFingerprint]] = None,
+    ocr_audit: Optional[Executor] = None,
+) -> None:
+    """
+    Writes each readable score in order, indexing screenshots that
+    aren't scores as UNREADABLE. Scores resolved without OCR
+    have their title and artist read afterwards on ocr_audit, or
+    inline when no executor is given, from the record's frame or by
+    re-reading the screenshot when the frame wasn't kept.
+    """
+    for image, score_record in zip(png_files, score_records):
+        fingerprint = fingerprints.get(image) if fingerprints else None
+        if isinstance(score_record, ScreenshotStatus):
+            # failed reads are left out of the index to be retried
+            if fingerprint and score_record == ScreenshotStatus.UNREADABLE:
+                sqlite_client.write_processed_screenshot(fingerprint, score_record)
+            continue
+        if manual_validation:
+            valid = manually_validate(
+                song_reference,
+                image,
+                score_record.textage_id,
+                score_record.score,
+                score_record.difficulty,
+                score_record.ocr_titles,
+                score_record.score_frame,
+            )
+            if not valid:
+                log.info(
+                    f"Rejecting {image} {score_record.textage_id} {score_record.score} "
+                    f"{score_record.difficulty} {score_record.ocr_titles} manually"
+                )
+                continue
+        try:
+            score_uuid = sqlite_client.write_score_from_record(score_record)
+            if fingerprint:
+                sqlite_client.write_processed_screenshot(
+                    fingerprint, ScreenshotStatus.WRITTEN, score_uuid
+                )
+            if score_record.ocr_titles is None:
+                audit_args = (score_uuid, image, score_record.score_frame)
+                if ocr_audit is not None:
+                    ocr_audit.submit(audit_screenshot, *audit_args)
+                else:
+                    audit_screenshot(*audit_args)
+        except Exception as e:
+            log.error(
+                f"Could not write score from {image} and skipping : {e} : {traceback.format_exc()}"
+            )
+    return
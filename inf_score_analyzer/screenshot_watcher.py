@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+import os
+import time
+import queue
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable
+from concurrent.futures import ThreadPoolExecutor
+
+# library imports
+import cv2 as cv  # type: ignore
+from numpy.typing import NDArray  # type: ignore
+
+# watchdog is optional, without it the directory is polled
+try:
+    from watchdog.events import FileSystemEventHandler  # type: ignore
+    from watchdog.observers import Observer  # type: ignore
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# local imports
+from . import constants as CONSTANTS
+from . import ocr_service
+from . import screenshot_processor
+from .local_dataclasses import CompiledStatePixels, ScreengrabRetention
+from .song_reference import SongReference
+
+log = logging.getLogger(__name__)
+
+
+def _is_screenshot(path: Path) -> bool:
+    return path.suffix.lower() == ".png"
+
+
+class _ScreenshotEventHandler(FileSystemEventHandler):
+    def __init__(self, new_screenshots: "queue.Queue[Path]"):
+        super().__init__()
+        self.new_screenshots = new_screenshots
+
+    def _queue(self, path: Any) -> None:
+        screenshot = Path(os.fsdecode(path))
+        if _is_screenshot(screenshot):
+            self.new_screenshots.put(screenshot)
+
+    def on_created(self, event: Any) -> None:
+        if not event.is_directory:
+            self._queue(event.src_path)
+
+    def on_modified(self, event: Any) -> None:
+        if not event.is_directory:
+            self._queue(event.src_path)
+
+    def on_moved(self, event: Any) -> None:
+        if not event.is_directory:
+            self._queue(event.dest_path)
+
+
+def _list_screenshots(watch_dir: Path) -> set[Path]:
+    with os.scandir(watch_dir) as entries:
+        return {
+            Path(entry.path)
+            for entry in entries
+            if entry.is_file() and _is_screenshot(Path(entry.name))
+        }
+
+
+def watch_for_screenshots(
+    watch_dir: Path,
+    handle_screenshot: Callable[[Path, NDArray], None],
+    stop_event: threading.Event,
+    use_events: bool = True,
+    poll_seconds: float = CONSTANTS.WATCH_DIR_POLL_SECONDS,
+    settle_seconds: float = CONSTANTS.SCREENSHOT_SETTLE_SECONDS,
+    write_timeout_seconds: float = CONSTANTS.SCREENSHOT_WRITE_TIMEOUT_SECONDS,
+) -> None:
+    """
+    Calls handle_screenshot with each PNG that shows up in watch_dir
+    after watching starts, once the file has been fully written.
+
+    New files come from filesystem events when watchdog is installed,
+    otherwise the directory's mtime is checked every poll_seconds and
+    only listed when it changes. A file counts as written once its size
+    and mtime have held for settle_seconds and it decodes; files that
+    never get there within write_timeout_seconds are dropped.
+    """
+    new_screenshots: "queue.Queue[Path]" = queue.Queue()
+    observer = None
+    if use_events and Observer is not None:
+        observer = Observer()
+        observer.schedule(_ScreenshotEventHandler(new_screenshots), str(watch_dir))
+        observer.start()
+        log.info(f"Watching {watch_dir} for screenshots")
+    else:
+        log.info(f"Polling {watch_dir} for screenshots every {poll_seconds}s")
+
+    known_screenshots = _list_screenshots(watch_dir)
+    dir_mtime_ns = watch_dir.stat().st_mtime_ns
+    # path: (size, mtime_ns, unchanged since, first seen)
+    pending: dict[Path, tuple[int, int, float, float]] = {}
+    try:
+        while not stop_event.is_set():
+            wait_seconds = settle_seconds / 2 if pending else poll_seconds
+            try:
+                screenshot = new_screenshots.get(timeout=wait_seconds)
+                pending.setdefault(screenshot, (-1, -1, 0.0, time.monotonic()))
+                while not new_screenshots.empty():
+                    screenshot = new_screenshots.get_nowait()
+                    pending.setdefault(screenshot, (-1, -1, 0.0, time.monotonic()))
+            except queue.Empty:
+                pass
+
+            if observer is None:
+                current_dir_mtime_ns = watch_dir.stat().st_mtime_ns
+                if current_dir_mtime_ns != dir_mtime_ns:
+                    dir_mtime_ns = current_dir_mtime_ns
+                    current_screenshots = _list_screenshots(watch_dir)
+                    for screenshot in current_screenshots - known_screenshots:
+                        pending.setdefault(screenshot, (-1, -1, 0.0, time.monotonic()))
+                    known_screenshots = current_screenshots
+
+            for screenshot, (size, mtime_ns, unchanged_since, first_seen) in list(
+                pending.items()
+            ):
+                now = time.monotonic()
+                try:
+                    stat = screenshot.stat()
+                except FileNotFoundError:
+                    del pending[screenshot]
+                    continue
+                if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                    pending[screenshot] = (
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                        now,
+                        first_seen,
+                    )
+                    continue
+                if stat.st_size and now - unchanged_since >= settle_seconds:
+                    frame = cv.imread(str(screenshot))
+                    if frame is not None:
+                        del pending[screenshot]
+                        handle_screenshot(screenshot, frame)
+                        continue
+                if now - first_seen >= write_timeout_seconds:
+                    log.warning(f"{screenshot} was never fully written, skipping")
+                    del pending[screenshot]
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+    return
+
+
+def watch_screenshot_dir(
+    watch_dir: Path,
+    state_pixels: CompiledStatePixels,
+    session_uuid: str,
+    song_reference: SongReference,
+    use_events: bool = True,
+    retention: ScreengrabRetention = CONSTANTS.SCORE_FRAME_RETENTION,
+) -> None:
+    """Reads and writes the score from each new screenshot until interrupted."""
+    if not watch_dir.is_dir():
+        raise RuntimeError(f"{watch_dir} is not a directory")
+    ocr_audit = ThreadPoolExecutor(max_workers=1, initializer=ocr_service.warm_up)
+
+    def _write_score(screenshot: Path, frame: NDArray) -> None:
+        new_screenshots, fingerprints = (
+            screenshot_processor.filter_processed_screenshots([screenshot])
+        )
+        if not new_screenshots:
+            return
+        log.info(f"Reading score from {screenshot}")
+        score_record = screenshot_processor.read_score_from_frame(
+            screenshot,
+            frame,
+            state_pixels,
+            session_uuid,
+            song_reference,
+            retention,
+            keep_frame=False,
+        )
+        screenshot_processor.write_screenshot_scores(
+            [screenshot],
+            [score_record],
+            song_reference,
+            False,
+            fingerprints,
+            ocr_audit,
+        )
+
+    try:
+        watch_for_screenshots(watch_dir, _write_score, threading.Event(), use_events)
+    finally:
+        ocr_audit.shutdown(wait=True)
+    return
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+import sys
+import time
+import random
+import logging
+import functools
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Iterable, Optional
+
+if TYPE_CHECKING:
+    from .song_reference import SongReference
+
+log = logging.getLogger(__name__)
+
+
+class BitsetIndex:
+    """
+    One SongReference index with each posting list packed into a
+    bitset over dense song numbers. Python ints hold the bitsets, since
+    ANDing a few thousand bits as one int is cheaper than a numpy call.
+    """
+
+    def __init__(self, postings: dict[Any, set[str]], song_numbers: dict[str, int]):
+        self.bitsets: dict[Any, int] = {}
+        for key, textage_ids in postings.items():
+            bitset = 0
+            for textage_id in textage_ids:
+                bitset |= 1 << song_numbers[textage_id]
+            self.bitsets[key] = bitset
+
+    def get(self, key: Hashable) -> int:
+        return self.bitsets.get(key, 0)
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.bitsets) + sum(
+            sys.getsizeof(bitset) for bitset in self.bitsets.values()
+        )
+
+
+class SongIndex:
+    """
+    The engine behind SongReference's play and song select lookups.
+    Each textage_id gets a dense song number and the difficulty, bpm, note count and
+    genre indexes are held as bitsets, so resolves are a few ANDs and
+    only the matching songs are turned back into textage_ids.
+    """
+
+    def __init__(self, song_reference: "SongReference"):
+        self.textage_ids: list[str] = sorted(song_reference.by_textage_id)
+        self.song_numbers = {
+            textage_id: song_number
+            for song_number, textage_id in enumerate(self.textage_ids)
+        }
+        self.by_difficulty = BitsetIndex(
+            song_reference.by_difficulty, self.song_numbers
+        )
+        self.by_bpm = BitsetIndex(song_reference.by_bpm, self.song_numbers)
+        self.by_note_count = BitsetIndex(
+            song_reference.by_note_count, self.song_numbers
+        )
+        self.by_genre = BitsetIndex(song_reference.by_genre, self.song_numbers)
+
+    def __repr__(self):
+        return f"SongIndex(songs:{len(self.textage_ids)}, bytes:{self.nbytes()})"
+
+    def nbytes(self) -> int:
+        return (
+            self.by_difficulty.nbytes()
+            + self.by_bpm.nbytes()
+            + self.by_note_count.nbytes()
+            + self.by_genre.nbytes()
+        )
+
+    def to_textage_ids(self, bitset: int) -> set[str]:
+        textage_ids: set[str] = set()
+        while bitset:
+            lowest_bit = bitset & -bitset
+            textage_ids.add(self.textage_ids[lowest_bit.bit_length() - 1])
+            bitset ^= lowest_bit
+        return textage_ids
+
+    def resolve_by_play_metadata(
+        self,
+        difficulty_tuple: tuple[str, int],
+        bpm_tuple: tuple[int, int],
+        note_count: Optional[int] = None,
+    ) -> set[str]:
+        found = self.by_difficulty.get(difficulty_tuple) & self.by_bpm.get(bpm_tuple)
+        if note_count is not None:
+            found &= self.by_note_count.get(note_count)
+        return self.to_textage_ids(found)
+
+    def resolve_by_genres(
+        self,
+        difficulty_tuple: tuple[str, int],
+        bpm_tuple: tuple[int, int],
+        genres: Iterable[str],
+    ) -> set[str]:
+        """
+        The difficulty, bpm and genre intersection behind
+        SongReference.resolve_by_song_select_metadata, given the genres
+        OCR was matched to.
+        """
+        in_genres = 0
+        for genre in genres:
+            in_genres |= self.by_genre.get(genre)
+        found = (
+            self.by_difficulty.get(difficulty_tuple)
+            & self.by_bpm.get(bpm_tuple)
+            & in_genres
+        )
+        return self.to_textage_ids(found)
+
+
+def set_index_nbytes(postings: dict[Any, set[str]]) -> int:
+    """Bytes held by a dict of sets, not counting the shared id strings."""
+    return sys.getsizeof(postings) + sum(
+        sys.getsizeof(textage_ids) for textage_ids in postings.values()
+    )
+
+
+def _set_resolve_by_play_metadata(
+    song_reference: "SongReference",
+    difficulty_tuple: tuple[str, int],
+    bpm_tuple: tuple[int, int],
+    note_count: int,
+) -> set[str]:
+    # how SongReference resolved play metadata before SongIndex
+    return (
+        song_reference.by_difficulty[difficulty_tuple]
+        .intersection(song_reference.by_bpm[bpm_tuple])
+        .intersection(song_reference.by_note_count[note_count])
+    )
+
+
+def benchmark_song_index(
+    song_reference: "SongReference", resolves: int = 20000
+) -> None:
+    """
+    Compares memory and play metadata resolve throughput of the
+    SongReference sets SongIndex is built from against its bitsets.
+    """
+    start = time.perf_counter()
+    song_index = SongIndex(song_reference)
+    build_ms = (time.perf_counter() - start) * 1000
+    set_indexes: list[dict[Any, set[str]]] = [
+        song_reference.by_difficulty,
+        song_reference.by_bpm,
+        song_reference.by_note_count,
+        song_reference.by_genre,
+    ]
+    set_bytes = sum(set_index_nbytes(postings) for postings in set_indexes)
+    print(
+        f"{len(song_index.textage_ids)} songs: sets {set_bytes / 1024:.0f}KiB, "
+        f"bitsets {song_index.nbytes() / 1024:.0f}KiB, built in {build_ms:.1f}ms"
+    )
+    # queries taken from real charts so most resolve to a song
+    by_song: dict[str, dict[str, Any]] = {}
+    indexes: list[tuple[str, dict[Any, set[str]]]] = [
+        ("difficulty", song_reference.by_difficulty),
+        ("bpm", song_reference.by_bpm),
+        ("notes", song_reference.by_note_count),
+    ]
+    for name, postings in indexes:
+        for key, textage_ids in postings.items():
+            for textage_id in textage_ids:
+                by_song.setdefault(textage_id, {})[name] = key
+    picker = random.Random(0)
+    queries = [
+        (song["difficulty"], song["bpm"], song["notes"])
+        for song in picker.choices(list(by_song.values()), k=resolves)
+    ]
+    timings = {}
+    resolvers: list[tuple[str, Callable[..., set[str]]]] = [
+        ("sets", functools.partial(_set_resolve_by_play_metadata, song_reference)),
+        ("bitsets", song_index.resolve_by_play_metadata),
+    ]
+    for name, resolve in resolvers:
+        start = time.perf_counter()
+        for difficulty_tuple, bpm_tuple, note_count in queries:
+            resolve(difficulty_tuple, bpm_tuple, note_count)
+        timings[name] = resolves / (time.perf_counter() - start)
+    print(
+        f"resolve_by_play_metadata: sets {timings['sets']:.0f}/s, "
+        f"bitsets {timings['bitsets']:.0f}/s"
+    )
+
+
+if __name__ == "__main__":
+    from . import constants as CONSTANTS
+    from . import sqlite_client
+    from .benchmark_fixtures import synthetic_song_reference
+
+    if CONSTANTS.APP_DB.exists() and sqlite_client.has_song_metadata():
+        benchmark_song_index(sqlite_client.load_song_reference())
+    else:
+        benchmark_song_index(synthetic_song_reference())
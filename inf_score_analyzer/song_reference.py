@@ -1,9 +1,11 @@
 import logging
-from typing import Optional
+from typing import Iterable, Optional
 from dataclasses import dataclass, field
 
 import polyleven  # type: ignore
 
+from .song_index import SongIndex
+from .fuzzy_index import BKTree, NGramIndex, closest_matches
 from .local_dataclasses import OCRSongTitles, OCRGenres
 
 
@@ -19,6 +21,17 @@ class SongReference:
     )
     by_genre: dict[str, set[str]] = field(default_factory=dict)
     by_textage_id: dict[str, dict[str, str]] = field(default_factory=dict)
+    tiebreak_records: dict[str, tuple[str, str, str, str]] = field(default_factory=dict)
+    # bitsets over the indexes above and fuzzy lookups over the by_genre,
+    # by_title and by_artist keys, built on first use since the indexes
+    # above are filled in after construction
+    song_index_engine: Optional[SongIndex] = field(
+        default=None, repr=False, compare=False
+    )
+    genre_tree: Optional[BKTree] = field(default=None, repr=False, compare=False)
+    fuzzy_indexes: dict[str, NGramIndex] = field(
+        default_factory=dict, repr=False, compare=False
+    )
     log = logging.getLogger(__name__)
 
     def resolve_by_song_select_metadata(
@@ -30,11 +43,12 @@ class SongReference:
         ocr_genres: OCRGenres,
     ) -> set[str]:
         difficulty_tuple = (difficulty, level)
-        difficulty_set = self.by_difficulty[difficulty_tuple]
-        bpm_set = self.by_bpm[bpm_tuple]
-        diff_bpm_set = difficulty_set.intersection(bpm_set)
-        genre_set = self.__resolve_genres(ocr_genres)
-        genre_diff_bpm_set = diff_bpm_set.intersection(genre_set)
+        diff_bpm_set = self.song_index().resolve_by_play_metadata(
+            difficulty_tuple, bpm_tuple
+        )
+        genre_diff_bpm_set = self.song_index().resolve_by_genres(
+            difficulty_tuple, bpm_tuple, self.__resolve_genres(ocr_genres)
+        )
         self.log.debug(f"DIFFICULTY+BPM SET: {diff_bpm_set}")
         self.log.debug(f"GENRE+DIFFICULTY+BPM SET: {genre_diff_bpm_set}")
         if len(genre_diff_bpm_set) != 1:
@@ -42,16 +56,31 @@ class SongReference:
         else:
             return genre_diff_bpm_set
 
+    def song_index(self) -> SongIndex:
+        if self.song_index_engine is None:
+            self.song_index_engine = SongIndex(self)
+        return self.song_index_engine
+
+    def genre_index(self) -> BKTree:
+        if self.genre_tree is None:
+            self.genre_tree = BKTree(self.by_genre)
+        return self.genre_tree
+
+    def fuzzy_index(self, name: str) -> NGramIndex:
+        if name not in self.fuzzy_indexes:
+            keys: dict[str, Iterable[str]] = {
+                "title": self.by_title,
+                "artist": self.by_artist,
+            }
+            self.fuzzy_indexes[name] = NGramIndex(keys[name])
+        return self.fuzzy_indexes[name]
+
     def __resolve_genres(self, ocr_genres: OCRGenres) -> set[str]:
-        genre_key_set = set([key for key in self.by_genre.keys()])
-        en_genre_set = self.__get_lowest_leven_score(ocr_genres.en_genre, genre_key_set)
-        jp_genre_set = self.__get_lowest_leven_score(ocr_genres.jp_genre, genre_key_set)
+        en_genre_set = self.__get_lowest_leven_score(ocr_genres.en_genre)
+        jp_genre_set = self.__get_lowest_leven_score(ocr_genres.jp_genre)
         all_genre_set = en_genre_set.union(jp_genre_set)
-        result_set: set[str] = set([])
-        for genre in all_genre_set:
-            result_set = result_set.union(self.by_genre[genre])
-        self.log.debug(f"GENRE RESULT SET: {result_set}")
-        return result_set
+        self.log.debug(f"GENRE RESULT SET: {all_genre_set}")
+        return all_genre_set
 
     def resolve_by_play_metadata(
         self,
@@ -59,20 +88,18 @@ class SongReference:
         bpm_tuple: tuple[int, int],
         note_count: Optional[int] = None,
     ) -> set[str]:
-        difficulty_set = self.by_difficulty[difficulty_tuple]
-        bpm_set = self.by_bpm[bpm_tuple]
-        if note_count is not None:
-            notes_set = self.by_note_count[note_count]
-            found_results = difficulty_set.intersection(bpm_set).intersection(notes_set)
-        else:
-            found_results = difficulty_set.intersection(bpm_set)
+        found_results = self.song_index().resolve_by_play_metadata(
+            difficulty_tuple, bpm_tuple, note_count
+        )
         self.log.debug(f"PLAY METADATA SET: {found_results}")
         return found_results
 
     def resolve_by_score_metadata(
         self, difficulty: str, level: int, notes: int
     ) -> set[str]:
-        found_results = self.by_difficulty_and_notes[(difficulty, level, notes)]
+        found_results = self.by_difficulty_and_notes.get(
+            (difficulty, level, notes), set()
+        )
         self.log.debug(f"SCORE METADATA SET: {found_results}")
         return found_results
 
@@ -85,6 +112,10 @@ class SongReference:
         found_artist_textage_ids = found_en_artist_textage_ids.union(
             found_jp_artist_textage_ids
         )
+        if not found_artist_textage_ids:
+            found_artist_textage_ids = self._fuzzy_artist_textage_ids(
+                song_title, found_difficulty_textage_ids
+            )
         if len(found_artist_textage_ids) > 0:
             matching_ids = found_artist_textage_ids.intersection(
                 found_difficulty_textage_ids
@@ -96,12 +127,57 @@ class SongReference:
                 self.log.debug("Could not find single song to artist/difficulty.")
         return found_artist_textage_id
 
+    def _fuzzy_title_textage_id(
+        self, ocr_title: str, found_difficulty_textage_ids: set[str]
+    ) -> Optional[str]:
+        """
+        The one chart at this difficulty whose title is closest to a
+        noisy OCR title, within max_edit_distance of it.
+        """
+        if not ocr_title:
+            return None
+        titles = closest_matches(
+            self.fuzzy_index("title"),
+            ocr_title,
+            accept=lambda title: self.by_title[title] in found_difficulty_textage_ids,
+        )
+        self.log.debug(f"Fuzzy title matches for {ocr_title}: {titles}")
+        if len(titles) != 1:
+            return None
+        return self.by_title[titles[0]]
+
+    def _fuzzy_artist_textage_ids(
+        self, song_title: OCRSongTitles, found_difficulty_textage_ids: set[str]
+    ) -> set[str]:
+        found_artist_textage_ids: set[str] = set([])
+        for ocr_artist in [song_title.en_artist, song_title.jp_artist]:
+            if not ocr_artist:
+                continue
+            artists = closest_matches(
+                self.fuzzy_index("artist"),
+                ocr_artist,
+                accept=lambda artist: not self.by_artist[artist].isdisjoint(
+                    found_difficulty_textage_ids
+                ),
+            )
+            self.log.debug(f"Fuzzy artist matches for {ocr_artist}: {artists}")
+            for artist in artists:
+                found_artist_textage_ids.update(self.by_artist[artist])
+        return found_artist_textage_ids
+
     def _resolve_title_ocr(
         self, song_title: OCRSongTitles, found_difficulty_textage_ids: set[str]
     ) -> Optional[str]:
         found_title_textage_id = None
         found_en_title_textage_id = self.by_title.get(song_title.en_title, None)
         found_jp_title_textage_id = self.by_title.get(song_title.jp_title, None)
+        if found_en_title_textage_id is None and found_jp_title_textage_id is None:
+            found_en_title_textage_id = self._fuzzy_title_textage_id(
+                song_title.en_title, found_difficulty_textage_ids
+            )
+            found_jp_title_textage_id = self._fuzzy_title_textage_id(
+                song_title.jp_title, found_difficulty_textage_ids
+            )
         self.log.debug(f"found_en_title_textage_id: {found_en_title_textage_id}")
         self.log.debug(f"found_jp_title_textage_id: {found_jp_title_textage_id}")
         if found_en_title_textage_id is not None and found_jp_title_textage_id is None:
@@ -172,6 +248,17 @@ class SongReference:
                 self.log.warning(f"Tiebreaker found: {textage_id}")
         return textage_id
 
+    def tiebreak_data(self, textage_ids: set[str]) -> list[tuple[str, str, str, str]]:
+        """
+        The (textage_id, artist, title, genre) rows metadata_lookup_tiebreaker
+        scores, read from memory instead of the app db.
+        """
+        return [
+            self.tiebreak_records[textage_id]
+            for textage_id in textage_ids
+            if textage_id in self.tiebreak_records
+        ]
+
     def metadata_lookup_tiebreaker(
         self,
         metadata_titles: set[str],
@@ -239,18 +326,7 @@ class SongReference:
             lowest_textage_id = None
         return lowest_textage_id
 
-    def __get_lowest_leven_score(
-        self, entry: str, values: set[str], lowest_count=1
-    ) -> set[str]:
-        def __sort(score: tuple[int, str]):
-            return score[0]
-
-        scores: list[tuple[int, str]] = []
-        for value in values:
-            score = polyleven.levenshtein(entry, value)
-            score_tuple: tuple[int, str] = (score, value)
-            scores.append(score_tuple)
-        scores = sorted(scores, key=__sort)
-        self.log.debug(f"LOWEST LEVEL SCORES: {scores[0:5]}")
-        lowest_count_set = set([score[1] for score in scores[0:lowest_count]])
-        return lowest_count_set
+    def __get_lowest_leven_score(self, entry: str, lowest_count=1) -> set[str]:
+        scores = self.genre_index().nearest(entry, lowest_count)
+        self.log.debug(f"LOWEST LEVEL SCORES: {scores}")
+        return set([score[1] for score in scores])
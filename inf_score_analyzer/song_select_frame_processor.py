@@ -2,7 +2,6 @@
 import logging
 
 import cv2 as cv  # type: ignore
-import pytesseract  # type: ignore
 from numpy.typing import NDArray  # type: ignore
 
 from .local_dataclasses import (
@@ -35,6 +34,8 @@ from .frame_utilities import (
 )
 from . import sqlite_client
 from . import constants as CONSTANTS
+from . import ocr_service
+from . import ocr_cache
 from . import text_gradients
 
 from typing import Optional
@@ -428,13 +429,19 @@ def read_genre(frame: NDArray) -> OCRGenres:
     genre_slice = get_rectanglular_subsection_from_frame(
         frame, top_left_y, top_left_x, bottom_right_y, bottom_right_x
     )
+    return ocr_cache.cached_ocr(
+        "song_select_genre", [genre_slice], OCRGenres, lambda: _ocr_genre(genre_slice)
+    )
+
+
+def _ocr_genre(genre_slice: NDArray) -> OCRGenres:
     en_genre = str.strip(
-        pytesseract.image_to_string(
+        ocr_service.image_to_string(
             genre_slice, lang="eng", config=CONSTANTS.PYTESSERACT_LINE_OF_TEXT
         )
     )
     jp_genre = str.strip(
-        pytesseract.image_to_string(
+        ocr_service.image_to_string(
             genre_slice, lang="jpn", config=CONSTANTS.PYTESSERACT_LINE_OF_TEXT
         )
     )
@@ -480,13 +487,22 @@ def read_song_select_title_type(
 
 def read_title_with_type(title_slice: NDArray, title_type: TitleType):
     scaled_slice = cv.resize(title_slice, None, fx=2, fy=2)
+    return ocr_cache.cached_ocr(
+        "song_select_title",
+        [scaled_slice],
+        OCRSongTitles,
+        lambda: _ocr_song_select_title(scaled_slice),
+    )
+
+
+def _ocr_song_select_title(scaled_slice: NDArray) -> OCRSongTitles:
     en_title = str.strip(
-        pytesseract.image_to_string(
+        ocr_service.image_to_string(
             scaled_slice, lang="eng", config=CONSTANTS.PYTESSERACT_LINE_OF_TEXT
         )
     )
     jp_title = str.strip(
-        pytesseract.image_to_string(
+        ocr_service.image_to_string(
             scaled_slice, lang="jpn", config=CONSTANTS.PYTESSERACT_LINE_OF_TEXT
         )
     )
@@ -542,13 +558,22 @@ def __read_artist(frame: NDArray):
         bottom_right_y,
         bottom_right_x,
     )
+    return ocr_cache.cached_ocr(
+        "song_select_artist",
+        [artist_slice],
+        OCRSongTitles,
+        lambda: _ocr_song_select_artist(artist_slice),
+    )
+
+
+def _ocr_song_select_artist(artist_slice: NDArray) -> OCRSongTitles:
     en_artist = str.strip(
-        pytesseract.image_to_string(
+        ocr_service.image_to_string(
             artist_slice, lang="eng", config=CONSTANTS.PYTESSERACT_LINE_OF_TEXT
         )
     )
     jp_artist = str.strip(
-        pytesseract.image_to_string(
+        ocr_service.image_to_string(
             artist_slice, lang="jpn", config=CONSTANTS.PYTESSERACT_LINE_OF_TEXT
         )
     )
@@ -682,7 +707,7 @@ def read_textage_id(
     )
     log.debug(f"LIKELY IDS: {likely_textage_ids}")
     if len(likely_textage_ids) != 1:
-        tiebreak_data = sqlite_client.read_tiebreak_data(likely_textage_ids)
+        tiebreak_data = song_reference.tiebreak_data(likely_textage_ids)
         textage_id = song_reference.resolve_ocr_and_metadata(
             ocr_titles,
             likely_textage_ids,
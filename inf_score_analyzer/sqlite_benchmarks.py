@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import time
+import sqlite3
+import logging
+import tempfile
+from pathlib import Path
+from typing import Iterator
+from contextlib import contextmanager
+
+from . import sqlite_client
+from . import constants as CONSTANTS
+from .benchmark_fixtures import synthetic_song_metadata
+from .local_dataclasses import (
+    ScreenshotStatus,
+    ScreenshotFingerprint,
+)
+
+log = logging.getLogger(__name__)
+
+
+@contextmanager
+def scratch_databases() -> Iterator[Path]:
+    """
+    Points the app and user dbs at a temporary directory, restoring the
+    real paths and closing the scratch connections on the way out.
+    """
+    app_db, user_db = CONSTANTS.APP_DB, CONSTANTS.USER_DB
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        CONSTANTS.APP_DB = Path(scratch_dir) / CONSTANTS.APP_DB_NAME
+        CONSTANTS.USER_DB = Path(scratch_dir) / CONSTANTS.USER_DB_NAME
+        try:
+            yield Path(scratch_dir)
+        finally:
+            sqlite_client.close_connections()
+            CONSTANTS.APP_DB, CONSTANTS.USER_DB = app_db, user_db
+
+
+def benchmark_writes(writes: int = 2000) -> None:
+    """
+    Times processed screenshot writes into a scratch user db, opening a
+    connection per write as every call used to versus the pooled one.
+    """
+    with scratch_databases():
+        sqlite_client.create_user_database()
+        query = "insert or replace into processed_screenshot values (?,?,?,?,?,?,?)"
+        timings = {}
+        start = time.perf_counter()
+        for write in range(writes):
+            connection = sqlite3.connect(CONSTANTS.USER_DB)
+            connection.execute(
+                query, (f"per-call-{write}", 0, 0, "", "written", None, "")
+            )
+            connection.commit()
+        timings["connection per write"] = time.perf_counter() - start
+        start = time.perf_counter()
+        for write in range(writes):
+            sqlite_client.write_processed_screenshot(
+                ScreenshotFingerprint(f"pooled-{write}", 0, 0, ""),
+                ScreenshotStatus.WRITTEN,
+            )
+        timings["pooled connection"] = time.perf_counter() - start
+    for name, seconds in timings.items():
+        print(f"{name}: {writes / seconds:.0f} writes/s")
+
+
+def benchmark_song_metadata_load(songs: int = 2500) -> None:
+    """
+    Times loading synthetic song metadata into a scratch app db with a
+    statement and commit per song, as refreshes used to, versus
+    load_song_metadata.
+    """
+    song_metadata = synthetic_song_metadata(songs)
+    song_rows, difficulty_rows = sqlite_client.build_song_metadata_rows(song_metadata)
+    with scratch_databases():
+        sqlite_client.create_app_database()
+        timings = {}
+        connection = sqlite_client.app_connection()
+        start = time.perf_counter()
+        difficulty_rows_by_song: dict[str, list[tuple]] = {}
+        for difficulty_row in difficulty_rows:
+            difficulty_rows_by_song.setdefault(difficulty_row[0], []).append(
+                difficulty_row
+            )
+        for song_row in song_rows:
+            connection.execute(
+                "insert or replace into songs values (?,?,?,?,?,?)", song_row
+            )
+            for difficulty_row in difficulty_rows_by_song[song_row[0]]:
+                connection.execute(
+                    "insert or replace into song_difficulty_metadata "
+                    "values (?,?,?,?,?,?,?)",
+                    difficulty_row,
+                )
+            connection.commit()
+        timings["commit per song"] = time.perf_counter() - start
+        for staged in [False, True]:
+            start = time.perf_counter()
+            sqlite_client.load_song_metadata(song_metadata, staged=staged)
+            timings["bulk, staged" if staged else "bulk"] = time.perf_counter() - start
+    for name, seconds in timings.items():
+        print(f"{name}: {seconds:.3f}s for {songs} songs")
+
+
+def benchmark_song_reference_load(songs: int = 2500, iterations: int = 5) -> None:
+    """
+    Times building the song reference from a scratch app db of
+    synthetic songs versus loading it from the song reference cache.
+    """
+    with scratch_databases():
+        sqlite_client.create_app_database()
+        sqlite_client.populate_app_database()
+        sqlite_client.load_song_metadata(synthetic_song_metadata(songs))
+        sqlite_client.load_song_reference()
+        timings = {}
+        for name, load in [
+            ("sql", sqlite_client.read_song_data_from_db),
+            ("cache", sqlite_client.load_song_reference),
+        ]:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                load()
+            timings[name] = (time.perf_counter() - start) / iterations * 1000
+        cache_size = sqlite_client.song_reference_cache_path().stat().st_size
+    print(
+        f"song reference for {songs} songs: sql {timings['sql']:.1f}ms, "
+        f"cache {timings['cache']:.1f}ms ({cache_size / 1024:.0f}KiB), "
+        f"{timings['sql'] / timings['cache']:.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format=CONSTANTS.LOG_FORMAT)
+    benchmark_writes()
+    benchmark_song_metadata_load()
+    benchmark_song_reference_load()
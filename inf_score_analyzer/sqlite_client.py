@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 import io
 import os
+import sys
+import gzip
+import json
+import pickle
+import hashlib
+import time
 import uuid
 import logging
 import sqlite3
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Iterator, Optional
 from datetime import datetime, date, timezone
 
 import numpy  # type: ignore
@@ -13,15 +20,30 @@ from numpy.typing import NDArray  # type: ignore
 
 from . import constants as CONSTANTS
 from . import download_textage_tables
-from .kamaitachi_client import (
-    download_kamaitachi_song_list,
-    normalize_textage_to_kamaitachi,
-)
+from . import kamaitachi_client
 from .song_reference import SongReference
-from .local_dataclasses import Score, OCRSongTitles, Difficulty, ScoreDBRecord
+from .frame_utilities import decode_png, encode_png, image_content_hash
+from .local_dataclasses import (
+    Score,
+    OCRSongTitles,
+    Difficulty,
+    SongMetadata,
+    RemoteMetadata,
+    SongMetadataChanges,
+    ScoreDBRecord,
+    ScreenshotStatus,
+    ScreenshotFingerprint,
+)
 
 log = logging.getLogger(__name__)
 
+# per thread since a connection can't be shared between threads
+# mid-transaction, checked against the pid since one can't cross a fork
+_connections = threading.local()
+
+# metadata_version row for the textage song tables
+TEXTAGE_METADATA_SOURCE = "textage"
+
 
 def adapt_date_iso(date_value: date) -> str:
     """Adapt datetime.date to ISO 8601 date."""
@@ -50,6 +72,58 @@ def register_date_adapters() -> None:
     sqlite3.register_converter("datetime", convert_datetime)
 
 
+def _connect(db: Path) -> sqlite3.Connection:
+    connection = sqlite3.connect(
+        db, cached_statements=CONSTANTS.SQLITE_CACHED_STATEMENTS
+    )
+    _tune_connection(connection)
+    return connection
+
+
+def _tune_connection(connection: sqlite3.Connection, schema: str = "main") -> None:
+    connection.execute(f"pragma {schema}.journal_mode=wal")
+    connection.execute(f"pragma {schema}.synchronous=normal")
+    connection.execute(f"pragma {schema}.cache_size=-{CONSTANTS.SQLITE_CACHE_KIB}")
+    connection.execute("pragma temp_store=memory")
+
+
+def _get_connection(db: Path, attach_user_db: bool = False) -> sqlite3.Connection:
+    if getattr(_connections, "pid", None) != os.getpid():
+        _connections.pid = os.getpid()
+        _connections.by_db = {}
+    key = (db, CONSTANTS.USER_DB if attach_user_db else None)
+    connection = _connections.by_db.get(key)
+    if connection is None:
+        connection = _connect(db)
+        if attach_user_db:
+            connection.execute("attach ? as user", (str(CONSTANTS.USER_DB),))
+            _tune_connection(connection, "user")
+        _connections.by_db[key] = connection
+    return connection
+
+
+def user_connection() -> sqlite3.Connection:
+    """Returns this thread's long-lived user db connection, opening it on first use."""
+    return _get_connection(CONSTANTS.USER_DB)
+
+
+def app_connection() -> sqlite3.Connection:
+    """
+    Returns this thread's long-lived app db connection, opening it on
+    first use with the user db attached as the user schema.
+    """
+    return _get_connection(CONSTANTS.APP_DB, attach_user_db=True)
+
+
+def close_connections() -> None:
+    """Closes this thread's connections, checkpointing their write-ahead logs."""
+    if getattr(_connections, "pid", None) != os.getpid():
+        return
+    for connection in _connections.by_db.values():
+        connection.close()
+    _connections.by_db = {}
+
+
 def create_user_database():
     create_session_table_query = (
         "create table if not exists session("
@@ -100,18 +174,61 @@ def create_user_database():
         "jp_title_ocr text,"
         "jp_artist_ocr text)"
     )
+    create_processed_screenshot_query = (
+        "create table if not exists processed_screenshot("
+        "path text primary key,"
+        "size integer,"
+        "mtime_ns integer,"
+        "content_hash text,"
+        "status text,"
+        "score_uuid text,"
+        "processed_time_utc text)"
+    )
+    create_processed_screenshot_hash_index = (
+        "create index if not exists processed_screenshot_content_hash "
+        "on processed_screenshot(content_hash)"
+    )
+    create_screengrab_blob_query = (
+        "create table if not exists screengrab_blob("
+        "content_hash text primary key,"
+        "image_png blob)"
+    )
+    create_score_screengrab_query = (
+        "create table if not exists score_screengrab("
+        "score_uuid text,"
+        "name text,"
+        "content_hash text,"
+        "primary key (score_uuid, name))"
+    )
+    create_ocr_cache_query = (
+        "create table if not exists ocr_cache("
+        "crop_hash text primary key,"
+        "result_type text,"
+        "result text,"
+        "hits integer,"
+        "last_used_ns integer)"
+    )
+    create_ocr_cache_last_used_index = (
+        "create index if not exists ocr_cache_last_used " "on ocr_cache(last_used_ns)"
+    )
     add_total_score_to_score_table = (
         "alter table score add column total_score integer default 0"
     )
     add_miss_count_to_score_table = (
         "alter table score add column miss_count integer default 0;"
     )
-    user_db_connection = sqlite3.connect(CONSTANTS.USER_DB)
+    user_db_connection = user_connection()
     db_cursor = user_db_connection.cursor()
     db_cursor.execute(create_session_table_query)
     db_cursor.execute(create_score_table_query)
     db_cursor.execute(create_score_time_series_query)
     db_cursor.execute(create_score_ocr_query)
+    db_cursor.execute(create_processed_screenshot_query)
+    db_cursor.execute(create_processed_screenshot_hash_index)
+    db_cursor.execute(create_screengrab_blob_query)
+    db_cursor.execute(create_score_screengrab_query)
+    db_cursor.execute(create_ocr_cache_query)
+    db_cursor.execute(create_ocr_cache_last_used_index)
     if not check_table_schema_for_column(CONSTANTS.USER_DB, "score", "total_score"):
         db_cursor.execute(add_total_score_to_score_table)
     if not check_table_schema_for_column(CONSTANTS.USER_DB, "score", "miss_count"):
@@ -140,39 +257,80 @@ def populate_app_database():
         "difficulty_table_url) "
         "values (?,?)"
     )
-    app_db_connection = sqlite3.connect(CONSTANTS.APP_DB)
-    db_cursor = app_db_connection.cursor()
-    db_cursor.execute(populate_difficulty_query)
-    db_cursor.execute(
-        populate_alternate_difficulty_query,
-        (CONSTANTS.COMMUNITY_RANK_TABLE_ID, CONSTANTS.COMMUNITY_RANK_TABLE_URL),
-    )
-    app_db_connection.commit()
+    app_db_connection = app_connection()
+    with app_db_connection:
+        db_cursor = app_db_connection.cursor()
+        db_cursor.execute(populate_difficulty_query)
+        db_cursor.execute(
+            populate_alternate_difficulty_query,
+            (CONSTANTS.COMMUNITY_RANK_TABLE_ID, CONSTANTS.COMMUNITY_RANK_TABLE_URL),
+        )
+        app_db_connection.commit()
+
+
+SONGS_COLUMNS = (
+    "(textage_id text primary key,"
+    "title text,"
+    "artist text,"
+    "genre text,"
+    "textage_version_id integer,"
+    "version text)"
+)
+SONG_DIFFICULTY_METADATA_COLUMNS = (
+    "(textage_id text,"
+    "difficulty_id integer,"
+    "level integer,"
+    "notes integer,"
+    "soflan integer,"
+    "min_bpm integer,"
+    "max_bpm integer)"
+)
+METADATA_SNAPSHOT_QUERIES = {
+    "songs": "select * from songs order by textage_id",
+    "charts": "select * from song_difficulty_metadata order by textage_id, difficulty_id",
+    "kamaitachi": (
+        "select textage_id, third_party_id from third_party_song_ids "
+        "where third_party_name='kamaitachi' order by textage_id"
+    ),
+    "sp12": (
+        "select * from alternate_difficulty_table_songs "
+        f"where difficulty_table_id='{CONSTANTS.COMMUNITY_RANK_TABLE_ID}' "
+        "order by textage_id, difficulty_id, clear_type"
+    ),
+}
+CREATE_SONG_DIFFICULTY_INDEX_QUERY = (
+    "create unique index if not exists song_difficulty_index "
+    "on song_difficulty_metadata(textage_id, difficulty_id)"
+)
+
+
+def _create_song_difficulty_index(app_db_connection: sqlite3.Connection) -> None:
+    """
+    App dbs from before song_difficulty_index existed can hold the same
+    chart more than once, which the unique index would refuse, so all
+    but the newest copy of each chart are removed first.
+    """
+    if app_db_connection.execute(
+        "select 1 from sqlite_master where type='index' and name=?",
+        ("song_difficulty_index",),
+    ).fetchone():
+        return
+    with app_db_connection:
+        duplicates = app_db_connection.execute(
+            "delete from song_difficulty_metadata where rowid not in "
+            "(select max(rowid) from song_difficulty_metadata "
+            "group by textage_id, difficulty_id)"
+        ).rowcount
+        if duplicates:
+            log.warning(f"Removed {duplicates} duplicate charts from the app db")
+        app_db_connection.execute(CREATE_SONG_DIFFICULTY_INDEX_QUERY)
 
 
 def create_app_database():
-    create_song_table_query = (
-        "create table if not exists songs("
-        "textage_id text primary key,"
-        "title text,"
-        "artist text,"
-        "genre text,"
-        "textage_version_id integer,"
-        "version text)"
-    )
+    create_song_table_query = f"create table if not exists songs{SONGS_COLUMNS}"
     create_song_difficulty_table_query = (
-        "create table if not exists song_difficulty_metadata("
-        "textage_id text,"
-        "difficulty_id integer,"
-        "level integer,"
-        "notes integer,"
-        "soflan integer,"
-        "min_bpm integer,"
-        "max_bpm integer)"
-    )
-    create_song_difficulty_index_query = (
-        "create unique index if not exists song_difficulty_index "
-        "on song_difficulty_metadata(textage_id, difficulty_id)"
+        "create table if not exists song_difficulty_metadata"
+        f"{SONG_DIFFICULTY_METADATA_COLUMNS}"
     )
     create_difficulty_table_query = (
         "create table if not exists difficulty("
@@ -212,34 +370,52 @@ def create_app_database():
         "create unique index if not exists third_party_id_index "
         "on third_party_song_ids(textage_id, third_party_name, third_party_id)"
     )
-    app_db_connection = sqlite3.connect(CONSTANTS.APP_DB)
+    create_metadata_version_table = (
+        "create table if not exists metadata_version("
+        "source text primary key,"
+        "version text,"
+        "checked_time_utc datetime)"
+    )
+    app_db_connection = app_connection()
     db_cursor = app_db_connection.cursor()
     db_cursor.execute(create_song_table_query)
     db_cursor.execute(create_difficulty_table_query)
     db_cursor.execute(create_song_difficulty_table_query)
-    db_cursor.execute(create_song_difficulty_index_query)
+    _create_song_difficulty_index(app_db_connection)
     db_cursor.execute(create_alternate_difficulty_table_query)
     db_cursor.execute(create_alternate_difficulty_table_index_query)
     db_cursor.execute(create_alternate_difficulty_table_songs_query)
     db_cursor.execute(create_alternate_difficulty_table_songs_index_query)
     db_cursor.execute(create_third_party_id_table)
     db_cursor.execute(create_third_party_id_table_index)
+    db_cursor.execute(create_metadata_version_table)
 
 
 def should_update_app_db() -> bool:
     if not os.path.exists(CONSTANTS.APP_DB):
         return True
-    mtime = int(os.path.getmtime(CONSTANTS.APP_DB))
-    time_difference = datetime.now() - datetime.fromtimestamp(mtime)
+    # refreshes that change nothing don't touch the file, so the last
+    # check is recorded in the db
+    checked_time_utc = read_metadata_checked_time(TEXTAGE_METADATA_SOURCE)
+    if checked_time_utc is not None:
+        time_difference = datetime.now(timezone.utc) - checked_time_utc
+    else:
+        mtime = int(os.path.getmtime(CONSTANTS.APP_DB))
+        time_difference = datetime.now() - datetime.fromtimestamp(mtime)
     log.debug(
         f"app time diff: {int(time_difference.total_seconds())} > {CONSTANTS.MIN_APP_AGE_UPDATE_SECONDS}"
     )
     return int(time_difference.total_seconds()) >= CONSTANTS.MIN_APP_AGE_UPDATE_SECONDS
 
 
-def sqlite_setup(force_update: bool = False) -> None:
+def sqlite_setup(
+    force_update: bool = False, remote_metadata: Optional[RemoteMetadata] = None
+) -> None:
+    """
+    Creates the databases and refreshes the app db's songs when due,
+    from remote_metadata if startup already fetched them.
+    """
     register_date_adapters()
-    should_update_app_db()
     log.info("creating/refreshing user db")
     create_user_database()
     if force_update or should_update_app_db():
@@ -247,43 +423,241 @@ def sqlite_setup(force_update: bool = False) -> None:
         create_app_database()
         log.info("populating app db constants")
         populate_app_database()
-        log.info("loading textage data into db")
-        populate_song_metadata_into_db()
+        if remote_metadata is None:
+            log.info("loading textage data into db")
+            populate_song_metadata_into_db()
+        elif remote_metadata.song_metadata is not None:
+            log.info("loading textage data into db")
+            populate_song_metadata_into_db(
+                song_metadata=remote_metadata.song_metadata,
+                kamaitachi_song_list=remote_metadata.kamaitachi_song_list,
+            )
+        elif read_metadata_version(TEXTAGE_METADATA_SOURCE) is None:
+            raise RuntimeError("could not download textage data for a new app db")
+        else:
+            log.error("could not download textage data, keeping the current songs")
 
 
-def populate_song_metadata_into_db():
-    song_metadata = download_textage_tables.get_infinitas_song_metadata()
-    app_db_connection = sqlite3.connect(CONSTANTS.APP_DB)
-    app_db_cursor = app_db_connection.cursor()
-    song_difficulty_insert_query = (
-        "insert or replace into song_difficulty_metadata ("
-        "textage_id, "
-        "difficulty_id, "
-        "level, "
-        "notes, "
-        "soflan, "
-        "min_bpm, "
-        "max_bpm"
-        ") values (?,?,?,?,?,?,?)"
-    )
-    song_insert_query = (
-        "insert or replace into songs ( "
-        "textage_id,"
-        "title,"
-        "artist,"
-        "genre,"
-        "textage_version_id, "
-        "version"
-        ") values (?,?,?,?,?,?)"
-    )
-    kamaitachi_third_party_insert_query = (
+def sqlite_offline_setup(
+    snapshot_path: Optional[Path] = None,
+) -> None:
+    """
+    Creates the databases without touching the network, loading the
+    songs from the metadata snapshot if the app db has none yet.
+    """
+    register_date_adapters()
+    create_user_database()
+    create_app_database()
+    populate_app_database()
+    if has_song_metadata():
+        return
+    snapshot_path = snapshot_path or CONSTANTS.METADATA_SNAPSHOT
+    if not snapshot_path.exists():
+        raise RuntimeError(
+            f"no songs in {CONSTANTS.APP_DB} and no metadata snapshot at "
+            f"{snapshot_path} to start from without the network, run once "
+            "online first to download the songs and write one"
+        )
+    load_metadata_snapshot(snapshot_path)
+
+
+def has_song_metadata() -> bool:
+    if not CONSTANTS.APP_DB.exists():
+        return False
+    app_db_connection = app_connection()
+    try:
+        return (
+            app_db_connection.execute("select 1 from songs limit 1").fetchone()
+            is not None
+        )
+    except sqlite3.OperationalError:
+        return False
+
+
+def write_metadata_snapshot(snapshot_path: Optional[Path] = None) -> Path:
+    """
+    Writes the app db's songs, charts, kamaitachi ids and SP12 table
+    to a gzipped json snapshot that load_metadata_snapshot can start
+    from without the network.
+    """
+    snapshot_path = snapshot_path or CONSTANTS.METADATA_SNAPSHOT
+    app_db_connection = app_connection()
+    version = read_metadata_version(TEXTAGE_METADATA_SOURCE)
+    if version is None:
+        raise RuntimeError(f"no songs in {CONSTANTS.APP_DB} to snapshot")
+    snapshot = {
+        "format": CONSTANTS.METADATA_SNAPSHOT_FORMAT,
+        "version": version,
+        "created_time_utc": datetime.now(timezone.utc).isoformat(),
+    }
+    for name, query in METADATA_SNAPSHOT_QUERIES.items():
+        snapshot[name] = app_db_connection.execute(query).fetchall()
+    partial_path = snapshot_path.with_suffix(".partial")
+    with gzip.open(partial_path, "wt", encoding="utf-8") as snapshot_writer:
+        json.dump(snapshot, snapshot_writer, ensure_ascii=False)
+    os.replace(partial_path, snapshot_path)
+    log.info(f"Wrote metadata snapshot {version[:12]} to {snapshot_path}")
+    return snapshot_path
+
+
+def load_metadata_snapshot(snapshot_path: Optional[Path] = None) -> None:
+    """
+    Replaces the app db's songs with a snapshot's in one transaction.
+    The snapshot's creation time is recorded as the last metadata check,
+    so an old snapshot is refreshed once the network is used again.
+    """
+    snapshot_path = snapshot_path or CONSTANTS.METADATA_SNAPSHOT
+    start = time.perf_counter()
+    with gzip.open(snapshot_path, "rt", encoding="utf-8") as snapshot_reader:
+        snapshot = json.load(snapshot_reader)
+    if snapshot.get("format") != CONSTANTS.METADATA_SNAPSHOT_FORMAT:
+        raise RuntimeError(
+            f"{snapshot_path} is snapshot format {snapshot.get('format')}, "
+            f"expected {CONSTANTS.METADATA_SNAPSHOT_FORMAT}"
+        )
+    app_db_connection = app_connection()
+    _clear_metadata_version_file()
+    with app_db_connection:
+        app_db_cursor = app_db_connection.cursor()
+        app_db_cursor.execute("delete from songs")
+        app_db_cursor.execute("delete from song_difficulty_metadata")
+        app_db_cursor.execute(
+            "delete from third_party_song_ids where third_party_name='kamaitachi'"
+        )
+        app_db_cursor.execute(
+            "delete from alternate_difficulty_table_songs where difficulty_table_id=?",
+            (CONSTANTS.COMMUNITY_RANK_TABLE_ID,),
+        )
+        app_db_cursor.executemany(
+            "insert into songs values (?,?,?,?,?,?)", snapshot["songs"]
+        )
+        app_db_cursor.executemany(
+            "insert into song_difficulty_metadata values (?,?,?,?,?,?,?)",
+            snapshot["charts"],
+        )
+        app_db_cursor.executemany(
+            "insert into third_party_song_ids values (?,'kamaitachi',?)",
+            snapshot["kamaitachi"],
+        )
+        app_db_cursor.executemany(
+            "insert into alternate_difficulty_table_songs values (?,?,?,?,?,?)",
+            snapshot["sp12"],
+        )
+        _write_metadata_version(
+            app_db_cursor,
+            TEXTAGE_METADATA_SOURCE,
+            snapshot["version"],
+            datetime.fromisoformat(snapshot["created_time_utc"]),
+        )
+    _write_metadata_version_file(snapshot["version"])
+    log.info(
+        f"Loaded {len(snapshot['songs'])} songs from metadata snapshot "
+        f"{snapshot['version'][:12]} in {(time.perf_counter() - start) * 1000:.1f}ms"
+    )
+
+
+def populate_song_metadata_into_db(
+    staged: bool = CONSTANTS.APP_DB_STAGED_LOAD,
+    song_metadata: Optional[dict[str, SongMetadata]] = None,
+    kamaitachi_song_list: Optional[list[dict[str, Any]]] = None,
+) -> None:
+    """
+    Loads the songs into an empty app db, or applies what changed
+    since the last refresh to an existing one. Whatever isn't passed
+    in already downloaded is downloaded here.
+    """
+    if song_metadata is None:
+        song_metadata = download_textage_tables.get_infinitas_song_metadata()
+
+    def read_kamaitachi_song_list() -> list[dict[str, Any]]:
+        if kamaitachi_song_list is not None:
+            return kamaitachi_song_list
+        return kamaitachi_client.download_kamaitachi_song_list()
+
+    if read_metadata_version(TEXTAGE_METADATA_SOURCE) is None:
+        load_song_metadata(song_metadata, read_kamaitachi_song_list(), staged)
+    else:
+        refresh_song_metadata(song_metadata, read_kamaitachi_song_list)
+
+
+def song_metadata_version(song_rows: list[tuple], difficulty_rows: list[tuple]) -> str:
+    """Content hash of the song tables' rows, in any order."""
+    digest = hashlib.sha256()
+    for row in sorted(song_rows) + sorted(difficulty_rows):
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def read_metadata_version(source: str) -> Optional[str]:
+    app_db_connection = app_connection()
+    result = app_db_connection.execute(
+        "select version from metadata_version where source=?", (source,)
+    ).fetchone()
+    return result[0] if result else None
+
+
+def read_metadata_checked_time(source: str) -> Optional[datetime]:
+    app_db_connection = app_connection()
+    try:
+        result = app_db_connection.execute(
+            "select checked_time_utc from metadata_version where source=?",
+            (source,),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # app dbs from before metadata_version existed
+        return None
+    return datetime.fromisoformat(result[0]) if result else None
+
+
+def _write_metadata_version(
+    db_cursor: sqlite3.Cursor,
+    source: str,
+    version: str,
+    checked_time_utc: Optional[datetime] = None,
+) -> None:
+    db_cursor.execute(
+        "insert or replace into metadata_version values (?,?,?)",
+        (source, version, checked_time_utc or datetime.now(timezone.utc)),
+    )
+
+
+def _remap_kamaitachi_ids(
+    db_cursor: sqlite3.Cursor, kamaitachi_song_list: list[dict[str, Any]]
+) -> None:
+    mapping = kamaitachi_client.normalize_textage_to_kamaitachi(
+        read_song_data_from_db(), kamaitachi_song_list
+    )
+    db_cursor.execute(
+        "delete from third_party_song_ids where third_party_name='kamaitachi'"
+    )
+    db_cursor.executemany(
         "insert or replace into third_party_song_ids ("
         "textage_id, third_party_name, third_party_id"
-        ") values (?,?,?)"
+        ") values (?,'kamaitachi',?)",
+        mapping.items(),
     )
-    for textage_id, song in song_metadata.items():
-        app_db_cursor.execute(
-            song_insert_query,
+
+
+def _diff_rows(
+    current: dict[Any, tuple], latest: dict[Any, tuple]
+) -> tuple[list[tuple], list[tuple], list[Any]]:
+    """Returns the rows to insert and update, and the keys to delete."""
+    inserts = [row for key, row in latest.items() if key not in current]
+    updates = [
+        row for key, row in latest.items() if key in current and current[key] != row
+    ]
+    deletes = [key for key in current if key not in latest]
+    return inserts, updates, deletes
+
+
+def build_song_metadata_rows(
+    song_metadata: dict[str, SongMetadata],
+) -> tuple[list[tuple], list[tuple]]:
+    """Returns the songs and song_difficulty_metadata rows for song_metadata."""
+    song_rows: list[tuple] = []
+    difficulty_rows: list[tuple] = []
+    for song in song_metadata.values():
+        song_rows.append(
             (
                 song.textage_id,
                 song.title,
@@ -291,12 +665,10 @@ def populate_song_metadata_into_db():
                 song.genre,
                 song.textage_version_id,
                 song.version,
-            ),
+            )
         )
-        for difficulty in song.difficulty_metadata.keys():
-            metadata = song.difficulty_metadata[difficulty]
-            app_db_cursor.execute(
-                song_difficulty_insert_query,
+        for difficulty, metadata in song.difficulty_metadata.items():
+            difficulty_rows.append(
                 (
                     song.textage_id,
                     difficulty.value,
@@ -305,18 +677,162 @@ def populate_song_metadata_into_db():
                     metadata.soflan,
                     metadata.min_bpm,
                     metadata.max_bpm,
-                ),
+                )
             )
-        app_db_connection.commit()
-    song_reference = read_song_data_from_db()
-    mapping = normalize_textage_to_kamaitachi(
-        song_reference, download_kamaitachi_song_list()
+    return song_rows, difficulty_rows
+
+
+def load_song_metadata(
+    song_metadata: dict[str, SongMetadata],
+    kamaitachi_song_list: Optional[list[dict[str, Any]]] = None,
+    staged: bool = CONSTANTS.APP_DB_STAGED_LOAD,
+) -> None:
+    """
+    Replaces the app db's songs with song_metadata in one transaction,
+    then maps them to kamaitachi ids when a song list is given. Staged
+    loads fill fresh tables and swap them in for the live ones, otherwise
+    the live tables are cleared and refilled. Either way the difficulty
+    index is rebuilt after the rows are in, and readers see the old songs
+    until the commit.
+    """
+    song_rows, difficulty_rows = build_song_metadata_rows(song_metadata)
+    song_table = "songs_staging" if staged else "songs"
+    difficulty_table = (
+        "song_difficulty_metadata_staging" if staged else "song_difficulty_metadata"
     )
-    for textage_id, kt_id in mapping.items():
-        app_db_cursor.execute(
-            kamaitachi_third_party_insert_query, (textage_id, "kamaitachi", kt_id)
+    start = time.perf_counter()
+    app_db_connection = app_connection()
+    _clear_metadata_version_file()
+    with app_db_connection:
+        app_db_cursor = app_db_connection.cursor()
+        # ddl doesn't open a transaction implicitly, so the swap needs one
+        app_db_cursor.execute("begin")
+        app_db_cursor.execute("drop index if exists song_difficulty_index")
+        if staged:
+            app_db_cursor.execute(f"drop table if exists {song_table}")
+            app_db_cursor.execute(f"drop table if exists {difficulty_table}")
+            app_db_cursor.execute(f"create table {song_table}{SONGS_COLUMNS}")
+            app_db_cursor.execute(
+                f"create table {difficulty_table}{SONG_DIFFICULTY_METADATA_COLUMNS}"
+            )
+        else:
+            app_db_cursor.execute(f"delete from {song_table}")
+            app_db_cursor.execute(f"delete from {difficulty_table}")
+        app_db_cursor.executemany(
+            f"insert into {song_table} values (?,?,?,?,?,?)", song_rows
+        )
+        app_db_cursor.executemany(
+            f"insert into {difficulty_table} values (?,?,?,?,?,?,?)",
+            difficulty_rows,
+        )
+        if staged:
+            app_db_cursor.execute("drop table songs")
+            app_db_cursor.execute("drop table song_difficulty_metadata")
+            app_db_cursor.execute(f"alter table {song_table} rename to songs")
+            app_db_cursor.execute(
+                f"alter table {difficulty_table} rename to song_difficulty_metadata"
+            )
+        app_db_cursor.execute(CREATE_SONG_DIFFICULTY_INDEX_QUERY)
+        if kamaitachi_song_list is not None:
+            # reads the songs loaded above, within the same transaction
+            _remap_kamaitachi_ids(app_db_cursor, kamaitachi_song_list)
+        _write_metadata_version(
+            app_db_cursor,
+            TEXTAGE_METADATA_SOURCE,
+            song_metadata_version(song_rows, difficulty_rows),
+        )
+    _write_metadata_version_file(song_metadata_version(song_rows, difficulty_rows))
+    log.info(
+        f"Loaded {len(song_rows)} songs and {len(difficulty_rows)} charts "
+        f"in {time.perf_counter() - start:.3f}s"
+    )
+
+
+def refresh_song_metadata(
+    song_metadata: dict[str, SongMetadata],
+    download_kamaitachi_song_list: Optional[Callable[[], list[dict[str, Any]]]] = None,
+) -> SongMetadataChanges:
+    """
+    Applies only the songs and charts that differ from song_metadata
+    to the app db, in one transaction. Nothing is read back when the
+    metadata version is unchanged, and kamaitachi ids are only
+    downloaded and remapped when a title was added, removed or renamed.
+    The diff and the download happen before the write transaction, so
+    the app db is only locked while the changes are written.
+    """
+    if download_kamaitachi_song_list is None:
+        download_kamaitachi_song_list = kamaitachi_client.download_kamaitachi_song_list
+    changes = SongMetadataChanges()
+    song_rows, difficulty_rows = build_song_metadata_rows(song_metadata)
+    version = song_metadata_version(song_rows, difficulty_rows)
+    start = time.perf_counter()
+    app_db_connection = app_connection()
+    _clear_metadata_version_file()
+    current_version = read_metadata_version(TEXTAGE_METADATA_SOURCE)
+    if current_version == version:
+        with app_db_connection:
+            _write_metadata_version(
+                app_db_connection.cursor(), TEXTAGE_METADATA_SOURCE, version
+            )
+        _write_metadata_version_file(version)
+        log.info(f"Song metadata unchanged at version {version[:12]}")
+        return changes
+    current_songs = {
+        row[0]: tuple(row) for row in app_db_connection.execute("select * from songs")
+    }
+    current_charts = {
+        (row[0], row[1]): tuple(row)
+        for row in app_db_connection.execute("select * from song_difficulty_metadata")
+    }
+    song_inserts, song_updates, song_deletes = _diff_rows(
+        current_songs, {row[0]: row for row in song_rows}
+    )
+    chart_inserts, chart_updates, chart_deletes = _diff_rows(
+        current_charts, {(row[0], row[1]): row for row in difficulty_rows}
+    )
+    changes = SongMetadataChanges(
+        len(song_inserts),
+        len(song_updates),
+        len(song_deletes),
+        len(chart_inserts),
+        len(chart_updates),
+        len(chart_deletes),
+        titles_changed=bool(song_inserts or song_deletes)
+        or any(row[1] != current_songs[row[0]][1] for row in song_updates),
+    )
+    kamaitachi_song_list = None
+    if changes.titles_changed:
+        kamaitachi_song_list = download_kamaitachi_song_list()
+    with app_db_connection:
+        app_db_cursor = app_db_connection.cursor()
+        if read_metadata_version(TEXTAGE_METADATA_SOURCE) != current_version:
+            raise RuntimeError("app db songs changed while diffing a refresh")
+        app_db_cursor.executemany(
+            "delete from songs where textage_id=?",
+            [(textage_id,) for textage_id in song_deletes],
+        )
+        app_db_cursor.executemany(
+            "delete from song_difficulty_metadata "
+            "where textage_id=? and difficulty_id=?",
+            chart_deletes,
+        )
+        app_db_cursor.executemany(
+            "insert or replace into songs values (?,?,?,?,?,?)",
+            song_inserts + song_updates,
         )
-    app_db_connection.commit()
+        app_db_cursor.executemany(
+            "insert or replace into song_difficulty_metadata values (?,?,?,?,?,?,?)",
+            chart_inserts + chart_updates,
+        )
+        if kamaitachi_song_list is not None:
+            _remap_kamaitachi_ids(app_db_cursor, kamaitachi_song_list)
+        _write_metadata_version(app_db_cursor, TEXTAGE_METADATA_SOURCE, version)
+    _write_metadata_version_file(version)
+    log.info(
+        f"Applied song metadata changes in {time.perf_counter() - start:.3f}s: "
+        f"{changes}"
+    )
+    return changes
 
 
 def read_song_data_from_db() -> SongReference:
@@ -338,15 +854,18 @@ def read_song_data_from_db() -> SongReference:
     songs_by_difficulty_and_notes: dict[tuple[str, int, int], set[str]] = {}
     songs_by_genre: dict[str, set[str]] = {}
     songs_by_textage_id: dict[str, dict[str, str]] = {}
-    app_db_connection = sqlite3.connect(CONSTANTS.APP_DB)
+    songs_tiebreak_records: dict[str, tuple[str, str, str, str]] = {}
+    app_db_connection = app_connection()
     db_cursor = app_db_connection.cursor()
     result = db_cursor.execute(query)
     for row in result.fetchall():
-        textage_id = row[0]
+        # interned so each song's strings are one object, which pickle
+        # then stores once in the song reference cache
+        textage_id = sys.intern(row[0])
         notes = row[3]
-        cleaned_artist = row[6].strip()
-        cleaned_title = row[7].strip()
-        cleaned_genre = row[8].strip()
+        cleaned_artist = sys.intern(row[6].strip())
+        cleaned_title = sys.intern(row[7].strip())
+        cleaned_genre = sys.intern(row[8].strip())
         songs_by_title[cleaned_title] = textage_id
         bpm_tuple: tuple[int, int] = (row[4], row[5])
         difficulty_tuple: tuple[str, int] = (row[1], row[2])
@@ -374,6 +893,13 @@ def read_song_data_from_db() -> SongReference:
             "title": cleaned_title,
             "genre": cleaned_genre,
         }
+        # unstripped, as the tiebreaker has always compared against them
+        songs_tiebreak_records[textage_id] = (
+            textage_id,
+            sys.intern(row[6]),
+            sys.intern(row[7]),
+            sys.intern(row[8]),
+        )
     return SongReference(
         by_artist=songs_by_artist,
         by_difficulty=songs_by_difficulty,
@@ -383,45 +909,117 @@ def read_song_data_from_db() -> SongReference:
         by_difficulty_and_notes=songs_by_difficulty_and_notes,
         by_genre=songs_by_genre,
         by_textage_id=songs_by_textage_id,
+        tiebreak_records=songs_tiebreak_records,
     )
 
 
+def _metadata_version_path() -> Path:
+    return CONSTANTS.APP_DB.with_name(f"{CONSTANTS.APP_DB.name}.version")
+
+
+def song_reference_cache_path() -> Path:
+    return CONSTANTS.APP_DB.with_name(CONSTANTS.SONG_REFERENCE_CACHE_NAME)
+
+
+def _clear_metadata_version_file() -> None:
+    """
+    Removes the version file ahead of a metadata transaction, so a crash
+    before it is rewritten leaves load_song_reference rebuilding from
+    the db rather than trusting a cache of the old songs.
+    """
+    _metadata_version_path().unlink(missing_ok=True)
+
+
+def _write_metadata_version_file(version: str) -> None:
+    """
+    Mirrors the committed metadata version next to the app db, so the
+    song reference cache can be checked without opening it.
+    """
+    version_path = _metadata_version_path()
+    partial_path = version_path.with_suffix(".partial")
+    partial_path.write_text(version)
+    os.replace(partial_path, version_path)
+
+
+def load_song_reference() -> SongReference:
+    """
+    Returns the song reference cached next to the app db when it was
+    built from the current metadata version, without any sql, and
+    otherwise builds it with read_song_data_from_db and caches it.
+    """
+    start = time.perf_counter()
+    cache_path = song_reference_cache_path()
+    try:
+        version: Optional[str] = _metadata_version_path().read_text()
+    except OSError:
+        version = None
+    if version is not None and cache_path.exists():
+        try:
+            with open(cache_path, "rb") as cache_reader:
+                cache_format, cache_version, song_reference = pickle.load(cache_reader)
+            if (cache_format, cache_version) == (
+                CONSTANTS.SONG_REFERENCE_CACHE_FORMAT,
+                version,
+            ):
+                log.info(
+                    f"Loaded song reference {version[:12]} from {cache_path} "
+                    f"in {(time.perf_counter() - start) * 1000:.1f}ms"
+                )
+                return song_reference
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError) as e:
+            log.warning(f"Could not read song reference cache {cache_path}: {e}")
+    song_reference = read_song_data_from_db()
+    if version is None:
+        # app dbs refreshed before the version file existed
+        version = read_metadata_version(TEXTAGE_METADATA_SOURCE)
+        if version is None:
+            return song_reference
+        _write_metadata_version_file(version)
+    partial_path = cache_path.with_suffix(".partial")
+    with open(partial_path, "wb") as cache_writer:
+        pickle.dump(
+            (CONSTANTS.SONG_REFERENCE_CACHE_FORMAT, version, song_reference),
+            cache_writer,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    os.replace(partial_path, cache_path)
+    log.info(
+        f"Built and cached song reference {version[:12]} "
+        f"in {(time.perf_counter() - start) * 1000:.1f}ms"
+    )
+    return song_reference
+
+
 def write_session_start(session_start_time_utc: datetime, session_uuid: str) -> None:
     session_query = "insert into session values (?,?,?)"
-    user_db_connection = sqlite3.connect(CONSTANTS.USER_DB)
-    db_cursor = user_db_connection.cursor()
-    db_cursor.execute(session_query, (session_uuid, session_start_time_utc, None))
-    user_db_connection.commit()
-    return None
+    user_db_connection = user_connection()
+    with user_db_connection:
+        db_cursor = user_db_connection.cursor()
+        db_cursor.execute(session_query, (session_uuid, session_start_time_utc, None))
+        user_db_connection.commit()
+        return None
 
 
 def write_session_end(session_uuid: str) -> None:
     session_end_time_utc = datetime.now(timezone.utc)
     session_end_query = "update session set end_time_utc=? where session_uuid=?"
-    user_db_connection = sqlite3.connect(CONSTANTS.USER_DB)
-    db_cursor = user_db_connection.cursor()
-    db_cursor.execute(session_end_query, (session_end_time_utc, session_uuid))
-    user_db_connection.commit()
-    return None
+    user_db_connection = user_connection()
+    with user_db_connection:
+        db_cursor = user_db_connection.cursor()
+        db_cursor.execute(session_end_query, (session_end_time_utc, session_uuid))
+        user_db_connection.commit()
+        return None
 
 
 def check_table_schema_for_column(db: Path, table_name: str, column: str) -> bool:
     query = f"PRAGMA table_info({table_name})"
-    user_db_connection = sqlite3.connect(db)
-    db_cursor = user_db_connection.cursor()
+    db_cursor = _get_connection(db).cursor()
     results = [column[1] for column in db_cursor.execute(query).fetchall()]
     return column in results
 
 
-def write_score_from_record(db_record: ScoreDBRecord) -> None:
-    return write_score(
-        db_record.session_uuid,
-        db_record.textage_id,
-        db_record.score,
-        db_record.difficulty,
-        db_record.ocr_titles,
-        db_record.score_frame,
-    )
+def write_score_from_record(db_record: ScoreDBRecord) -> str:
+    return write_scores([db_record])[0]
 
 
 def write_score(
@@ -431,22 +1029,28 @@ def write_score(
     difficulty: Difficulty,
     ocr_titles: Optional[OCRSongTitles] = None,
     score_frame: Optional[NDArray] = None,
-) -> None:
-    difficulty_id = difficulty.value
-    score_uuid = str(uuid.uuid4())
-    end_time_utc = datetime.now(timezone.utc)
-    if score_frame is not None:
-        score_frame_bytes = io.BytesIO()
-        numpy.savez(score_frame_bytes, frame_slice=score_frame)
-        score_frame_bytes.seek(0)
-        score_frame_bytes_value = score_frame_bytes.getvalue()
-    else:
-        score_frame_bytes = None
-        score_frame_bytes_value = None
+    screengrab: Optional[dict[str, NDArray]] = None,
+) -> str:
+    return write_score_from_record(
+        ScoreDBRecord(
+            session_uuid,
+            textage_id,
+            score,
+            difficulty,
+            ocr_titles,
+            score_frame,
+            screengrab,
+        )
+    )
 
-    if not ocr_titles:
-        ocr_titles = OCRSongTitles("", "", "", "")
 
+def write_scores(db_records: list[ScoreDBRecord]) -> list[str]:
+    """
+    Writes scores and their OCR text in one transaction, returning
+    their score_uuids in order. A record's screengrab is what's kept
+    of its score frame, see score_frame_processor.retain_score_frame;
+    without one the whole score_frame is kept.
+    """
     score_query = (
         "insert into score values ("
         ":score_uuid,"
@@ -470,56 +1074,273 @@ def write_score(
         ":miss_count"
         ")"
     )
-    user_db_connection = sqlite3.connect(CONSTANTS.USER_DB)
-    db_cursor = user_db_connection.cursor()
-    artist, title = get_artist_and_title_by_textage_id(textage_id)
-    log.info(
-        f"Provided score for Artist: {artist} Title: {title} Difficulty: {difficulty.name}"
-    )
-    log.info(f"Writing to sqlite: {textage_id} {difficulty} {score}")
-    db_cursor.execute(
-        score_query,
-        {
-            "score_uuid": score_uuid,
-            "session_uuid": session_uuid,
-            "textage_id": textage_id,
-            "difficulty_id": difficulty_id,
-            "perfect_great": score.fgreat,
-            "great": score.great,
-            "good": score.good,
-            "bad": score.bad,
-            "poor": score.poor,
-            "fast": score.fast,
-            "slow": score.slow,
-            "combo_break": None,
-            "grade": score.grade,
-            "clear_type": score.clear_type,
-            "failure_measure": None,
-            "failure_note": None,
-            "end_time_utc": end_time_utc,
-            "total_score": score.total_score,
-            "miss_count": score.miss_count,
-        },
-    )
     ocr_query = (
         "insert into score_ocr "
         "values (:score_uuid, :result_screengrab, :title_scaled,"
         ":en_title_ocr, :en_artist_ocr, :jp_title_ocr, :jp_artist_ocr)"
     )
-    db_cursor.execute(
-        ocr_query,
-        {
-            "score_uuid": score_uuid,
-            "result_screengrab": score_frame_bytes_value,
-            "title_scaled": None,
-            "en_title_ocr": ocr_titles.en_title,
-            "en_artist_ocr": ocr_titles.en_artist,
-            "jp_title_ocr": ocr_titles.jp_title,
-            "jp_artist_ocr": ocr_titles.jp_artist,
-        },
+    score_uuids: list[str] = []
+    score_rows: list[dict] = []
+    ocr_rows: list[dict] = []
+    screengrabs: list[tuple[str, dict[str, NDArray]]] = []
+    end_time_utc = datetime.now(timezone.utc)
+    for db_record in db_records:
+        score_uuid = str(uuid.uuid4())
+        score = db_record.score
+        ocr_titles = db_record.ocr_titles or OCRSongTitles("", "", "", "")
+        screengrab = db_record.screengrab
+        if screengrab is None and db_record.score_frame is not None:
+            screengrab = {"frame_slice": db_record.score_frame}
+        log.info(
+            f"Writing to sqlite: {db_record.textage_id} {db_record.difficulty} {score}"
+        )
+        score_uuids.append(score_uuid)
+        score_rows.append(
+            {
+                "score_uuid": score_uuid,
+                "session_uuid": db_record.session_uuid,
+                "textage_id": db_record.textage_id,
+                "difficulty_id": db_record.difficulty.value,
+                "perfect_great": score.fgreat,
+                "great": score.great,
+                "good": score.good,
+                "bad": score.bad,
+                "poor": score.poor,
+                "fast": score.fast,
+                "slow": score.slow,
+                "combo_break": None,
+                "grade": score.grade,
+                "clear_type": score.clear_type,
+                "failure_measure": None,
+                "failure_note": None,
+                "end_time_utc": end_time_utc,
+                "total_score": score.total_score,
+                "miss_count": score.miss_count,
+            }
+        )
+        ocr_rows.append(
+            {
+                "score_uuid": score_uuid,
+                "result_screengrab": None,
+                "title_scaled": None,
+                "en_title_ocr": ocr_titles.en_title,
+                "en_artist_ocr": ocr_titles.en_artist,
+                "jp_title_ocr": ocr_titles.jp_title,
+                "jp_artist_ocr": ocr_titles.jp_artist,
+            }
+        )
+        if screengrab:
+            screengrabs.append((score_uuid, screengrab))
+    user_db_connection = user_connection()
+    with user_db_connection:
+        db_cursor = user_db_connection.cursor()
+        db_cursor.executemany(score_query, score_rows)
+        db_cursor.executemany(ocr_query, ocr_rows)
+        for score_uuid, screengrab in screengrabs:
+            write_screengrab(db_cursor, score_uuid, screengrab)
+    return score_uuids
+
+
+def write_screengrab(
+    db_cursor: sqlite3.Cursor, score_uuid: str, screengrab: dict[str, NDArray]
+) -> None:
+    """
+    Stores each named image of a screengrab as a png keyed by its
+    pixels' hash, so an image seen before, such as the title of a song
+    played again, is only referenced instead of being stored twice.
+    """
+    blob_exists_query = "select 1 from screengrab_blob where content_hash=?"
+    blob_insert_query = "insert or ignore into screengrab_blob values (?,?)"
+    reference_insert_query = "insert or replace into score_screengrab values (?,?,?)"
+    for name, image in screengrab.items():
+        content_hash = image_content_hash(image)
+        if db_cursor.execute(blob_exists_query, (content_hash,)).fetchone() is None:
+            db_cursor.execute(blob_insert_query, (content_hash, encode_png(image)))
+        db_cursor.execute(reference_insert_query, (score_uuid, name, content_hash))
+
+
+def read_screengrab(score_uuid: str) -> Iterator[tuple[str, NDArray]]:
+    """
+    Yields the (name, image) pairs stored for a score, decoding each
+    only as it's reached. Scores written before screengrabs moved to
+    the blob store are read from their inline npz.
+    """
+    reference_query = (
+        "select score_screengrab.name, screengrab_blob.image_png "
+        "from score_screengrab join screengrab_blob "
+        "on score_screengrab.content_hash = screengrab_blob.content_hash "
+        "where score_screengrab.score_uuid=? order by score_screengrab.name"
+    )
+    legacy_query = "select result_screengrab from score_ocr where score_uuid=?"
+    user_db_connection = user_connection()
+    db_cursor = user_db_connection.cursor()
+    found = False
+    for name, image_png in db_cursor.execute(reference_query, (score_uuid,)):
+        found = True
+        yield name, decode_png(image_png)
+    if found:
+        return
+    legacy = db_cursor.execute(legacy_query, (score_uuid,)).fetchone()
+    if legacy is not None and legacy[0] is not None:
+        with numpy.load(io.BytesIO(legacy[0])) as screengrab:
+            for name in screengrab.files:
+                yield name, screengrab[name]
+
+
+def migrate_screengrabs(batch_size: int = 50) -> int:
+    """
+    Moves screengrabs stored inline in score_ocr into the blob store,
+    committing every batch_size scores, then vacuums the freed space.
+    Returns how many scores were migrated.
+    """
+    pending_query = (
+        "select score_uuid from score_ocr where result_screengrab is not null"
+    )
+    legacy_query = "select result_screengrab from score_ocr where score_uuid=?"
+    clear_query = "update score_ocr set result_screengrab=null where score_uuid=?"
+    user_db_connection = user_connection()
+    with user_db_connection:
+        db_cursor = user_db_connection.cursor()
+        score_uuids = [row[0] for row in db_cursor.execute(pending_query).fetchall()]
+        log.info(f"Migrating {len(score_uuids)} screengrabs to the blob store")
+        for migrated, score_uuid in enumerate(score_uuids, start=1):
+            legacy = db_cursor.execute(legacy_query, (score_uuid,)).fetchone()[0]
+            with numpy.load(io.BytesIO(legacy)) as screengrab:
+                write_screengrab(
+                    db_cursor,
+                    score_uuid,
+                    {name: screengrab[name] for name in screengrab},
+                )
+            db_cursor.execute(clear_query, (score_uuid,))
+            if migrated % batch_size == 0:
+                user_db_connection.commit()
+                log.info(f"Migrated {migrated}/{len(score_uuids)} screengrabs")
+    if score_uuids:
+        user_db_connection.execute("vacuum")
+    log.info(f"Migrated {len(score_uuids)} screengrabs")
+    return len(score_uuids)
+
+
+def update_score_ocr(score_uuid: str, ocr_titles: OCRSongTitles) -> None:
+    query = (
+        "update score_ocr set "
+        "en_title_ocr=:en_title_ocr,"
+        "en_artist_ocr=:en_artist_ocr,"
+        "jp_title_ocr=:jp_title_ocr,"
+        "jp_artist_ocr=:jp_artist_ocr "
+        "where score_uuid=:score_uuid"
     )
-    user_db_connection.commit()
-    return None
+    user_db_connection = user_connection()
+    with user_db_connection:
+        db_cursor = user_db_connection.cursor()
+        db_cursor.execute(
+            query,
+            {
+                "score_uuid": score_uuid,
+                "en_title_ocr": ocr_titles.en_title,
+                "en_artist_ocr": ocr_titles.en_artist,
+                "jp_title_ocr": ocr_titles.jp_title,
+                "jp_artist_ocr": ocr_titles.jp_artist,
+            },
+        )
+        user_db_connection.commit()
+
+
+def read_processed_screenshots() -> dict[str, tuple[int, int, str, str, Optional[str]]]:
+    """
+    Returns path: (size, mtime_ns, content_hash, status, score_uuid)
+    for every screenshot a previous import has already handled.
+    """
+    query = (
+        "select path, size, mtime_ns, content_hash, status, score_uuid "
+        "from processed_screenshot"
+    )
+    user_db_connection = user_connection()
+    db_cursor = user_db_connection.cursor()
+    return {row[0]: row[1:] for row in db_cursor.execute(query)}
+
+
+def write_processed_screenshot(
+    fingerprint: ScreenshotFingerprint,
+    status: ScreenshotStatus,
+    score_uuid: Optional[str] = None,
+) -> None:
+    query = (
+        "insert or replace into processed_screenshot values ("
+        ":path,"
+        ":size,"
+        ":mtime_ns,"
+        ":content_hash,"
+        ":status,"
+        ":score_uuid,"
+        ":processed_time_utc"
+        ")"
+    )
+    user_db_connection = user_connection()
+    with user_db_connection:
+        db_cursor = user_db_connection.cursor()
+        db_cursor.execute(
+            query,
+            {
+                "path": fingerprint.path,
+                "size": fingerprint.size,
+                "mtime_ns": fingerprint.mtime_ns,
+                "content_hash": fingerprint.content_hash,
+                "status": status.value,
+                "score_uuid": score_uuid,
+                "processed_time_utc": datetime.now(timezone.utc),
+            },
+        )
+        user_db_connection.commit()
+
+
+def read_ocr_cache(crop_hash: str) -> Optional[tuple[str, str]]:
+    """
+    Returns the (result_type, result json) cached for crop_hash. Hits
+    are recorded separately with touch_ocr_cache.
+    """
+    select_query = "select result_type, result from ocr_cache where crop_hash=?"
+    return user_connection().execute(select_query, (crop_hash,)).fetchone()
+
+
+def touch_ocr_cache(touches: list[tuple[int, int, str]]) -> None:
+    """Adds (hits, last_used_ns, crop_hash) hits to cached entries."""
+    touch_query = (
+        "update ocr_cache set hits=hits+?, last_used_ns=max(last_used_ns, ?) "
+        "where crop_hash=?"
+    )
+    user_db_connection = user_connection()
+    with user_db_connection:
+        user_db_connection.executemany(touch_query, touches)
+
+
+def write_ocr_cache(
+    crop_hash: str, result_type: str, result: str, max_entries: int
+) -> None:
+    """Caches an OCR result, evicting the least recently used past max_entries."""
+    insert_query = (
+        "insert or replace into ocr_cache values "
+        "(:crop_hash, :result_type, :result, 0, :last_used_ns)"
+    )
+    evict_query = (
+        "delete from ocr_cache where crop_hash in ("
+        "select crop_hash from ocr_cache order by last_used_ns desc "
+        "limit -1 offset ?)"
+    )
+    user_db_connection = user_connection()
+    with user_db_connection:
+        db_cursor = user_db_connection.cursor()
+        db_cursor.execute(
+            insert_query,
+            {
+                "crop_hash": crop_hash,
+                "result_type": result_type,
+                "result": result,
+                "last_used_ns": time.time_ns(),
+            },
+        )
+        db_cursor.execute(evict_query, (max_entries,))
+        user_db_connection.commit()
 
 
 def read_notes(textage_id: str, difficulty_id: int) -> int:
@@ -527,32 +1348,18 @@ def read_notes(textage_id: str, difficulty_id: int) -> int:
         "select sdm.notes "
         "from song_difficulty_metadata sdm "
         "join songs songs on sdm.textage_id = songs.textage_id "
-        f"where songs.textage_id = '{textage_id}' "
-        f"and sdm.difficulty_id = {difficulty_id} "
+        "where songs.textage_id = ? "
+        "and sdm.difficulty_id = ? "
     )
-    app_db_connection = sqlite3.connect(CONSTANTS.APP_DB)
+    app_db_connection = app_connection()
     db_cursor = app_db_connection.cursor()
-    results = db_cursor.execute(query).fetchall()
+    results = db_cursor.execute(query, (textage_id, difficulty_id)).fetchall()
     if not results:
         log.error(query)
     return results[0][0]
 
 
-def read_tiebreak_data(metadata_titles: set[str]) -> list[tuple[str, str, str, str]]:
-    app_db_connection = sqlite3.connect(CONSTANTS.APP_DB)
-    db_cursor = app_db_connection.cursor()
-    ids_as_string = ",".join([f"'{id}'" for id in metadata_titles])
-    query = (
-        "select textage_id, artist, title, genre "
-        "from songs "
-        f"where textage_id in ({ids_as_string})"
-    )
-    results = db_cursor.execute(query).fetchall()
-    return results
-
-
 def get_scores_by_session(session_id: str) -> list[tuple]:
-    double_db = "attach ? AS user;"
     query = (
         "select session.session_uuid session_uuid, "
         "score.perfect_great pgreat,"
@@ -576,34 +1383,32 @@ def get_scores_by_session(session_id: str) -> list[tuple]:
         "join third_party_song_ids on third_party_song_ids.textage_id=songs.textage_id and third_party_song_ids.third_party_name='kamaitachi' "
         "where session.session_uuid=? and clear_type!='';"
     )
-    app_db_connection = sqlite3.connect(CONSTANTS.APP_DB)
+    app_db_connection = app_connection()
     db_cursor = app_db_connection.cursor()
-    _ = db_cursor.execute(double_db, (str(CONSTANTS.USER_DB),))
     results = db_cursor.execute(query, (session_id,))
     return [result for result in results]
 
 
 def add_alternate_difficulty_table(table_entries: list[tuple]) -> None:
-    app_db_connection = sqlite3.connect(CONSTANTS.APP_DB)
-    app_db_cursor = app_db_connection.cursor()
-    query = (
-        "insert or replace into alternate_difficulty_table_songs("
-        "difficulty_table_id,"
-        "textage_id,"
-        "difficulty_id,"
-        "clear_type, "
-        "alternate_difficulty,"
-        "alternate_level) values "
-        "(?,?,?,?,?,?)"
-    )
-    for entry in table_entries:
-        app_db_cursor.execute(query, entry)
-    app_db_connection.commit()
+    app_db_connection = app_connection()
+    with app_db_connection:
+        app_db_cursor = app_db_connection.cursor()
+        query = (
+            "insert or replace into alternate_difficulty_table_songs("
+            "difficulty_table_id,"
+            "textage_id,"
+            "difficulty_id,"
+            "clear_type, "
+            "alternate_difficulty,"
+            "alternate_level) values "
+            "(?,?,?,?,?,?)"
+        )
+        app_db_cursor.executemany(query, table_entries)
 
 
 def get_artist_and_title_by_textage_id(textage_id: str) -> tuple[str, str]:
-    app_db_connection = sqlite3.connect(CONSTANTS.APP_DB)
+    app_db_connection = app_connection()
     app_db_cursor = app_db_connection.cursor()
-    query = f"select artist, title from songs where textage_id='{textage_id}';"
-    results = app_db_cursor.execute(query)
+    query = "select artist, title from songs where textage_id=?"
+    results = app_db_cursor.execute(query, (textage_id,))
     return results.fetchone()
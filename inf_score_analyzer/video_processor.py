@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+import logging
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+from contextlib import contextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+# library imports
+import cv2 as cv  # type: ignore
+from numpy.typing import NDArray  # type: ignore
+
+# local imports
+from . import sqlite_client
+from . import ocr_service
+from . import frame_utilities
+from . import game_state_pixels
+from . import play_frame_processor
+from . import score_frame_processor
+from . import constants as CONSTANTS
+from .frame_capture import FrameRingBuffer
+from .frame_sampler import AdaptiveFrameSampler
+from .game_state_frame_processor import get_game_state_from_frame
+from .local_dataclasses import (
+    GameState,
+    ScoreDBRecord,
+    CompiledStatePixels,
+    ScreengrabRetention,
+    VideoProcessingState,
+)
+from .song_reference import SongReference
+
+log = logging.getLogger(__name__)
+
+
+def process_video(
+    state_pixels: CompiledStatePixels,
+    session_uuid: str,
+    song_reference: SongReference,
+    ocr: Executor,
+    frames: Iterable[tuple[int, NDArray]],
+    sample_stride: int = CONSTANTS.STABLE_PLAY_SAMPLE_STRIDE,
+    score_writer: Callable[
+        [ScoreDBRecord], Any
+    ] = sqlite_client.write_score_from_record,
+    frame_arena: Optional[FrameRingBuffer] = None,
+    retention: ScreengrabRetention = CONSTANTS.SCORE_FRAME_RETENTION,
+) -> None:
+    """
+    Runs the game state machine over frames, writing each score it
+    reads. When frames come from a shared frame_arena, play title OCR
+    is handed the capture slot instead of a copy of the frame.
+    """
+    lookback = CONSTANTS.STATE_LOOKBACK_FRAMES
+    v = VideoProcessingState()
+    sampler = AdaptiveFrameSampler(state_pixels, sample_stride, lookback)
+    score_frame_dumped = False
+    next_log_frame = 300
+    for frame_count, frame in frames:
+        if not sampler.should_process(frame, v):
+            continue
+        state: GameState = get_game_state_from_frame(frame, state_pixels)
+        v.update_current_state(state, sampler.mark_processed(frame, state))
+        if frame_count >= next_log_frame:
+            log.info(f"frame#{frame_count} {v} {sampler}")
+            if CONSTANTS.DEV_MODE and (next_log_frame % 3000 == 0):
+                frame_utilities.dump_to_png(frame, state.value, frame_count)
+            next_log_frame = frame_count - frame_count % 300 + 300
+        if v.state_frame_count >= lookback:
+            if v.current_state in game_state_pixels.PLAY_STATES:
+                play_frame_processor.update_video_processing_state(
+                    frame, frame_count, v, song_reference, ocr, frame_arena
+                )
+            elif v.current_state in game_state_pixels.SCORE_STATES:
+                score_frame_processor.update_video_processing_state(
+                    frame, frame_count, v, song_reference, retention
+                )
+                if not score_frame_dumped:
+                    frame_utilities.dump_to_png(frame, state.value, frame_count)
+                    score_frame_dumped = True
+        elif (
+            v.current_state == GameState.LOADING
+            and v.previous_state in game_state_pixels.SCORE_STATES
+        ):
+            score_frame_processor.handle_score_transition(
+                frame_count, v, song_reference, session_uuid, score_writer
+            )
+            log.info(f"frame#{frame_count}:unblocking naming and scoring")
+            v = VideoProcessingState()
+            score_frame_dumped = False
+        elif v.current_state == GameState.SONG_SELECT:
+            if v.returned_to_song_select_before_writing():
+                log.warning(
+                    f"frame#{frame_count}: Appears no write to "
+                    "db succeeded, skipping previous results."
+                )
+                log.info(f"frame#{frame_count}:unblocking naming and scoring")
+                v = VideoProcessingState()
+                score_frame_dumped = False
+    log.info(f"End of video stream {sampler}")
+    return
+
+
+@contextmanager
+def video_file_capture(video_file: Path) -> Any:
+    video = cv.VideoCapture(str(video_file))
+    try:
+        if not video.isOpened():
+            raise RuntimeError(f"Could not open video file {video_file}")
+        yield video
+    finally:
+        video.release()
+
+
+def read_video_range(
+    video: cv.VideoCapture, start_frame: int, end_frame: Optional[int]
+) -> Iterator[tuple[int, NDArray]]:
+    """
+    Yields (frame_number, frame) for frame indexes start_frame up to,
+    but not including, end_frame, or to the end of the video if end_frame
+    is None. Frame numbers count from 1, matching the capture thread.
+    """
+    if start_frame:
+        video.set(cv.CAP_PROP_POS_FRAMES, start_frame)
+    frame_index = start_frame
+    while end_frame is None or frame_index < end_frame:
+        frame_loaded, frame = video.read()
+        if not frame_loaded:
+            break
+        frame_index += 1
+        yield frame_index, frame
+
+
+def find_loading_boundary(
+    video: cv.VideoCapture,
+    state_pixels: CompiledStatePixels,
+    start_frame: int,
+    end_frame: int,
+    loading_frames: int = CONSTANTS.VIDEO_SPLIT_LOADING_FRAMES,
+) -> Optional[int]:
+    """
+    Scans forward from start_frame for a run of loading_frames frames
+    where process_video holds no state, and returns the index of the
+    frame ending that run, or None if there is none before end_frame.
+    Those are song select frames and LOADING frames after a score or
+    song select. Any other LOADING frames may be the unrecognized gap
+    between a play and its score, which carries the play metadata.
+    """
+    cut_safe_states = game_state_pixels.SCORE_STATES | (
+        game_state_pixels.SONG_SELECT_STATES
+    )
+    last_state: Optional[GameState] = None
+    safe_run = 0
+    for frame_number, frame in read_video_range(video, start_frame, end_frame):
+        state = get_game_state_from_frame(frame, state_pixels)
+        if state == GameState.LOADING:
+            cut_safe = last_state in cut_safe_states
+        else:
+            last_state = state
+            cut_safe = state in game_state_pixels.SONG_SELECT_STATES
+        if cut_safe:
+            safe_run += 1
+            if safe_run >= loading_frames:
+                return frame_number
+        else:
+            safe_run = 0
+    return None
+
+
+def split_video_file(
+    video_file: Path,
+    state_pixels: CompiledStatePixels,
+    parts: int,
+    loading_frames: int = CONSTANTS.VIDEO_SPLIT_LOADING_FRAMES,
+) -> list[tuple[int, Optional[int]]]:
+    """
+    Splits a video file into up to parts [start, end) frame ranges of
+    roughly equal length, moving each cut forward to the next point
+    find_loading_boundary finds safe. Cuts with no such point before
+    the following cut are dropped, merging their ranges.
+    """
+    with video_file_capture(video_file) as video:
+        total_frames = int(video.get(cv.CAP_PROP_FRAME_COUNT))
+        if total_frames <= 0 or parts <= 1:
+            return [(0, None)]
+        cuts = [0]
+        for part in range(1, parts):
+            nominal_cut = total_frames * part // parts
+            if nominal_cut <= cuts[-1]:
+                continue
+            next_nominal_cut = total_frames * (part + 1) // parts
+            cut = find_loading_boundary(
+                video, state_pixels, nominal_cut, next_nominal_cut, loading_frames
+            )
+            if cut is None:
+                log.info(
+                    f"No safe cut between frames {nominal_cut} "
+                    f"and {next_nominal_cut}, merging ranges"
+                )
+                continue
+            cuts.append(cut)
+    ends: list[Optional[int]] = [*cuts[1:], None]
+    return list(zip(cuts, ends))
+
+
+def process_video_range(
+    video_file: Path,
+    start_frame: int,
+    end_frame: Optional[int],
+    state_pixels: CompiledStatePixels,
+    session_uuid: str,
+    song_reference: SongReference,
+    sample_stride: int = CONSTANTS.STABLE_PLAY_SAMPLE_STRIDE,
+    retention: ScreengrabRetention = CONSTANTS.SCORE_FRAME_RETENTION,
+) -> list[ScoreDBRecord]:
+    """
+    Runs in a worker process. Scores are returned rather than written
+    so the parent can write every range's scores in video order.
+    """
+    log.info(f"Processing {video_file} frames {start_frame} to {end_frame}")
+    score_records: list[ScoreDBRecord] = []
+    with video_file_capture(video_file) as video, ThreadPoolExecutor(
+        max_workers=1, initializer=ocr_service.warm_up
+    ) as ocr:
+        process_video(
+            state_pixels,
+            session_uuid,
+            song_reference,
+            ocr,
+            read_video_range(video, start_frame, end_frame),
+            sample_stride,
+            score_records.append,
+            retention=retention,
+        )
+    return score_records
+
+
+def process_video_file(
+    video_file: Path,
+    state_pixels: CompiledStatePixels,
+    session_uuid: str,
+    song_reference: SongReference,
+    workers: int,
+    sample_stride: int = CONSTANTS.STABLE_PLAY_SAMPLE_STRIDE,
+    retention: ScreengrabRetention = CONSTANTS.SCORE_FRAME_RETENTION,
+) -> None:
+    frame_ranges = split_video_file(video_file, state_pixels, workers)
+    log.info(f"Processing {video_file} as {len(frame_ranges)} ranges: {frame_ranges}")
+    with ProcessPoolExecutor(max_workers=min(workers, len(frame_ranges))) as pool:
+        range_futures = [
+            pool.submit(
+                process_video_range,
+                video_file,
+                start_frame,
+                end_frame,
+                state_pixels,
+                session_uuid,
+                song_reference,
+                sample_stride,
+                retention,
+            )
+            for start_frame, end_frame in frame_ranges
+        ]
+        for (start_frame, end_frame), range_future in zip(frame_ranges, range_futures):
+            score_records = range_future.result()
+            log.info(
+                f"Frames {start_frame} to {end_frame}: {len(score_records)} scores"
+            )
+            for score_record in score_records:
+                sqlite_client.write_score_from_record(score_record)
+    return
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+import sqlite3
+
+import pytest
+
+from inf_score_analyzer import sqlite_client
+from inf_score_analyzer import constants as CONSTANTS
+from inf_score_analyzer.song_reference import SongReference
+
+# the songs the OCR tests resolve against, downloaded by running the app
+CHECKOUT_APP_DB = CONSTANTS.APP_DB
+
+
+@pytest.fixture(autouse=True)
+def scratch_databases(tmp_path_factory, monkeypatch):
+    """Keeps the databases tests create or write out of the checkout."""
+    db_dir = tmp_path_factory.mktemp("databases")
+    monkeypatch.setattr(CONSTANTS, "APP_DB", db_dir / CONSTANTS.APP_DB_NAME)
+    monkeypatch.setattr(CONSTANTS, "USER_DB", db_dir / CONSTANTS.USER_DB_NAME)
+    yield
+    sqlite_client.close_connections()
+
+
+@pytest.fixture(scope="session")
+def song_reference(tmp_path_factory) -> SongReference:
+    """The checkout app db's songs, read from a copy of it."""
+    if not CHECKOUT_APP_DB.exists():
+        pytest.skip(f"no songs at {CHECKOUT_APP_DB}, run the app once first")
+    db_dir = tmp_path_factory.mktemp("song_reference")
+    source = sqlite3.connect(f"{CHECKOUT_APP_DB.resolve().as_uri()}?mode=ro", uri=True)
+    copy = sqlite3.connect(db_dir / CONSTANTS.APP_DB_NAME)
+    source.backup(copy)
+    source.close()
+    copy.close()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(CONSTANTS, "APP_DB", db_dir / CONSTANTS.APP_DB_NAME)
+        monkeypatch.setattr(CONSTANTS, "USER_DB", db_dir / CONSTANTS.USER_DB_NAME)
+        loaded_song_reference = sqlite_client.load_song_reference()
+        sqlite_client.close_connections()
+    return loaded_song_reference
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy  # type: ignore
+
+from inf_score_analyzer.frame_capture import (
+    FrameRingBuffer,
+    capture_frames,
+    read_shared_frame,
+)
+from inf_score_analyzer.local_dataclasses import CaptureOverflowPolicy
+
+FRAME_SHAPE = (4, 4, 3)
+
+
+class NumberedFrameVideo:
+    """Stands in for cv.VideoCapture, filling each frame with its frame number."""
+
+    def __init__(self, frame_total: int):
+        self.frame_total = frame_total
+        self.frames_read = 0
+
+    def isOpened(self) -> bool:
+        return True
+
+    def read(self, image=None):
+        if self.frames_read >= self.frame_total:
+            return False, None
+        self.frames_read += 1
+        image[:] = self.frames_read
+        return True, image
+
+
+def test_block_policy_keeps_every_frame():
+    ring_buffer = FrameRingBuffer(2, FRAME_SHAPE, CaptureOverflowPolicy.BLOCK)
+    capture_thread = threading.Thread(
+        target=capture_frames,
+        args=(NumberedFrameVideo(20), ring_buffer, threading.Event()),
+    )
+    capture_thread.start()
+    seen = [(number, int(frame[0][0][0])) for number, frame in ring_buffer.frames()]
+    capture_thread.join()
+    assert seen == [(number, number) for number in range(1, 21)]
+    assert ring_buffer.dropped_frames == 0
+
+
+def test_drop_oldest_policy_counts_dropped_frames():
+    ring_buffer = FrameRingBuffer(3, FRAME_SHAPE, CaptureOverflowPolicy.DROP_OLDEST)
+    # nothing consumes while capturing, so only the newest frames survive
+    capture_frames(NumberedFrameVideo(10), ring_buffer, threading.Event())
+    seen = [number for number, _ in ring_buffer.frames()]
+    assert ring_buffer.captured_frames == 10
+    assert ring_buffer.dropped_frames == 7
+    assert seen == [8, 9, 10]
+
+
+def test_held_frame_is_not_overwritten():
+    ring_buffer = FrameRingBuffer(1, FRAME_SHAPE, CaptureOverflowPolicy.DROP_OLDEST)
+    slot = ring_buffer.acquire_write_slot()
+    ring_buffer.slots[slot][:] = 1
+    ring_buffer.commit_write_slot(slot, 1)
+    entry = ring_buffer.get()
+    assert entry is not None
+    _, held_frame = entry
+    for frame_number in range(2, 6):
+        slot = ring_buffer.acquire_write_slot()
+        ring_buffer.slots[slot][:] = frame_number
+        ring_buffer.commit_write_slot(slot, frame_number)
+    assert numpy.all(held_frame == 1)
+    ring_buffer.close()
+    assert [number for number, _ in ring_buffer.frames()] == [5]
+
+
+def test_retained_shared_slot_is_read_by_worker_until_released():
+    ring_buffer = FrameRingBuffer(
+        1, FRAME_SHAPE, CaptureOverflowPolicy.DROP_OLDEST, shared=True, shared_slots=1
+    )
+    try:
+        slot = ring_buffer.acquire_write_slot()
+        ring_buffer.slots[slot][:] = 1
+        ring_buffer.commit_write_slot(slot, 1)
+        ring_buffer.get()
+        frame_ref = ring_buffer.retain_held()
+        assert frame_ref is not None
+        # retaining the held frame again returns the same ref, and each
+        # retain needs a matching release
+        assert ring_buffer.retain_held() == frame_ref
+        ring_buffer.release(frame_ref)
+
+        # the consumer moving on doesn't free a slot a worker still reads
+        for frame_number in range(2, 6):
+            slot = ring_buffer.acquire_write_slot()
+            ring_buffer.slots[slot][:] = frame_number
+            ring_buffer.commit_write_slot(slot, frame_number)
+            ring_buffer.get()
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            worker_frame = pool.submit(read_shared_frame, frame_ref).result()
+        assert numpy.all(worker_frame == 1)
+
+        ring_buffer.release(frame_ref)
+        assert frame_ref.slot in ring_buffer._free
+    finally:
+        ring_buffer.close()
+        ring_buffer.unlink()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import cv2 as cv  # type: ignore
+
+from inf_score_analyzer.frame_sampler import AdaptiveFrameSampler
+from inf_score_analyzer.game_state_frame_processor import (
+    compile_state_pixels,
+    get_game_state_from_frame,
+)
+from inf_score_analyzer.game_state_pixels import ALL_STATE_PIXELS
+from inf_score_analyzer.local_dataclasses import (
+    Difficulty,
+    GameState,
+    OCRSongTitles,
+    VideoProcessingState,
+)
+
+PLAY_FRAME = "tests/hd_play_images/P1_SP_jelly_kiss_another_8_bpm_135.png"
+SCORE_FRAME = "tests/hd_score_images/100seckb-SP-A-10-P1-EASY-809-notes-667-105-28-3-7-58-75-1439-10.png"
+LOOKBACK = 90
+
+
+def stable_play_state() -> VideoProcessingState:
+    return VideoProcessingState(
+        difficulty=Difficulty.SP_ANOTHER,
+        level=8,
+        lifebar_type="NORMAL",
+        min_bpm=135,
+        max_bpm=135,
+        left_side=True,
+        is_double=False,
+        metadata_title={"jelly_kiss"},
+        ocr_song_title=OCRSongTitles("", "", "", ""),
+    )
+
+
+def run_frames(sampler, v, frames, state_pixels) -> list[GameState]:
+    processed_states = []
+    for frame in frames:
+        if not sampler.should_process(frame, v):
+            continue
+        state = get_game_state_from_frame(frame, state_pixels)
+        v.update_current_state(state, sampler.mark_processed(frame, state))
+        processed_states.append(state)
+    return processed_states
+
+
+def test_stable_play_is_sampled_sparsely_until_the_screen_changes():
+    state_pixels = compile_state_pixels(ALL_STATE_PIXELS)
+    sampler = AdaptiveFrameSampler(state_pixels, stride=10, lookback=LOOKBACK)
+    v = stable_play_state()
+    play_frame = cv.imread(PLAY_FRAME)
+    score_frame = cv.imread(SCORE_FRAME)
+
+    run_frames(sampler, v, [play_frame] * LOOKBACK, state_pixels)
+    assert sampler.processed_frames == LOOKBACK
+    assert v.current_state == GameState.P1_SP_PLAY
+
+    run_frames(sampler, v, [play_frame] * 1000, state_pixels)
+    assert sampler.processed_frames == LOOKBACK + 100
+    assert v.state_frame_count == LOOKBACK + 1000
+
+    # leaving play changes the border probes, so the very next frame is checked
+    assert run_frames(sampler, v, [score_frame], state_pixels) == [GameState.P1_SCORE]
+    run_frames(sampler, v, [score_frame] * 50, state_pixels)
+    assert sampler.processed_frames == LOOKBACK + 100 + 51
+
+
+def test_missing_song_details_keep_every_frame():
+    state_pixels = compile_state_pixels(ALL_STATE_PIXELS)
+    sampler = AdaptiveFrameSampler(state_pixels, stride=10, lookback=LOOKBACK)
+    v = stable_play_state()
+    v.ocr_song_title = None
+    play_frame = cv.imread(PLAY_FRAME)
+    run_frames(sampler, v, [play_frame] * 300, state_pixels)
+    assert sampler.processed_frames == 300
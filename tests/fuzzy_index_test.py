@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import random
+
+import polyleven  # type: ignore
+
+from inf_score_analyzer.fuzzy_index import BKTree, NGramIndex, _add_ocr_noise
+from inf_score_analyzer.local_dataclasses import OCRSongTitles
+from inf_score_analyzer.benchmark_fixtures import synthetic_song_reference
+
+
+def test_fuzzy_indexes_match_linear_scan():
+    song_reference = synthetic_song_reference(300)
+    titles = list(song_reference.by_title)
+    genre_tree = BKTree(song_reference.by_genre)
+    title_index = NGramIndex(titles)
+    picker = random.Random(1)
+    for title in picker.choices(titles, k=100):
+        noisy_title = _add_ocr_noise(title, picker.randint(0, 3), picker)
+        for max_distance in [0, 2, 4]:
+            assert title_index.search(noisy_title, max_distance) == sorted(
+                (polyleven.levenshtein(noisy_title, other), other)
+                for other in titles
+                if polyleven.levenshtein(noisy_title, other) <= max_distance
+            )
+        genre = f"genre {picker.randrange(1000)}"
+        nearest_distance = min(
+            polyleven.levenshtein(genre, other) for other in song_reference.by_genre
+        )
+        assert [distance for distance, _ in genre_tree.nearest(genre, 3)][0] == (
+            nearest_distance
+        )
+
+
+def test_resolve_ocr_matches_noisy_titles():
+    song_reference = synthetic_song_reference(300)
+    textage_id = "_song7"
+    title = song_reference.by_textage_id[textage_id]["title"]
+    difficulty, level = next(
+        difficulty_tuple
+        for difficulty_tuple, textage_ids in song_reference.by_difficulty.items()
+        if textage_id in textage_ids
+    )
+    noisy_title = OCRSongTitles(f"{title[:-1]}l", "", "", "")
+    assert song_reference.resolve_ocr(noisy_title, difficulty, level) == textage_id
+    unreadable_title = OCRSongTitles("?" * len(title), "", "", "")
+    assert song_reference.resolve_ocr(unreadable_title, difficulty, level) is None
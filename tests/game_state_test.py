@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
+import glob
+import json
+
 import cv2 as cv  # type: ignore
 
 from inf_score_analyzer import game_state_frame_processor
+from inf_score_analyzer import constants as CONSTANTS
 from inf_score_analyzer.local_dataclasses import GameState
-from inf_score_analyzer.game_state_pixels import ALL_STATE_PIXELS
+from inf_score_analyzer.game_state_pixels import ALL_STATE_PIXELS, load_state_pixels
 
 
 def test_play_state():
@@ -29,3 +33,35 @@ def test_song_select_state():
         GameState.SONG_SELECT
         == game_state_frame_processor.get_game_state_from_frame(frame, ALL_STATE_PIXELS)
     )
+
+
+def test_compiled_pixels_match_per_pixel_classifier():
+    compiled_pixels = game_state_frame_processor.compile_state_pixels(ALL_STATE_PIXELS)
+    for image in sorted(glob.glob("tests/hd_*_images/*.png")):
+        frame = cv.imread(image)
+        assert game_state_frame_processor.get_game_state_from_frame(
+            frame, compiled_pixels
+        ) == game_state_frame_processor._get_game_state_from_frame_per_pixel(
+            frame, ALL_STATE_PIXELS
+        ), image
+
+
+def test_loaded_pixels_match_built_in_pixels(tmp_path):
+    pixel_file = tmp_path / "pixels.json"
+    definitions = json.loads(CONSTANTS.STATE_PIXEL_CONFIG_FILE.read_text())
+    # repeated probes and states from other layouts are dropped
+    definitions.append(definitions[0])
+    definitions.append(
+        {"state": "SP_PLAY", "name": "", "y": 0, "x": 0, "b": 0, "g": 0, "r": 0}
+    )
+    pixel_file.write_text(json.dumps(definitions))
+    loaded_pixels = load_state_pixels(pixel_file)
+    assert sorted(loaded_pixels, key=repr) == sorted(ALL_STATE_PIXELS, key=repr)
+    compiled_pixels = game_state_frame_processor.compile_state_pixels(loaded_pixels)
+    for image in sorted(glob.glob("tests/hd_*_images/*.png")):
+        frame = cv.imread(image)
+        assert game_state_frame_processor.get_game_state_from_frame(
+            frame, compiled_pixels
+        ) == game_state_frame_processor.get_game_state_from_frame(
+            frame, ALL_STATE_PIXELS
+        )
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from inf_score_analyzer import http_cache
+
+BODY = b'[{"name": "song"}]'
+ETAG = '"v1"'
+LAST_MODIFIED = "Mon, 05 Oct 2026 10:00:00 GMT"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    requests_seen: list[dict[str, str]] = []
+
+    def do_GET(self):
+        self.requests_seen.append(dict(self.headers))
+        if self.path == "/missing":
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_revalidates_cached_copy(stub_url, tmp_path):
+    first = http_cache.fetch(f"{stub_url}/songs.json", cache_dir=tmp_path)
+    assert (first.content, first.modified) == (BODY, True)
+    assert (first.etag, first.last_modified) == (ETAG, LAST_MODIFIED)
+    second = http_cache.fetch(f"{stub_url}/songs.json", cache_dir=tmp_path)
+    assert (second.content, second.modified) == (BODY, False)
+    revalidation = StubHandler.requests_seen[1]
+    assert revalidation["If-None-Match"] == ETAG
+    assert revalidation["If-Modified-Since"] == LAST_MODIFIED
+
+
+def test_fetch_raises_on_error_status(stub_url, tmp_path):
+    with pytest.raises(RuntimeError):
+        http_cache.fetch(f"{stub_url}/missing", cache_dir=tmp_path)
+    assert http_cache.read_cached(f"{stub_url}/missing", tmp_path) is None
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import pytest
+
+from inf_score_analyzer import sqlite_client
+from inf_score_analyzer import constants as CONSTANTS
+from inf_score_analyzer.local_dataclasses import (
+    Difficulty,
+    Alphanumeric,
+    SongMetadata,
+    DifficultyMetadata,
+)
+
+
+def _use_dbs(monkeypatch, db_dir):
+    db_dir.mkdir()
+    monkeypatch.setattr(CONSTANTS, "APP_DB", db_dir / "app.db")
+    monkeypatch.setattr(CONSTANTS, "USER_DB", db_dir / "user.db")
+
+
+def test_offline_setup_starts_from_snapshot(tmp_path, monkeypatch):
+    _use_dbs(monkeypatch, tmp_path / "online")
+    sqlite_client.create_app_database()
+    sqlite_client.populate_app_database()
+    sqlite_client.load_song_metadata(
+        {
+            "_a": SongMetadata(
+                "_a",
+                "first",
+                "artist",
+                "genre",
+                30,
+                Alphanumeric.ABCD,
+                {Difficulty.SP_ANOTHER: DifficultyMetadata(12, 1500, 150, 150)},
+            )
+        },
+        [{"id": "1", "title": "first", "altTitles": []}],
+    )
+    sqlite_client.add_alternate_difficulty_table(
+        [(CONSTANTS.COMMUNITY_RANK_TABLE_ID, "_a", 4, 4, None, "地力S")]
+    )
+    snapshot = sqlite_client.write_metadata_snapshot(tmp_path / "snapshot.json.gz")
+    online_rows = {
+        name: sqlite_client.app_connection().execute(query).fetchall()
+        for name, query in sqlite_client.METADATA_SNAPSHOT_QUERIES.items()
+    }
+    sqlite_client.close_connections()
+
+    _use_dbs(monkeypatch, tmp_path / "offline")
+    sqlite_client.sqlite_offline_setup(snapshot)
+    offline_rows = {
+        name: sqlite_client.app_connection().execute(query).fetchall()
+        for name, query in sqlite_client.METADATA_SNAPSHOT_QUERIES.items()
+    }
+    assert offline_rows == online_rows
+    assert sqlite_client.read_song_data_from_db().by_title == {"first": "_a"}
+    assert sqlite_client.should_update_app_db() is False
+    sqlite_client.close_connections()
+
+
+def test_offline_setup_needs_songs_or_snapshot(tmp_path, monkeypatch):
+    _use_dbs(monkeypatch, tmp_path / "empty")
+    with pytest.raises(RuntimeError):
+        sqlite_client.sqlite_offline_setup(tmp_path / "missing.json.gz")
+    sqlite_client.close_connections()
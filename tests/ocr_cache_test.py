@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import numpy  # type: ignore
+
+from inf_score_analyzer import ocr_cache, sqlite_client
+from inf_score_analyzer import constants as CONSTANTS
+from inf_score_analyzer.local_dataclasses import OCRGenres, OCRSongTitles
+
+
+def test_repeated_crops_skip_ocr_and_old_entries_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.sqlite3.db")
+    monkeypatch.setattr(CONSTANTS, "OCR_CACHE_MAX_ENTRIES", 2)
+    sqlite_client.create_user_database()
+    ocr_calls = []
+
+    def read_titles(crop):
+        ocr_calls.append(int(crop[0][0]))
+        return OCRSongTitles(f"title {crop[0][0]}", "artist", "タイトル", "")
+
+    crops = [numpy.full((4, 4), value, dtype=numpy.uint8) for value in range(3)]
+
+    first = ocr_cache.cached_ocr(
+        "title", [crops[0]], OCRSongTitles, lambda: read_titles(crops[0])
+    )
+    again = ocr_cache.cached_ocr(
+        "title", [crops[0].copy()], OCRSongTitles, lambda: read_titles(crops[0])
+    )
+    assert first == again == OCRSongTitles("title 0", "artist", "タイトル", "")
+    assert ocr_calls == [0]
+
+    # the same pixels read by a different reader are cached separately
+    genres = ocr_cache.cached_ocr(
+        "genre", [crops[0]], OCRGenres, lambda: OCRGenres("GENRE", "")
+    )
+    assert genres == OCRGenres("GENRE", "")
+
+    # with room for two entries, the least recently used title is evicted
+    ocr_cache.cached_ocr(
+        "title", [crops[1]], OCRSongTitles, lambda: read_titles(crops[1])
+    )
+    ocr_cache.cached_ocr(
+        "title", [crops[0]], OCRSongTitles, lambda: read_titles(crops[0])
+    )
+    assert ocr_calls == [0, 1, 0]
+
+
+def test_cache_hits_are_written_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.sqlite3.db")
+    monkeypatch.setattr(CONSTANTS, "OCR_CACHE_TOUCH_BATCH", 2)
+    sqlite_client.create_user_database()
+    crops = [numpy.full((4, 4), value, dtype=numpy.uint8) for value in range(2)]
+    for crop in crops:
+        ocr_cache.cached_ocr("genre", [crop], OCRGenres, lambda: OCRGenres("G", ""))
+
+    def hits():
+        return (
+            sqlite_client.user_connection()
+            .execute("select sum(hits) from ocr_cache")
+            .fetchone()[0]
+        )
+
+    ocr_cache.cached_ocr("genre", [crops[0]], OCRGenres, lambda: OCRGenres("", ""))
+    ocr_cache.cached_ocr("genre", [crops[0]], OCRGenres, lambda: OCRGenres("", ""))
+    assert hits() == 0
+    ocr_cache.cached_ocr("genre", [crops[1]], OCRGenres, lambda: OCRGenres("", ""))
+    assert hits() == 3
+    ocr_cache.cached_ocr("genre", [crops[1]], OCRGenres, lambda: OCRGenres("", ""))
+    ocr_cache.flush_touches()
+    assert hits() == 4
+    sqlite_client.close_connections()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+import time
+
+from inf_score_analyzer import remote_metadata
+from inf_score_analyzer import kamaitachi_client
+from inf_score_analyzer import download_12sp_tables
+from inf_score_analyzer import download_textage_tables
+
+
+def _slow(seconds, result):
+    def read_source():
+        time.sleep(seconds)
+        return result
+
+    return read_source
+
+
+def _fail():
+    raise RuntimeError("could not download")
+
+
+def test_fetch_remote_metadata_runs_sources_concurrently(monkeypatch):
+    monkeypatch.setattr(download_12sp_tables, "get_12sp_table_json", _slow(0.3, []))
+    monkeypatch.setattr(
+        download_textage_tables,
+        "TEXTAGE_TABLE_READERS",
+        {
+            name: _slow(0.3, {})
+            for name in download_textage_tables.TEXTAGE_TABLE_READERS
+        },
+    )
+    monkeypatch.setattr(
+        download_textage_tables,
+        "build_infinitas_song_metadata",
+        lambda textage_tables: {"tables": len(textage_tables)},
+    )
+    monkeypatch.setattr(kamaitachi_client, "download_kamaitachi_song_list", _fail)
+    start = time.perf_counter()
+    fetched = remote_metadata.fetch_remote_metadata()
+    # six sources at 0.3s each, but only as long as the slowest
+    assert time.perf_counter() - start < 1.0
+    assert fetched.song_metadata == {"tables": 4}
+    assert fetched.sp12_table == {}
+    assert fetched.kamaitachi_song_list is None
+
+
+def test_fetch_remote_metadata_abandons_slow_sources(monkeypatch):
+    monkeypatch.setattr(download_12sp_tables, "get_12sp_table_json", _slow(2, []))
+    start = time.perf_counter()
+    fetched = remote_metadata.fetch_remote_metadata(song_metadata=False, timeout=0.2)
+    assert time.perf_counter() - start < 1.0
+    assert fetched.sp12_table is None
+    assert fetched.song_metadata is None
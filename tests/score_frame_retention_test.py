@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import io
+import dataclasses
+
+import numpy  # type: ignore
+import cv2 as cv  # type: ignore
+
+from inf_score_analyzer import score_frame_processor
+from inf_score_analyzer import constants as CONSTANTS
+from inf_score_analyzer.local_dataclasses import ScreengrabRetention
+
+SCORE_FRAME = (
+    "tests/hd_score_images/"
+    "_misogi-SP-A-12-P1-NORMAL-1631-notes-658-485-412-30-84-573-324-1801-114.png"
+)
+
+
+def test_crops_keep_what_the_readers_read():
+    frame = cv.imread(SCORE_FRAME)
+    crops = score_frame_processor.retain_score_frame(
+        frame, True, ScreengrabRetention.CROPS
+    )
+    assert set(crops) == {"score", "fast_slow", "notes", "title", "clear_type"}
+    assert sum(crop.nbytes for crop in crops.values()) < frame.nbytes / 20
+    # crops are copies, not views that keep the frame alive
+    assert all(crop.base is None for crop in crops.values())
+
+    relative_notes_area = dataclasses.replace(
+        CONSTANTS.NOTES_AREA, start_x=0, start_y=0
+    )
+    assert (
+        score_frame_processor.get_note_count(frame)
+        == score_frame_processor.get_numbers_from_area(
+            crops["notes"], relative_notes_area, score_frame_processor.note_count_reader
+        )[0]
+    )
+
+    assert (
+        score_frame_processor.retain_score_frame(frame, True, ScreengrabRetention.NONE)
+        == {}
+    )
+    full = score_frame_processor.retain_score_frame(
+        frame, True, ScreengrabRetention.FULL
+    )
+    compressed = io.BytesIO()
+    numpy.savez_compressed(compressed, **full)
+    compressed.seek(0)
+    assert numpy.array_equal(numpy.load(compressed)["frame_slice"], frame)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import sqlite3
+
+import numpy  # type: ignore
+
+from inf_score_analyzer import sqlite_client
+from inf_score_analyzer import constants as CONSTANTS
+from inf_score_analyzer.score_writer import ScoreWriter
+from inf_score_analyzer.local_dataclasses import (
+    Score,
+    Difficulty,
+    ScoreDBRecord,
+)
+
+
+def _record(textage_id: str, ex_score: int) -> ScoreDBRecord:
+    score = Score(fgreat=ex_score // 2, clear_type="CLEAR", total_score=ex_score)
+    return ScoreDBRecord("test-session", textage_id, score, Difficulty.SP_ANOTHER, None)
+
+
+def test_score_writer_batches_and_reports(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.db")
+    sqlite_client.create_user_database()
+    writer = ScoreWriter(batch_size=2, flush_seconds=60).start()
+    for ex_score in [300, 600, 900]:
+        writer.submit(_record("_aa", ex_score))
+    writer.close()
+    assert writer.drain_status() == []
+    assert writer.written_scores == 3
+    with sqlite3.connect(CONSTANTS.USER_DB) as connection:
+        score_count = connection.execute("select count(*) from score").fetchone()[0]
+        ocr_count = connection.execute("select count(*) from score_ocr").fetchone()[0]
+    assert score_count == 3
+    assert ocr_count == 3
+
+
+def test_score_writer_isolates_failed_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.db")
+    sqlite_client.create_user_database()
+    bad_record = _record("_bb", 300)
+    bad_record.score = None  # type: ignore
+    bad_record.screengrab = {"score": numpy.zeros((4, 4, 3), numpy.uint8)}
+    writer = ScoreWriter(batch_size=8, flush_seconds=0.05).start()
+    writer.submit(_record("_aa", 300))
+    writer.submit(bad_record)
+    writer.close()
+    results = writer.drain_status()
+    assert len(results) == 1
+    assert results[0].db_record.textage_id == "_bb"
+    assert results[0].score_uuid is None and results[0].error is not None
+    assert results[0].db_record.screengrab is None
+    assert (writer.written_scores, writer.failed_scores) == (1, 1)
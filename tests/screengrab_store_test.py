@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import io
+import sqlite3
+
+import numpy  # type: ignore
+
+from inf_score_analyzer import sqlite_client
+from inf_score_analyzer import constants as CONSTANTS
+
+
+def test_screengrabs_dedupe_and_migrate(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.sqlite3.db")
+    sqlite_client.create_user_database()
+    title = numpy.random.default_rng(0).integers(0, 256, (70, 820, 3), numpy.uint8)
+    legacy_frame = numpy.zeros((1080, 1920, 3), numpy.uint8)
+    legacy_frame[960:1030, 550:1370] = title
+    legacy_npz = io.BytesIO()
+    numpy.savez(legacy_npz, frame_slice=legacy_frame)
+
+    user_db_connection = sqlite3.connect(CONSTANTS.USER_DB)
+    db_cursor = user_db_connection.cursor()
+    # the same song played twice shares its title crop
+    for score_uuid in ["first", "second"]:
+        db_cursor.execute(
+            "insert into score_ocr values (?,null,null,'','','','')", (score_uuid,)
+        )
+        sqlite_client.write_screengrab(
+            db_cursor, score_uuid, {"title": title, "notes": title[0:17, 0:84]}
+        )
+    db_cursor.execute(
+        "insert into score_ocr values ('legacy',?,null,'','','','')",
+        (legacy_npz.getvalue(),),
+    )
+    user_db_connection.commit()
+    blob_count = "select count(*) from screengrab_blob"
+    assert db_cursor.execute(blob_count).fetchone()[0] == 2
+
+    second = dict(sqlite_client.read_screengrab("second"))
+    assert list(second) == ["notes", "title"]
+    assert numpy.array_equal(second["title"], title)
+    legacy = dict(sqlite_client.read_screengrab("legacy"))
+    assert numpy.array_equal(legacy["frame_slice"], legacy_frame)
+
+    assert sqlite_client.migrate_screengrabs() == 1
+    assert sqlite_client.migrate_screengrabs() == 0
+    assert db_cursor.execute(blob_count).fetchone()[0] == 3
+    migrated = dict(sqlite_client.read_screengrab("legacy"))
+    assert numpy.array_equal(migrated["frame_slice"], legacy_frame)
+    assert (
+        db_cursor.execute(
+            "select result_screengrab from score_ocr where score_uuid='legacy'"
+        ).fetchone()[0]
+        is None
+    )
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import os
+import shutil
+
+from inf_score_analyzer import sqlite_client, screenshot_processor
+from inf_score_analyzer import constants as CONSTANTS
+from inf_score_analyzer.local_dataclasses import ScreenshotStatus
+
+SCREENSHOT = "tests/hd_play_images/P1_SP_jelly_kiss_another_8_bpm_135.png"
+
+
+def test_only_new_or_changed_screenshots_are_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.sqlite3.db")
+    sqlite_client.create_user_database()
+    first = tmp_path / "first.png"
+    second = tmp_path / "second.png"
+    shutil.copy(SCREENSHOT, first)
+
+    new_files, fingerprints = screenshot_processor.filter_processed_screenshots([first])
+    assert new_files == [first]
+    sqlite_client.write_processed_screenshot(
+        fingerprints[first], ScreenshotStatus.WRITTEN, "score-uuid"
+    )
+
+    # unchanged files are skipped on stat alone, copies by content hash
+    shutil.copy(SCREENSHOT, second)
+    new_files, _ = screenshot_processor.filter_processed_screenshots([first, second])
+    assert new_files == []
+    processed = sqlite_client.read_processed_screenshots()
+    assert processed[str(second)][3] == ScreenshotStatus.DUPLICATE.value
+
+    # a touched file keeps its earlier result
+    os.utime(first, ns=(0, 0))
+    new_files, _ = screenshot_processor.filter_processed_screenshots([first])
+    assert new_files == []
+    processed = sqlite_client.read_processed_screenshots()
+    assert processed[str(first)][1:] == (
+        0,
+        fingerprints[first].content_hash,
+        ScreenshotStatus.WRITTEN.value,
+        "score-uuid",
+    )
+
+    # changed contents are read again
+    with open(first, "ab") as writer:
+        writer.write(b"\0")
+    new_files, _ = screenshot_processor.filter_processed_screenshots([first])
+    assert new_files == [first]
+
+
+def test_failed_reads_are_not_indexed(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.sqlite3.db")
+    sqlite_client.create_user_database()
+    not_a_score = tmp_path / "not_a_score.png"
+    unresolved = tmp_path / "unresolved.png"
+    shutil.copy(SCREENSHOT, not_a_score)
+    with open(unresolved, "wb") as writer:
+        writer.write(b"different contents")
+    png_files = [not_a_score, unresolved]
+    new_files, fingerprints = screenshot_processor.filter_processed_screenshots(
+        png_files
+    )
+    screenshot_processor.write_screenshot_scores(
+        new_files,
+        [ScreenshotStatus.UNREADABLE, ScreenshotStatus.FAILED],
+        None,  # type: ignore
+        False,
+        fingerprints,
+    )
+    # a song missing from the app db may be there after a refresh
+    new_files, _ = screenshot_processor.filter_processed_screenshots(png_files)
+    assert new_files == [unresolved]
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from inf_score_analyzer.screenshot_processor import bounded_map
+
+
+def test_bounded_map_limits_tasks_in_flight():
+    lock = threading.Lock()
+    submitted = []
+    consumed = []
+
+    def read(item: int) -> int:
+        with lock:
+            submitted.append(item)
+        return item * 2
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for result in bounded_map(executor, read, range(20), 3):
+            # nothing past the window is submitted before it is consumed
+            assert len(submitted) <= len(consumed) + 3
+            consumed.append(result)
+    assert consumed == [item * 2 for item in range(20)]
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import time
+import threading
+
+from inf_score_analyzer.screenshot_watcher import watch_for_screenshots
+
+SCREENSHOT = "tests/hd_play_images/P1_SP_jelly_kiss_another_8_bpm_135.png"
+
+
+def test_partially_written_screenshots_are_handled_once_complete(tmp_path):
+    (tmp_path / "existing.png").write_bytes(b"")
+    handled = []
+    stop_event = threading.Event()
+
+    def handle_screenshot(screenshot, frame):
+        handled.append((screenshot.name, frame.shape))
+        stop_event.set()
+
+    watcher = threading.Thread(
+        target=watch_for_screenshots,
+        args=(tmp_path, handle_screenshot, stop_event),
+        kwargs={"use_events": False, "poll_seconds": 0.05, "settle_seconds": 0.1},
+    )
+    watcher.start()
+    # give the watcher time to list the files already there
+    time.sleep(0.2)
+    with open(SCREENSHOT, "rb") as reader:
+        contents = reader.read()
+    half = len(contents) // 2
+    with open(tmp_path / "new.png", "wb") as writer:
+        writer.write(contents[:half])
+        writer.flush()
+        time.sleep(0.5)
+        assert handled == []
+        writer.write(contents[half:])
+    watcher.join(timeout=10)
+    stop_event.set()
+    assert handled == [("new.png", (1080, 1920, 3))]
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+import itertools
+
+from inf_score_analyzer.song_index import SongIndex
+from inf_score_analyzer.benchmark_fixtures import synthetic_song_reference
+
+
+def test_song_index_matches_set_intersections():
+    song_reference = synthetic_song_reference(300)
+    song_index = SongIndex(song_reference)
+    for difficulty_tuple, bpm_tuple in itertools.product(
+        list(song_reference.by_difficulty)[:12], list(song_reference.by_bpm)[:30]
+    ):
+        expected = song_reference.by_difficulty[difficulty_tuple] & (
+            song_reference.by_bpm[bpm_tuple]
+        )
+        assert song_index.resolve_by_play_metadata(difficulty_tuple, bpm_tuple) == (
+            expected
+        )
+        for note_count in list(song_reference.by_note_count)[:5]:
+            assert song_index.resolve_by_play_metadata(
+                difficulty_tuple, bpm_tuple, note_count
+            ) == (expected & song_reference.by_note_count[note_count])
+        genres = list(song_reference.by_genre)[:40]
+        in_genres = {
+            textage_id
+            for textage_id in expected
+            if song_reference.by_textage_id[textage_id]["genre"] in genres
+        }
+        assert song_index.resolve_by_genres(difficulty_tuple, bpm_tuple, genres) == (
+            in_genres
+        )
+
+
+def test_song_index_unknown_keys_resolve_to_nothing():
+    song_reference = synthetic_song_reference(10)
+    assert song_reference.resolve_by_play_metadata(("SP_ANOTHER", 13), (1, 1)) == set()
+    assert (
+        SongIndex(song_reference).resolve_by_play_metadata(("SP_ANOTHER", 13), (1, 1))
+        == set()
+    )
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+import pytest
+
+from inf_score_analyzer import sqlite_client
+from inf_score_analyzer import constants as CONSTANTS
+from inf_score_analyzer.local_dataclasses import (
+    Difficulty,
+    Alphanumeric,
+    SongMetadata,
+    DifficultyMetadata,
+    SongMetadataChanges,
+)
+
+
+def _song(textage_id: str, title: str) -> SongMetadata:
+    return SongMetadata(
+        textage_id,
+        title,
+        "artist",
+        "genre",
+        30,
+        Alphanumeric.ABCD,
+        {Difficulty.SP_ANOTHER: DifficultyMetadata(12, 1500, 150, 150)},
+    )
+
+
+@pytest.mark.parametrize("staged", [False, True])
+def test_load_song_metadata_replaces_songs(tmp_path, monkeypatch, staged):
+    monkeypatch.setattr(CONSTANTS, "APP_DB", tmp_path / "app.db")
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.db")
+    sqlite_client.create_app_database()
+    sqlite_client.populate_app_database()
+    kamaitachi_song_list = [
+        {"id": "1", "title": "first", "altTitles": []},
+        {"id": "2", "title": "second", "altTitles": []},
+    ]
+    sqlite_client.load_song_metadata(
+        {"_a": _song("_a", "first"), "_b": _song("_b", "second")},
+        kamaitachi_song_list,
+        staged,
+    )
+    sqlite_client.load_song_metadata(
+        {"_a": _song("_a", "first")}, kamaitachi_song_list, staged
+    )
+    connection = sqlite_client.app_connection()
+    song_reference = sqlite_client.read_song_data_from_db()
+    assert song_reference.by_title == {"first": "_a"}
+    assert song_reference.tiebreak_data({"_a", "_b"}) == [
+        ("_a", "artist", "first", "genre")
+    ]
+    assert connection.execute(
+        "select textage_id, third_party_id from third_party_song_ids"
+    ).fetchall() == [("_a", "1")]
+    assert connection.execute(
+        "select name from sqlite_master where type='index' "
+        "and name='song_difficulty_index'"
+    ).fetchall() == [("song_difficulty_index",)]
+    sqlite_client.close_connections()
+
+
+def test_refresh_song_metadata_applies_only_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONSTANTS, "APP_DB", tmp_path / "app.db")
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.db")
+    sqlite_client.create_app_database()
+    sqlite_client.populate_app_database()
+    kamaitachi_song_list = [
+        {"id": "1", "title": "first", "altTitles": []},
+        {"id": "2", "title": "second", "altTitles": []},
+        {"id": "3", "title": "third", "altTitles": []},
+    ]
+    kamaitachi_downloads = []
+
+    def download_kamaitachi_song_list():
+        # downloaded before the write transaction holds the app db
+        assert not sqlite_client.app_connection().in_transaction
+        kamaitachi_downloads.append(True)
+        return kamaitachi_song_list
+
+    songs = {"_a": _song("_a", "first"), "_b": _song("_b", "second")}
+    sqlite_client.load_song_metadata(songs, kamaitachi_song_list)
+    assert sqlite_client.should_update_app_db() is False
+
+    unchanged = sqlite_client.refresh_song_metadata(
+        songs, download_kamaitachi_song_list
+    )
+    assert unchanged == SongMetadataChanges()
+
+    rated = _song("_a", "first")
+    rated.difficulty_metadata[Difficulty.SP_ANOTHER].level = 11
+    level_change = sqlite_client.refresh_song_metadata(
+        {"_a": rated, "_b": _song("_b", "second")}, download_kamaitachi_song_list
+    )
+    assert level_change == SongMetadataChanges(charts_updated=1)
+    assert kamaitachi_downloads == []
+
+    title_change = sqlite_client.refresh_song_metadata(
+        {"_a": rated, "_c": _song("_c", "third")}, download_kamaitachi_song_list
+    )
+    assert title_change == SongMetadataChanges(
+        songs_inserted=1,
+        songs_deleted=1,
+        charts_inserted=1,
+        charts_deleted=1,
+        titles_changed=True,
+    )
+    assert kamaitachi_downloads == [True]
+    connection = sqlite_client.app_connection()
+    assert connection.execute(
+        "select textage_id, third_party_id from third_party_song_ids "
+        "order by textage_id"
+    ).fetchall() == [("_a", "1"), ("_c", "3")]
+    assert connection.execute(
+        "select textage_id, level from song_difficulty_metadata order by textage_id"
+    ).fetchall() == [("_a", 11), ("_c", 12)]
+    sqlite_client.close_connections()
+
+
+def test_load_song_reference_uses_cache_until_version_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONSTANTS, "APP_DB", tmp_path / "app.db")
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.db")
+    sqlite_client.create_app_database()
+    sqlite_client.populate_app_database()
+    sqlite_client.load_song_metadata({"_a": _song("_a", "first")})
+    built = sqlite_client.load_song_reference()
+    assert sqlite_client.song_reference_cache_path().exists()
+
+    read_song_data_from_db = sqlite_client.read_song_data_from_db
+
+    def no_sql():
+        raise AssertionError("song reference should come from the cache")
+
+    monkeypatch.setattr(sqlite_client, "read_song_data_from_db", no_sql)
+    assert sqlite_client.load_song_reference() == built
+
+    monkeypatch.setattr(sqlite_client, "read_song_data_from_db", read_song_data_from_db)
+    sqlite_client.refresh_song_metadata(
+        {"_a": _song("_a", "first"), "_b": _song("_b", "second")}, lambda: []
+    )
+    assert sqlite_client.load_song_reference().by_title == {
+        "first": "_a",
+        "second": "_b",
+    }
+    sqlite_client.close_connections()
+
+
+def test_load_song_reference_rebuilds_after_interrupted_refresh(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONSTANTS, "APP_DB", tmp_path / "app.db")
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.db")
+    sqlite_client.create_app_database()
+    sqlite_client.populate_app_database()
+    sqlite_client.load_song_metadata({"_a": _song("_a", "first")})
+    sqlite_client.load_song_reference()
+
+    def interrupted(version):
+        raise KeyboardInterrupt()
+
+    # killed after the commit but before the version file is rewritten
+    monkeypatch.setattr(sqlite_client, "_write_metadata_version_file", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        sqlite_client.refresh_song_metadata(
+            {"_a": _song("_a", "first"), "_b": _song("_b", "second")}, lambda: []
+        )
+    monkeypatch.undo()
+    monkeypatch.setattr(CONSTANTS, "APP_DB", tmp_path / "app.db")
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.db")
+    assert sqlite_client.load_song_reference().by_title == {
+        "first": "_a",
+        "second": "_b",
+    }
+    sqlite_client.close_connections()
+
+
+def test_create_app_database_dedupes_legacy_charts(tmp_path, monkeypatch):
+    monkeypatch.setattr(CONSTANTS, "APP_DB", tmp_path / "app.db")
+    monkeypatch.setattr(CONSTANTS, "USER_DB", tmp_path / "user.db")
+    connection = sqlite_client.app_connection()
+    # an app db from before song_difficulty_index, with a chart twice
+    with connection:
+        connection.execute(
+            "create table song_difficulty_metadata"
+            f"{sqlite_client.SONG_DIFFICULTY_METADATA_COLUMNS}"
+        )
+        connection.executemany(
+            "insert into song_difficulty_metadata values (?,?,?,?,?,?,?)",
+            [
+                ("_a", 4, 11, 1500, 0, 150, 150),
+                ("_a", 4, 12, 1500, 0, 150, 150),
+                ("_a", 3, 9, 900, 0, 150, 150),
+            ],
+        )
+    sqlite_client.create_app_database()
+    sqlite_client.create_app_database()
+    assert connection.execute(
+        "select textage_id, difficulty_id, level from song_difficulty_metadata "
+        "order by difficulty_id"
+    ).fetchall() == [("_a", 3, 9), ("_a", 4, 12)]
+    assert connection.execute(
+        "select 1 from sqlite_master where name='song_difficulty_index'"
+    ).fetchone()
+    sqlite_client.close_connections()
@@ -7,7 +7,7 @@ from pathlib import Path
 import cv2 as cv  # type: ignore
 
 from inf_score_analyzer import song_select_frame_processor
-from inf_score_analyzer.sqlite_client import read_song_data_from_db
+from inf_score_analyzer.song_reference import SongReference
 
 SONG_SELECT_FILES_DIR = "./tests/hd_song_select_images/"
 SONG_SELECT_FILES = [
@@ -91,8 +91,7 @@ def test_level_reader() -> None:
             raise
 
 
-def test_textage_id_reader() -> None:
-    song_reference = read_song_data_from_db()
+def test_textage_id_reader(song_reference: SongReference) -> None:
     for file, metadata in SONG_SELECT_FILES_METADATA.items():
         logging.debug(file)
         logging.debug(metadata)
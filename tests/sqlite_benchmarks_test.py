@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+from inf_score_analyzer import sqlite_client
+from inf_score_analyzer import constants as CONSTANTS
+from inf_score_analyzer.sqlite_benchmarks import scratch_databases
+
+
+def test_scratch_databases_restores_paths():
+    app_db, user_db = CONSTANTS.APP_DB, CONSTANTS.USER_DB
+    with scratch_databases() as scratch_dir:
+        assert CONSTANTS.APP_DB.parent == scratch_dir
+        sqlite_client.create_user_database()
+        assert CONSTANTS.USER_DB.exists()
+    assert (CONSTANTS.APP_DB, CONSTANTS.USER_DB) == (app_db, user_db)
+    assert not scratch_dir.exists()
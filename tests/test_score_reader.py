@@ -6,15 +6,13 @@ from concurrent.futures import ProcessPoolExecutor
 
 import cv2 as cv  # type: ignore
 
-from inf_score_analyzer.sqlite_client import read_song_data_from_db
 from inf_score_analyzer.local_dataclasses import Score, Difficulty
+from inf_score_analyzer.song_reference import SongReference
 import inf_score_analyzer.score_frame_processor as score_frame_processor
-from inf_score_analyzer import sqlite_client
 
 SCORE_FILES_DIR = "./tests/hd_score_images/"
 SCORE_FILES = [Path(file).absolute() for file in os.scandir(SCORE_FILES_DIR)]
 SCORE_FILES_METADATA: dict[str, dict[str, Any]] = {}
-SONG_REFERENCE = read_song_data_from_db()
 
 for file in SCORE_FILES:
     name_diff, score_counts = file.name.split("-notes-")
@@ -124,7 +122,7 @@ def test_play_type_reader():
             raise
 
 
-def test_all():
+def test_all(song_reference: SongReference):
     with ProcessPoolExecutor(max_workers=1) as ocr:
         for file, entry in SCORE_FILES_METADATA.items():
             frame = cv.imread(file)
@@ -133,11 +131,11 @@ def test_all():
                     frame, entry["left_side"], entry["is_double"], ocr
                 )
             )
-            metadata_titles = SONG_REFERENCE.resolve_by_score_metadata(
+            metadata_titles = song_reference.resolve_by_score_metadata(
                 difficulty.name, level, notes
             )
-            tiebreak_data = sqlite_client.read_tiebreak_data(metadata_titles)
-            textage_id = SONG_REFERENCE.resolve_ocr_and_metadata(
+            tiebreak_data = song_reference.tiebreak_data(metadata_titles)
+            textage_id = song_reference.resolve_ocr_and_metadata(
                 ocr_titles, metadata_titles, tiebreak_data, difficulty, level
             )
             try:
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import numpy  # type: ignore
+import cv2 as cv  # type: ignore
+
+from inf_score_analyzer import video_processor
+from inf_score_analyzer.game_state_frame_processor import compile_state_pixels
+from inf_score_analyzer.game_state_pixels import ALL_STATE_PIXELS
+
+PLAY_FRAME = "tests/hd_play_images/P1_SP_jelly_kiss_another_8_bpm_135.png"
+SCORE_FRAME = "tests/hd_score_images/rbwafter-SP-A-10-P1-FAILED-1090-notes-506-209-84-14-31-121-172-1221-45.png"
+SONG_SELECT_FRAME = "tests/hd_state_images/HD_SONG_SELECT.png"
+
+
+def write_video(video_file, frames) -> None:
+    height, width, _ = frames[0].shape
+    writer = cv.VideoWriter(
+        str(video_file), cv.VideoWriter_fourcc(*"FFV1"), 60, (width, height)
+    )
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+
+def test_split_video_file_cuts_at_loading_screens(tmp_path):
+    play_frame = cv.imread(PLAY_FRAME)
+    song_select_frame = cv.imread(SONG_SELECT_FRAME)
+    loading_frame = numpy.zeros_like(play_frame)
+    # play 0-19, loading 20-29, song select 30-49, loading 50-59, play 60-79
+    frames = (
+        [play_frame] * 20
+        + [loading_frame] * 10
+        + [song_select_frame] * 20
+        + [loading_frame] * 10
+        + [play_frame] * 20
+    )
+    video_file = tmp_path / "session.avi"
+    write_video(video_file, frames)
+    state_pixels = compile_state_pixels(ALL_STATE_PIXELS)
+
+    frame_ranges = video_processor.split_video_file(
+        video_file, state_pixels, 2, loading_frames=5
+    )
+    # the loading after play isn't safe to cut in, so the nominal cut at
+    # frame 40 lands on the fifth song select frame
+    assert frame_ranges == [(0, 45), (45, None)]
+
+    with video_processor.video_file_capture(video_file) as video:
+        frame_numbers = [
+            frame_number
+            for frame_number, _ in video_processor.read_video_range(video, 45, None)
+        ]
+    assert frame_numbers == list(range(46, 81))
+
+    # with no long enough safe run after the nominal cut the ranges merge
+    assert video_processor.split_video_file(
+        video_file, state_pixels, 2, loading_frames=35
+    ) == [(0, None)]
+
+
+def test_split_video_file_keeps_play_and_score_together(tmp_path):
+    play_frame = cv.imread(PLAY_FRAME)
+    score_frame = cv.imread(SCORE_FRAME)
+    loading_frame = numpy.zeros_like(play_frame)
+    # play 0-29, unrecognized gap 30-59, score 60-79, loading 80-99
+    frames = (
+        [play_frame] * 30
+        + [loading_frame] * 30
+        + [score_frame] * 20
+        + [loading_frame] * 20
+    )
+    video_file = tmp_path / "session.avi"
+    write_video(video_file, frames)
+    state_pixels = compile_state_pixels(ALL_STATE_PIXELS)
+
+    # the gap after play carries its metadata to the score, so the cut
+    # nominally at frame 50 waits for the loading screen after the score
+    assert video_processor.split_video_file(
+        video_file, state_pixels, 2, loading_frames=5
+    ) == [(0, 85), (85, None)]